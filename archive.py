@@ -0,0 +1,366 @@
+"""
+Page Archive for Integrated Sponsor Center
+Compressed raw HTML of crawled pages in a separate SQLite file, for reprocessing without refetching
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from domains import canonical_domain
+
+try:
+    import zstandard  # optional: pip install zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_ARCHIVE_PATH = "page_archive.db"
+
+# Archive size cap (compressed bytes); the oldest pages are dropped past it
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+# Retention is checked after this share of max_bytes has been written
+RETENTION_CHECK_FRACTION = 0.05
+
+# Sites handed to reprocessing workers per process and in flight per worker
+REPROCESS_MAX_PENDING_PER_WORKER = 4
+
+# Characters of site text kept for scoring (matches crawler.MAX_SITE_TEXT)
+REPROCESS_SITE_TEXT = 50000
+
+# Sites whose text is held for rescoring before scores are computed and written
+REPROCESS_SCORE_BATCH = 200
+
+
+def available_codecs() -> List[str]:
+    """Compression codecs usable in this environment (zlib always, zstd if installed)."""
+    return ['zstd', 'zlib'] if zstandard is not None else ['zlib']
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd archive requires the zstandard package")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    if codec == 'zlib':
+        return zlib.compress(data, ZLIB_LEVEL)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+def decompress(body: bytes, codec: str) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Page archived with zstd; install the zstandard package to read it")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if codec == 'zlib':
+        return zlib.decompress(body)
+    raise ValueError(f"Unknown codec {codec!r}")
+
+
+class PageArchive:
+    """Compressed store of fetched pages keyed by (URL, content hash).
+
+    Lives in its own SQLite file so the main database stays small and
+    backups stay fast. A page whose content is already archived only has
+    its fetched_at refreshed. Once more than max_bytes of compressed HTML
+    is stored, the least recently fetched pages are dropped. Safe to share
+    between crawler threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, codec: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.codec = codec or available_codecs()[0]
+        if self.codec not in available_codecs():
+            raise ValueError(f"Codec {self.codec!r} not available (have {', '.join(available_codecs())})")
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._written_since_check = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        # Must be set before the first table is created for deletes to shrink the file
+        self.conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS pages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                domain TEXT,  -- canonical domain, groups pages into sites
+                content_hash TEXT NOT NULL,
+                codec TEXT NOT NULL,  -- 'zlib' or 'zstd'
+                raw_bytes INTEGER NOT NULL,
+                stored_bytes INTEGER NOT NULL,
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                body BLOB NOT NULL,
+                UNIQUE (url, content_hash)
+            );
+            CREATE INDEX IF NOT EXISTS idx_pages_fetched ON pages (fetched_at, id);
+            CREATE INDEX IF NOT EXISTS idx_pages_domain ON pages (domain, url, fetched_at);
+        ''')
+        self.conn.commit()
+
+    def store(self, url: str, html: str, content_hash: Optional[str] = None) -> bool:
+        """Archive a page. Returns True if new content was written.
+
+        content_hash defaults to a hash of the raw HTML; the crawler passes
+        its nonce-insensitive hash so trivially different copies dedupe.
+        """
+        if not html:
+            return False
+        raw = html.encode('utf-8', 'replace')
+        digest = content_hash or hashlib.blake2b(raw, digest_size=16).hexdigest()
+        with self._lock:
+            touched = self.conn.execute('''
+                UPDATE pages SET fetched_at = CURRENT_TIMESTAMP WHERE url = ? AND content_hash = ?
+            ''', (url, digest)).rowcount
+            if touched:
+                self.conn.commit()
+                return False
+            body = compress(raw, self.codec)
+            self.conn.execute('''
+                INSERT INTO pages (url, domain, content_hash, codec, raw_bytes, stored_bytes, body)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (url, canonical_domain(url), digest, self.codec, len(raw), len(body), body))
+            self.conn.commit()
+            self._written_since_check += len(body)
+            if self.max_bytes and self._written_since_check > self.max_bytes * RETENTION_CHECK_FRACTION:
+                self._enforce_retention()
+        return True
+
+    def _enforce_retention(self) -> int:
+        # Keep the most recently fetched pages up to max_bytes
+        removed = self.conn.execute('''
+            DELETE FROM pages WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, SUM(stored_bytes) OVER (ORDER BY fetched_at DESC, id DESC) AS kept
+                    FROM pages
+                ) WHERE kept > ?
+            )
+        ''', (self.max_bytes,)).rowcount
+        self.conn.commit()
+        if removed:
+            self.conn.execute('PRAGMA incremental_vacuum')
+        self._written_since_check = 0
+        return removed
+
+    def enforce_retention(self, max_bytes: Optional[int] = None) -> int:
+        """Drop the least recently fetched pages beyond max_bytes. Returns pages removed."""
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if not self.max_bytes:
+                return 0
+            return self._enforce_retention()
+
+    def get(self, url: str) -> Optional[str]:
+        """The most recently fetched copy of a page, or None."""
+        row = self.conn.execute('''
+            SELECT codec, body FROM pages WHERE url = ? ORDER BY fetched_at DESC, id DESC LIMIT 1
+        ''', (url,)).fetchone()
+        if row is None:
+            return None
+        return decompress(row['body'], row['codec']).decode('utf-8', 'replace')
+
+    def iter_sites(self, domains: Optional[List[str]] = None) -> Iterator[Tuple[str, List[Tuple[str, str, bytes]]]]:
+        """Yield (domain, [(url, codec, body)]) with the latest copy of each page, one site at a time.
+
+        Bodies stay compressed so they are cheap to hand to worker processes.
+        """
+        where = ''
+        params: Tuple = ()
+        if domains is not None:
+            where = f"AND p.domain IN ({', '.join('?' for _ in domains)})"
+            params = tuple(domains)
+        cursor = self.conn.execute(f'''
+            SELECT p.domain, p.url, p.codec, p.body FROM pages p
+            WHERE p.id = (SELECT id FROM pages WHERE url = p.url ORDER BY fetched_at DESC, id DESC LIMIT 1)
+              AND p.domain IS NOT NULL {where}
+            ORDER BY p.domain, p.url
+        ''', params)
+        site_domain = None
+        pages = []
+        for row in cursor:
+            if row['domain'] != site_domain and pages:
+                yield site_domain, pages
+                pages = []
+            site_domain = row['domain']
+            pages.append((row['url'], row['codec'], row['body']))
+        if pages:
+            yield site_domain, pages
+
+    def stats(self) -> Dict:
+        """Page counts and raw vs compressed sizes."""
+        stats = dict(self.conn.execute('''
+            SELECT COUNT(*) AS pages, COUNT(DISTINCT url) AS urls, COUNT(DISTINCT domain) AS sites,
+                   COALESCE(SUM(raw_bytes), 0) AS raw_bytes, COALESCE(SUM(stored_bytes), 0) AS stored_bytes,
+                   MIN(fetched_at) AS oldest, MAX(fetched_at) AS newest
+            FROM pages
+        ''').fetchone())
+        stats['ratio'] = stats['raw_bytes'] / stats['stored_bytes'] if stats['stored_bytes'] else 0.0
+        stats['file_bytes'] = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        stats['codec'] = self.codec
+        stats['max_bytes'] = self.max_bytes
+        return stats
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# ==================== REPROCESSING ====================
+
+_worker_searcher = None
+
+
+def _init_worker():
+    """Per-process extractor; never used for fetching."""
+    global _worker_searcher
+    from crawler import EmailSearcher
+    _worker_searcher = EmailSearcher()
+
+
+def _extract_site(job: Tuple[str, List[Tuple[str, str, bytes]]]) -> Dict:
+    """Re-run extraction over one archived site (runs in a worker process)."""
+    from crawler import html_to_text
+
+    domain, pages = job
+    emails = set()
+    texts = []
+    text_size = 0
+    for url, codec, body in pages:
+        html = decompress(body, codec).decode('utf-8', 'replace')
+        emails.update(_worker_searcher.extract_emails_from_text(html))
+        if text_size < REPROCESS_SITE_TEXT:
+            text = html_to_text(html)[:REPROCESS_SITE_TEXT - text_size]
+            texts.append(text)
+            text_size += len(text)
+    return {'domain': domain, 'emails': sorted(emails), 'text': ' '.join(texts), 'pages': len(pages)}
+
+
+def reprocess(archive: PageArchive, db, workers: Optional[int] = None, rescore: bool = True,
+              on_site=None) -> Dict:
+    """Re-run email extraction and relevance scoring over archived pages, with no network traffic.
+
+    Sites are streamed from the archive to a process pool (bounded, so
+    the archive is never loaded whole). Only sites of companies in db are
+    processed. New emails are added as contacts; with rescore, each
+    company's relevance_score is recomputed like a fresh discovery (URL
+    heuristic for its type and project/part, plus TF-IDF content score
+    against project and industry for sponsors, the part for vendors).
+    Scores are written every REPROCESS_SCORE_BATCH sites, so at most that
+    many sites' text is held at once.
+    Returns {'sites', 'pages', 'contacts', 'rescored', 'seconds'}.
+    """
+    from discovery import sponsor_scorer, vendor_scorer
+    from relevance import content_scores
+
+    started = time.perf_counter()
+    companies = {}
+    for company in db.iter_companies():
+        domain = company.get('canonical_domain') or canonical_domain(company['url'])
+        if domain:
+            companies.setdefault(domain, company)
+
+    workers = workers or os.cpu_count() or 2
+    max_pending = workers * REPROCESS_MAX_PENDING_PER_WORKER
+    # (type, project/part, industry) -> [(company, emails, text)], flushed every REPROCESS_SCORE_BATCH sites
+    groups: Dict[Tuple[str, str, str], List] = {}
+    buffered = 0
+    stats = {'sites': 0, 'pages': 0, 'contacts': 0, 'rescored': 0}
+
+    def score_groups():
+        # Scored with the same inputs as a fresh discovery: sponsors by project and
+        # industry, vendors by part, so reprocessed and new scores are comparable
+        scores = {}
+        for (company_type, description, industry), entries in groups.items():
+            if company_type == 'sponsor':
+                scorer = sponsor_scorer(description, industry or None)
+                query = f"{description} {industry}"
+            else:
+                scorer = vendor_scorer(description)
+                query = description
+            content = content_scores([text for _, _, text in entries], query)
+            for (company, emails, _), points in zip(entries, content):
+                scores[company['id']] = scorer({'url': company['url'], 'emails': emails}) + points
+        stats['rescored'] += db.update_relevance_scores(scores)
+        groups.clear()
+
+    def collect(done):
+        nonlocal buffered
+        for future in done:
+            site = future.result()
+            company = companies[site['domain']]
+            stats['sites'] += 1
+            stats['pages'] += site['pages']
+            stats['contacts'] += db.bulk_add_contacts([(company['id'], email) for email in site['emails']])
+            if rescore:
+                industry = (company.get('industry') or '') if company['type'] == 'sponsor' else ''
+                key = (company['type'], company.get('project_part') or '', industry)
+                groups.setdefault(key, []).append((company, site['emails'], site['text']))
+                buffered += 1
+                if buffered >= REPROCESS_SCORE_BATCH:
+                    score_groups()
+                    buffered = 0
+            if on_site:
+                on_site(site)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        pending = set()
+        for job in archive.iter_sites():
+            if job[0] not in companies:
+                continue
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            pending.add(executor.submit(_extract_site, job))
+        collect(pending)
+
+    if groups:
+        score_groups()
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect, trim or reprocess the page archive")
+    parser.add_argument('--archive', default=DEFAULT_ARCHIVE_PATH)
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--max-mb', type=float, help='Apply size retention at this many MB')
+    parser.add_argument('--reprocess', action='store_true',
+                        help='Re-extract emails and rescore companies from archived pages (no network)')
+    parser.add_argument('--no-rescore', action='store_true', help='Only re-extract emails')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    args = parser.parse_args()
+
+    with PageArchive(args.archive) as archive:
+        if args.max_mb is not None:
+            removed = archive.enforce_retention(int(args.max_mb * 1024 * 1024))
+            print(f"Removed {removed} pages over {args.max_mb:g} MB")
+        if args.reprocess:
+            from database import SponsorDatabase
+            with SponsorDatabase(args.db) as db:
+                stats = reprocess(archive, db, args.workers, rescore=not args.no_rescore)
+            print(f"Reprocessed {stats['pages']} pages from {stats['sites']} sites in {stats['seconds']:.1f}s: "
+                  f"{stats['contacts']} new contacts, {stats['rescored']} companies rescored")
+        stats = archive.stats()
+        print(f"{stats['pages']} pages ({stats['urls']} URLs, {stats['sites']} sites), "
+              f"{stats['raw_bytes'] / 1e6:.1f} MB raw -> {stats['stored_bytes'] / 1e6:.1f} MB {stats['codec']} "
+              f"({stats['ratio']:.1f}x), file {stats['file_bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,167 @@
+"""
+Backup Manager for Integrated Sponsor Center
+Consistent snapshots of the SQLite database via the online backup API
+"""
+
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from worker import PeriodicWorker
+
+DEFAULT_BACKUP_DIR = "backups"
+
+# Pages copied per backup step; the source lock is released between steps
+BACKUP_STEP_PAGES = 256
+BACKUP_STEP_SLEEP = 0.005
+
+
+def _copy_database(source_path: str, target_path: str, pages: int = BACKUP_STEP_PAGES,
+                   sleep: float = BACKUP_STEP_SLEEP) -> None:
+    """Copy one SQLite database onto another in incremental page steps."""
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        with target:
+            source.backup(target, pages=pages, sleep=sleep)
+    finally:
+        target.close()
+        source.close()
+
+
+def create_backup(db_path: str = "sponsor_center.db", backup_dir: str = DEFAULT_BACKUP_DIR,
+                  compress: bool = True, pages: int = BACKUP_STEP_PAGES) -> Dict:
+    """Snapshot the database into backup_dir.
+
+    The backup API copies a few pages at a time, so writers are only blocked
+    for one step, and it restarts if another connection writes mid-copy,
+    which keeps the snapshot consistent. The copy is integrity-checked
+    before it is (optionally) gzip-compressed.
+    """
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    base_name = os.path.splitext(os.path.basename(db_path))[0]
+    snapshot_path = os.path.join(backup_dir, f"{base_name}_{stamp}.db")
+
+    started = time.perf_counter()
+    _copy_database(db_path, snapshot_path, pages=pages)
+
+    check = sqlite3.connect(snapshot_path)
+    try:
+        status = check.execute('PRAGMA quick_check').fetchone()[0]
+    finally:
+        check.close()
+    if status != 'ok':
+        os.remove(snapshot_path)
+        raise sqlite3.DatabaseError(f"Backup failed integrity check: {status}")
+
+    path = snapshot_path
+    if compress:
+        path = snapshot_path + '.gz'
+        with open(snapshot_path, 'rb') as src, gzip.open(path, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(snapshot_path)
+
+    return {
+        'path': path,
+        'file_name': os.path.basename(path),
+        'bytes': os.path.getsize(path),
+        'db_bytes': os.path.getsize(db_path),
+        'compressed': compress,
+        'seconds': time.perf_counter() - started,
+        'created_at': datetime.now().isoformat(),
+    }
+
+
+def list_backups(backup_dir: str = DEFAULT_BACKUP_DIR, db_path: str = "sponsor_center.db") -> List[Dict]:
+    """List snapshots for a database, newest first."""
+    base_name = os.path.splitext(os.path.basename(db_path))[0]
+    paths = glob.glob(os.path.join(backup_dir, f"{base_name}_*.db")) + \
+        glob.glob(os.path.join(backup_dir, f"{base_name}_*.db.gz"))
+    backups = [{
+        'path': path,
+        'file_name': os.path.basename(path),
+        'bytes': os.path.getsize(path),
+        'modified': os.path.getmtime(path),
+    } for path in paths]
+    backups.sort(key=lambda b: (b['modified'], b['file_name']), reverse=True)
+    return backups
+
+
+def prune_backups(keep: int, backup_dir: str = DEFAULT_BACKUP_DIR,
+                  db_path: str = "sponsor_center.db") -> List[str]:
+    """Delete all but the newest `keep` snapshots. Returns the removed paths."""
+    removed = []
+    for backup in list_backups(backup_dir, db_path)[max(keep, 0):]:
+        os.remove(backup['path'])
+        removed.append(backup['path'])
+    return removed
+
+
+def restore_backup(backup_path: str, db_path: str = "sponsor_center.db",
+                   pages: int = BACKUP_STEP_PAGES) -> None:
+    """Restore a snapshot over the live database.
+
+    Writes through the backup API rather than replacing the file, so open
+    connections (e.g. the app's cached one) see the restored data.
+    """
+    temp_path = None
+    source_path = backup_path
+    try:
+        if backup_path.endswith('.gz'):
+            fd, temp_path = tempfile.mkstemp(suffix='.db')
+            with os.fdopen(fd, 'wb') as dst, gzip.open(backup_path, 'rb') as src:
+                shutil.copyfileobj(src, dst)
+            source_path = temp_path
+        _copy_database(source_path, db_path, pages=pages)
+    finally:
+        if temp_path and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class BackupScheduler(PeriodicWorker):
+    """Background thread taking periodic snapshots with retention."""
+
+    def __init__(self, db_path: str = "sponsor_center.db", backup_dir: str = DEFAULT_BACKUP_DIR,
+                 interval_seconds: float = 24 * 3600, keep: int = 7, compress: bool = True):
+        super().__init__(interval_seconds, name="backup-scheduler")
+        self.db_path = db_path
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.compress = compress
+        self.last_backup: Optional[Dict] = None
+
+    def run_once(self) -> Dict:
+        """Take one snapshot and apply retention."""
+        result = create_backup(self.db_path, self.backup_dir, compress=self.compress)
+        prune_backups(self.keep, self.backup_dir, self.db_path)
+        self.last_backup = result
+        return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Back up or restore the sponsor database")
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--dir', default=DEFAULT_BACKUP_DIR)
+    parser.add_argument('--no-compress', action='store_true')
+    parser.add_argument('--keep', type=int, help='Prune to this many snapshots after backing up')
+    parser.add_argument('--restore', metavar='BACKUP', help='Restore this snapshot instead of backing up')
+    args = parser.parse_args()
+
+    if args.restore:
+        restore_backup(args.restore, args.db)
+        print(f"Restored {args.restore} into {args.db}")
+    else:
+        result = create_backup(args.db, args.dir, compress=not args.no_compress)
+        print(f"Backup written to {result['path']} ({result['bytes']:,} bytes, {result['seconds']:.2f}s)")
+        if args.keep is not None:
+            for path in prune_backups(args.keep, args.dir, args.db):
+                print(f"  pruned {path}")
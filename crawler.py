@@ -0,0 +1,307 @@
+"""
+Site Crawler for Integrated Sponsor Center
+EmailSearcher: finds contact emails on a company website
+"""
+
+import hashlib
+import html as html_lib
+import re
+import time
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlparse
+
+import dns.resolver
+import requests
+from bs4 import BeautifulSoup
+
+import metrics
+
+# Characters of visible text kept per site for relevance scoring
+MAX_SITE_TEXT = 50000
+
+HIDDEN_BLOCK_RE = re.compile(r'<(script|style|noscript|svg|template)\b.*?</\1\s*>|<!--.*?-->',
+                             re.IGNORECASE | re.DOTALL)
+TAG_RE = re.compile(r'<[^>]+>')
+WHITESPACE_RE = re.compile(r'\s+')
+
+PARSE_SECONDS = metrics.histogram('parse_seconds', "Page processing time by stage (links, emails, text, hash)",
+                                  ('stage',))
+CRAWL_SECONDS = metrics.histogram('crawl_site_seconds', "Whole-site crawl time, fetches and delays included",
+                                  ('mode',))
+
+
+def html_to_text(html: str) -> str:
+    """Visible text of a page (scripts, styles and tags removed, whitespace collapsed)."""
+    with PARSE_SECONDS.time(stage='text'):
+        text = TAG_RE.sub(' ', HIDDEN_BLOCK_RE.sub(' ', html))
+        return WHITESPACE_RE.sub(' ', html_lib.unescape(text)).strip()
+
+
+def content_hash(html: str) -> str:
+    """Hash of a page's markup without scripts, styles and comments.
+
+    Those blocks carry per-request nonces and timestamps on many sites,
+    so leaving them out keeps the hash stable while the content is.
+    """
+    with PARSE_SECONDS.time(stage='hash'):
+        stable = WHITESPACE_RE.sub(' ', HIDDEN_BLOCK_RE.sub(' ', html))
+    return hashlib.blake2b(stable.encode('utf-8', 'replace'), digest_size=16).hexdigest()
+
+
+class EmailSearcher:
+    def __init__(self, max_pages=3, delay=0.5, scraper_api_key=None, use_scraper_for_sites=False, fetcher=None,
+                 archive=None):
+        self.max_pages = max_pages
+        self.delay = delay
+        self.scraper_api_key = scraper_api_key
+        self.use_scraper_for_sites = use_scraper_for_sites
+        self.fetcher = fetcher
+        self.archive = archive  # optional PageArchive keeping the raw HTML of every page fetched
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        })
+        self.session.verify = False  # allow sites with cert issues
+        self.email_patterns = [
+            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
+            r'mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
+        ]
+        self.contact_pages = [
+            '/contact','/contact-us','/contact.html','/contact.php',
+            '/about','/about-us','/about.html','/about.php',
+            '/team','/staff','/people','/leadership',
+            '/support','/help','/customer-service',
+            '/legal','/privacy','/terms',
+            '/careers','/jobs','/employment'
+        ]
+
+    def _archive_page(self, url: str, html: Optional[str]):
+        if self.archive is not None and html:
+            try:
+                self.archive.store(url, html, content_hash(html))
+            except Exception:
+                pass  # archiving is best-effort and never fails a crawl
+
+    def get_page_content(self, url: str, force_scraper=False):
+        html = self._get_page_content(url, force_scraper)
+        self._archive_page(url, html)
+        return html
+
+    def _get_page_content(self, url: str, force_scraper=False):
+        if self.fetcher is not None:
+            # Direct first; escalate to ScraperAPI only when blocked (and enabled for sites)
+            page = self.fetcher.fetch(url, allow_scraper=force_scraper or self.use_scraper_for_sites,
+                                      force_scraper=force_scraper)
+            return page['html']
+        try:
+            # Only use ScraperAPI if explicitly forced or enabled for sites
+            if self.scraper_api_key and (force_scraper or self.use_scraper_for_sites):
+                scraper_url = f"http://api.scraperapi.com?api_key={self.scraper_api_key}&url={url}"
+                resp = requests.get(scraper_url, timeout=30, verify=False)
+            else:
+                resp = self.session.get(url, timeout=10)
+            resp.raise_for_status()
+            return resp.text
+        except Exception:
+            return None
+
+    def fetch_page(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+        """Fetch a page directly, optionally with conditional request headers.
+
+        Returns {'html', 'status', 'etag', 'last_modified', 'not_modified'};
+        html is None on failure and on a 304.
+        """
+        page = self._fetch_page(url, headers)
+        self._archive_page(url, page['html'])
+        return page
+
+    def _fetch_page(self, url: str, headers: Optional[Dict[str, str]] = None) -> Dict:
+        if self.fetcher is not None:
+            page = self.fetcher.fetch(url, allow_scraper=self.use_scraper_for_sites, headers=headers)
+            return {'html': page['html'], 'status': page['status'], 'etag': page.get('etag'),
+                    'last_modified': page.get('last_modified'), 'not_modified': page.get('not_modified', False)}
+        try:
+            resp = self.session.get(url, timeout=10, headers=headers)
+        except Exception:
+            return {'html': None, 'status': None, 'etag': None, 'last_modified': None, 'not_modified': False}
+        return {'html': resp.text if resp.status_code == 200 else None, 'status': resp.status_code,
+                'etag': resp.headers.get('ETag'), 'last_modified': resp.headers.get('Last-Modified'),
+                'not_modified': resp.status_code == 304}
+
+    def extract_emails_from_text(self, text: str):
+        emails = set()
+        with PARSE_SECONDS.time(stage='emails'):
+            for pattern in self.email_patterns:
+                for match in re.finditer(pattern, text, re.IGNORECASE):
+                    email = match.group(1) if 'mailto:' in pattern else match.group(0)
+                    email = email.lower().strip()
+                    if self.is_valid_email_format(email):
+                        emails.add(email)
+        return emails
+
+    def is_valid_email_format(self, email: str):
+        false_positives = {
+            'example@example.com','test@test.com','admin@admin.com',
+            'info@info.com','contact@contact.com','support@support.com',
+            'noreply@noreply.com','donotreply@donotreply.com'
+        }
+        if email in false_positives: return False
+        if any(ext in email for ext in ['.jpg','.png','.gif','.svg']): return False
+        return '@' in email and '.' in email.split('@')[-1]
+
+    def get_all_links(self, base_url: str, html: str):
+        links = set()
+        with PARSE_SECONDS.time(stage='links'):
+            soup = BeautifulSoup(html, 'html.parser')
+            base_domain = urlparse(base_url).netloc
+            for a in soup.find_all('a', href=True):
+                href = a['href'].strip()
+                if not href or href.startswith(('mailto:', 'javascript:', '#')):
+                    continue
+                full = urljoin(base_url, href)
+                if urlparse(full).netloc == base_domain:
+                    links.add(full.split('#')[0])
+        return links
+
+    def analyze_structure(self, base_url: str):
+        content = self.get_page_content(base_url)
+        if not content:
+            return []
+        return self.order_pages(base_url, content)
+
+    def order_pages(self, base_url: str, content: str):
+        all_links = self.get_all_links(base_url, content)
+        categories = {
+            'contact':[], 'about':[], 'team':[], 'support':[], 'other':[]
+        }
+        for link in all_links:
+            L = link.lower()
+            if any(k in L for k in ['contact','reach','touch']): categories['contact'].append(link)
+            elif any(k in L for k in ['about','company','who','story']): categories['about'].append(link)
+            elif any(k in L for k in ['team','staff','people','leadership','management']): categories['team'].append(link)
+            elif any(k in L for k in ['support','help','service','customer']): categories['support'].append(link)
+            else: categories['other'].append(link)
+        ordered = []
+        ordered += categories['contact'][:3]
+        ordered += categories['about'][:2]
+        ordered += categories['team'][:2]
+        ordered += categories['support'][:2]
+        ordered += categories['other'][:3]
+        if base_url not in ordered:
+            ordered.insert(0, base_url)
+        return ordered
+
+    def search_website_for_emails(self, base_url: str):
+        return self.crawl_site(base_url)['emails']
+
+    def crawl_site(self, base_url: str) -> Dict:
+        """Crawl a site's likely contact pages for emails, keeping the visible page text.
+
+        Returns {'emails': set, 'text': str, 'pages': int}. The homepage is
+        fetched once and reused for both link discovery and extraction.
+        Safe to call from several threads on one EmailSearcher.
+        """
+        with CRAWL_SECONDS.time(mode='crawl'):
+            return self._crawl_site(base_url)
+
+    def _crawl_site(self, base_url: str) -> Dict:
+        home = self.get_page_content(base_url)
+        if not home:
+            return {'emails': set(), 'text': '', 'pages': 0}
+        pages = self.order_pages(base_url, home)[:self.max_pages]
+        found = set()
+        texts = []
+        text_size = 0
+        crawled = 0
+        for i, url in enumerate(pages, 1):
+            content = home if url == base_url else self.get_page_content(url)
+            if not content:
+                continue
+            crawled += 1
+            page_emails = self.extract_emails_from_text(content)
+            found.update(page_emails)
+            if text_size < MAX_SITE_TEXT:
+                text = html_to_text(content)[:MAX_SITE_TEXT - text_size]
+                texts.append(text)
+                text_size += len(text)
+            # Early exit if we found 3+ emails to save API calls
+            if len(found) >= 3:
+                break
+            time.sleep(self.delay)
+        return {'emails': found, 'text': ' '.join(texts), 'pages': crawled}
+
+    def recrawl_site(self, base_url: str, known: Dict[str, Dict]) -> Dict:
+        """Re-crawl a site, skipping extraction for pages that have not changed.
+
+        known maps the previous crawl's page URLs (in crawl order) to their
+        stored {'etag', 'last_modified', 'content_hash', 'emails'}. Pages
+        are requested conditionally; a 304 or an unchanged content hash
+        reuses the stored emails without parsing the page. While the
+        homepage is unchanged the previous page list is reused, so links
+        are only re-discovered when it changes.
+
+        Returns {'emails': set, 'pages': [records for save_crawl], 'fetched',
+        'not_modified', 'unchanged', 'changed', 'failed'}. pages is empty if
+        the homepage could not be fetched.
+        """
+        with CRAWL_SECONDS.time(mode='recrawl'):
+            return self._recrawl_site(base_url, known)
+
+    def _recrawl_site(self, base_url: str, known: Dict[str, Dict]) -> Dict:
+        result = {'emails': set(), 'pages': [], 'fetched': 0, 'not_modified': 0,
+                  'unchanged': 0, 'changed': 0, 'failed': 0}
+
+        def visit(url: str):
+            previous = known.get(url) or {}
+            headers = {}
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+            page = self.fetch_page(url, headers or None)
+            record = {'url': url, 'etag': page['etag'] or previous.get('etag'),
+                      'last_modified': page['last_modified'] or previous.get('last_modified'),
+                      'content_hash': previous.get('content_hash'),
+                      'emails': previous.get('emails') or [], 'changed': False}
+            if page['not_modified'] and previous:
+                result['not_modified'] += 1
+            elif page['html'] is None:
+                result['failed'] += 1
+                return None, None
+            else:
+                result['fetched'] += 1
+                digest = content_hash(page['html'])
+                if digest == previous.get('content_hash'):
+                    result['unchanged'] += 1
+                else:
+                    result['changed'] += 1
+                    record.update(content_hash=digest, changed=True,
+                                  emails=sorted(self.extract_emails_from_text(page['html'])))
+            result['pages'].append(record)
+            result['emails'].update(record['emails'])
+            return record, page['html']
+
+        home, home_html = visit(base_url)
+        if home is None:
+            return result
+        if home['changed'] or len(known) <= 1:
+            if home_html is None:
+                pages = list(known) or [base_url]
+            else:
+                pages = self.order_pages(base_url, home_html)
+        else:
+            pages = list(known)
+        for url in pages[:self.max_pages]:
+            if url == base_url:
+                continue
+            time.sleep(self.delay)
+            visit(url)
+        return result
+
+    def verify_email_domain(self, email: str):
+        domain = email.split('@')[-1]
+        try:
+            mx = dns.resolver.resolve(domain, 'MX')
+            return len(mx) > 0
+        except Exception:
+            return False
@@ -5,10 +5,133 @@ SQLite database for storing companies, contacts, and email history
 
 import sqlite3
 import json
+import inspect
+import threading
+from time import perf_counter
+from collections import namedtuple
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from functools import lru_cache, wraps
+from typing import List, Dict, Optional, Set, Tuple, Iterable, Iterator, Any
 import os
 
+import metrics
+from domains import canonical_domain
+
+# Rows fetched per round trip by the streaming (iter_*) readers
+DEFAULT_CHUNK_SIZE = 500
+
+# Row shapes the streaming readers can yield
+ROW_TYPES = ('dict', 'record', 'tuple')
+
+# Max bound parameters per IN (...) lookup (stays under SQLite's default limit)
+SQL_PARAM_CHUNK = 900
+
+# Tables whose company_id is moved to the surviving row when duplicates are merged
+MERGE_REPOINT_TABLES = ('emails', 'interactions')
+
+# Tables with a uniqueness constraint on company_id: rows already present on the
+# survivor win, the duplicates' copies are dropped
+MERGE_DEDUPE_TABLES = ('contacts', 'campaign_members', 'crawl_pages')
+
+# Campaign the Email Center contact list is stored in
+DEFAULT_CAMPAIGN = 'Default'
+
+DB_QUERY_SECONDS = metrics.histogram('db_query_seconds', "SQL time by SponsorDatabase method and phase "
+                                     "(execute, fetch)", ('method', 'phase'), metrics.FAST_BUCKETS)
+
+
+@lru_cache(maxsize=64)
+def record_type(columns: Tuple[str, ...]):
+    """Get a compact namedtuple record class for a column layout (cached per layout)."""
+    return namedtuple('Record', columns, rename=True)
+
+
+# Name of the SponsorDatabase method running on each thread (set by query_label)
+_query_method = threading.local()
+
+
+def query_label(cls):
+    """Class decorator: label the SQL each method of cls runs with the method's name.
+
+    Nested calls label their own queries and restore the caller's label on
+    return. Generator methods are left alone (their body runs after the
+    call returns); they pass their label to TimedCursor themselves.
+    """
+    def labelled(name, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            outer = getattr(_query_method, 'name', None)
+            _query_method.name = name
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _query_method.name = outer
+        return wrapper
+
+    for name, func in list(vars(cls).items()):
+        if inspect.isfunction(func) and not inspect.isgeneratorfunction(func):
+            setattr(cls, name, labelled(name, func))
+    return cls
+
+
+class TimedCursor:
+    """A sqlite3 cursor that records each call's time under the SponsorDatabase method making it.
+
+    SQLite runs a statement up to its first row in execute; the rest of
+    a large result is read in fetch, so the two are recorded as separate
+    phases. The method label is the one given here, else the one set by
+    query_label. Other attributes (lastrowid, rowcount, ...) pass through.
+    """
+
+    __slots__ = ('_cursor', '_method')
+
+    def __init__(self, cursor: sqlite3.Cursor, method: str = None):
+        self._cursor = cursor
+        self._method = method
+
+    def _timed(self, phase: str, call, *args):
+        started = perf_counter()
+        try:
+            return call(*args)
+        finally:
+            method = self._method or getattr(_query_method, 'name', None) or 'unlabelled'
+            DB_QUERY_SECONDS.observe(perf_counter() - started, method=method, phase=phase)
+
+    def execute(self, sql: str, parameters=()):
+        self._timed('execute', self._cursor.execute, sql, parameters)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters):
+        self._timed('execute', self._cursor.executemany, sql, seq_of_parameters)
+        return self
+
+    def executescript(self, sql_script: str):
+        self._timed('execute', self._cursor.executescript, sql_script)
+        return self
+
+    def fetchone(self):
+        # A single row is already stepped to by execute
+        return self._cursor.fetchone()
+
+    def fetchmany(self, size: int = None):
+        return self._timed('fetch', self._cursor.fetchmany, size or self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._timed('fetch', self._cursor.fetchall)
+
+    def __iter__(self):
+        # Read in timed chunks rather than timing every row
+        while True:
+            rows = self.fetchmany(DEFAULT_CHUNK_SIZE)
+            if not rows:
+                return
+            yield from rows
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+@query_label
 class SponsorDatabase:
     def __init__(self, db_path: str = "sponsor_center.db"):
         """Initialize database connection and create tables if they don't exist."""
@@ -22,7 +145,19 @@ class SponsorDatabase:
         """Connect to the SQLite database."""
         self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
         self.conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        self.cursor = self.conn.cursor()
+        self.conn.create_function('canonical_domain', 1, canonical_domain, deterministic=True)
+        self.cursor = TimedCursor(self.conn.cursor())
+
+    def _ensure_columns(self, table: str, columns: Dict[str, str]) -> List[str]:
+        """Add any missing columns to an existing table. Returns the names added."""
+        self.cursor.execute(f'PRAGMA table_info({table})')
+        existing = {row['name'] for row in self.cursor.fetchall()}
+        added = []
+        for name, declaration in columns.items():
+            if name not in existing:
+                self.cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {declaration}')
+                added.append(name)
+        return added
     
     def create_tables(self):
         """Create database tables if they don't exist."""
@@ -66,7 +201,7 @@ class SponsorDatabase:
                 contact_id INTEGER,
                 subject TEXT NOT NULL,
                 body TEXT NOT NULL,
-                status TEXT DEFAULT 'drafted',  -- 'drafted', 'sent', 'replied', 'bounced'
+                status TEXT DEFAULT 'drafted',  -- 'drafted', 'queued', 'sent', 'failed', 'replied', 'bounced'
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 sent_at TIMESTAMP,
                 replied_at TIMESTAMP,
@@ -113,20 +248,387 @@ class SponsorDatabase:
                 search_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
+
+        # Campaigns table - named working sets of companies (e.g. the Email Center contact list)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS campaigns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Campaign members table - which companies belong to which campaign
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS campaign_members (
+                campaign_id INTEGER NOT NULL,
+                company_id INTEGER NOT NULL,
+                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (campaign_id, company_id),
+                FOREIGN KEY (campaign_id) REFERENCES campaigns (id) ON DELETE CASCADE,
+                FOREIGN KEY (company_id) REFERENCES companies (id) ON DELETE CASCADE
+            )
+        ''')
+
+        # Crawl pages table - validators and content hash of each page crawled for contacts
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crawl_pages (
+                company_id INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                position INTEGER NOT NULL DEFAULT 0,  -- crawl order within the site
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                emails TEXT,  -- JSON list extracted from this page
+                checked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (company_id, url),
+                FOREIGN KEY (company_id) REFERENCES companies (id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        ''')
+
+        # SERP cache table - one row per (engine, normalized query, location) result page
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS serp_cache (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                engine TEXT NOT NULL,
+                query_key TEXT NOT NULL,  -- normalized query (see serp.normalize_query)
+                location TEXT NOT NULL DEFAULT '',
+                query TEXT,  -- query as last issued, for display
+                via TEXT,  -- 'ScraperAPI' or 'direct'
+                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(engine, query_key, location)
+            )
+        ''')
+
+        # SERP cache results - extracted candidate URLs in rank order
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS serp_cache_results (
+                cache_id INTEGER NOT NULL,
+                rank INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (cache_id, rank),
+                FOREIGN KEY (cache_id) REFERENCES serp_cache (id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        ''')
+
+        # Scraper usage table - one row per outbound page fetch, with the credits it cost
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS scraper_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                search_id TEXT,
+                search_label TEXT,
+                url TEXT,
+                host TEXT,
+                tier TEXT NOT NULL,  -- 'direct' or 'scraper'
+                status_code INTEGER,
+                outcome TEXT NOT NULL,  -- 'ok', 'blocked', 'error'
+                credits INTEGER DEFAULT 0,
+                elapsed_ms INTEGER
+            )
+        ''')
+
+        # LLM response cache - one completion per hash of (model, messages, parameters)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,  -- see llm.cache_key
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                hits INTEGER DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_hit_at TIMESTAMP
+            ) WITHOUT ROWID
+        ''')
+
+        # LLM usage table - one row per completion request (cache hits included), with tokens, latency and cost
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS llm_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                model TEXT NOT NULL,
+                purpose TEXT,  -- e.g. 'draft', 'draft:batch'
+                prompt_tokens INTEGER DEFAULT 0,
+                completion_tokens INTEGER DEFAULT 0,
+                cost REAL DEFAULT 0,  -- USD, estimated from llm.MODEL_PRICES
+                latency_ms INTEGER,  -- until the last token
+                first_token_ms INTEGER,  -- streamed requests only
+                cached INTEGER DEFAULT 0,
+                outcome TEXT NOT NULL,  -- 'ok' or 'error'
+                error TEXT
+            )
+        ''')
+
+        # Inbox sources - one row per Maildir or mbox scanned for replies, with the mbox read position
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS inbox_sources (
+                source TEXT PRIMARY KEY,  -- absolute path
+                kind TEXT NOT NULL,  -- 'maildir' or 'mbox'
+                offset INTEGER DEFAULT 0,  -- mbox: bytes already processed
+                inode INTEGER,  -- mbox: detects a rotated or replaced file
+                messages INTEGER DEFAULT 0,
+                scanned_at TIMESTAMP
+            )
+        ''')
+
+        # Inbox seen-set - Maildir messages already processed, by their unique file name
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS inbox_seen (
+                source TEXT NOT NULL,
+                message_key TEXT NOT NULL,
+                PRIMARY KEY (source, message_key)
+            ) WITHOUT ROWID
+        ''')
+
+        # Columns added after the original schema
+        added = self._ensure_columns('companies', {
+            'canonical_domain': 'TEXT',  # registrable domain, the company dedupe key
+            'directory_category': 'TEXT',  # taxonomy category for well-known distributors
+            'last_crawled_at': 'TIMESTAMP',  # when the site was last crawled for contacts
+        })
+        self._ensure_columns('emails', {
+            'queued_at': 'TIMESTAMP',  # when the email entered the send queue
+            'attempts': 'INTEGER DEFAULT 0',  # SMTP delivery attempts
+            'next_attempt_at': 'TIMESTAMP',  # earliest retry after a transient failure (UTC)
+            'last_error': 'TEXT',
+            'message_id': 'TEXT',  # Message-ID header it was sent with, for matching replies
+        })
+
+        # Indexes backing the keyset (cursor) pagination sort orders
+        self.cursor.executescript('''
+            CREATE INDEX IF NOT EXISTS idx_companies_date ON companies (date_added, id);
+            CREATE INDEX IF NOT EXISTS idx_companies_type_date ON companies (type, date_added, id);
+            CREATE INDEX IF NOT EXISTS idx_emails_created ON emails (created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_emails_status_created ON emails (status, created_at, id);
+            CREATE INDEX IF NOT EXISTS idx_search_history_date ON search_history (search_date, id);
+            CREATE INDEX IF NOT EXISTS idx_companies_canonical_domain ON companies (canonical_domain);
+            CREATE INDEX IF NOT EXISTS idx_scraper_usage_created ON scraper_usage (created_at);
+            CREATE INDEX IF NOT EXISTS idx_llm_usage_created ON llm_usage (created_at);
+            CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache (created_at);
+            CREATE INDEX IF NOT EXISTS idx_emails_sent ON emails (sent_at);
+            CREATE INDEX IF NOT EXISTS idx_emails_message_id ON emails (message_id);
+            CREATE INDEX IF NOT EXISTS idx_companies_directory ON companies (directory_category, last_crawled_at);
+            CREATE INDEX IF NOT EXISTS idx_companies_last_crawled ON companies (last_crawled_at);
+            CREATE INDEX IF NOT EXISTS idx_campaign_members_added ON campaign_members (campaign_id, added_at, company_id);
+        ''')
+
+        if 'canonical_domain' in added:
+            self.backfill_canonical_domains()
+
         self.conn.commit()
     
+    # ==================== STREAMING READS ====================
+
+    def _iter_query(self, method: str, query: str, params: Tuple = (),
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, row_type: str = 'dict') -> Iterator[Any]:
+        """Stream query results in fixed-size fetchmany chunks.
+
+        Uses its own cursor so calls on the shared cursor can run while the
+        generator is consumed; its SQL time is recorded under method.
+        row_type is 'dict', 'record' (namedtuple) or 'tuple'.
+        """
+        if row_type not in ROW_TYPES:
+            raise ValueError(f"row_type must be one of {ROW_TYPES}, got {row_type!r}")
+
+        raw = self.conn.cursor()
+        raw.row_factory = None  # Plain tuples, converted below
+        cursor = TimedCursor(raw, method)
+        try:
+            cursor.execute(query, params)
+            columns = tuple(col[0] for col in cursor.description)
+            if row_type == 'record':
+                make = record_type(columns)._make
+            elif row_type == 'dict':
+                make = lambda row: dict(zip(columns, row))
+            else:
+                make = None
+
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                if make is None:
+                    yield from rows
+                else:
+                    for row in rows:
+                        yield make(row)
+        finally:
+            cursor.close()
+
+    def iter_companies(self, company_type: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                       row_type: str = 'dict') -> Iterator[Any]:
+        """Stream all companies (newest first), optionally filtered by type."""
+        if company_type:
+            query = 'SELECT * FROM companies WHERE type = ? ORDER BY date_added DESC, id DESC'
+            params = (company_type,)
+        else:
+            query = 'SELECT * FROM companies ORDER BY date_added DESC, id DESC'
+            params = ()
+        return self._iter_query('iter_companies', query, params, chunk_size, row_type)
+
+    def iter_search_companies(self, search_term: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                              row_type: str = 'dict') -> Iterator[Any]:
+        """Stream companies matching a search term by name, URL, or project/part."""
+        search_pattern = f'%{search_term}%'
+        return self._iter_query('iter_search_companies', '''
+            SELECT * FROM companies
+            WHERE name LIKE ? OR url LIKE ? OR project_part LIKE ? OR notes LIKE ?
+            ORDER BY relevance_score DESC, date_added DESC, id DESC
+        ''', (search_pattern, search_pattern, search_pattern, search_pattern), chunk_size, row_type)
+
+    def iter_contacts(self, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      row_type: str = 'dict') -> Iterator[Any]:
+        """Stream all contacts, grouped by company."""
+        return self._iter_query('iter_contacts', '''
+            SELECT * FROM contacts ORDER BY company_id, is_primary DESC, date_added ASC
+        ''', (), chunk_size, row_type)
+
+    def iter_emails(self, status: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    row_type: str = 'dict') -> Iterator[Any]:
+        """Stream all emails (newest first), optionally filtered by status."""
+        if status:
+            query = 'SELECT * FROM emails WHERE status = ? ORDER BY created_at DESC, id DESC'
+            params = (status,)
+        else:
+            query = 'SELECT * FROM emails ORDER BY created_at DESC, id DESC'
+            params = ()
+        return self._iter_query('iter_emails', query, params, chunk_size, row_type)
+
+    def iter_companies_with_contacts(self, company_type: str = None,
+                                     chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                     row_type: str = 'dict') -> Iterator[Any]:
+        """Stream companies with a comma-separated list of their contact emails."""
+        where = 'WHERE c.type = ?' if company_type else ''
+        params = (company_type,) if company_type else ()
+        return self._iter_query('iter_companies_with_contacts', f'''
+            SELECT
+                c.id, c.name, c.url, c.type, c.industry, c.project_part,
+                c.relevance_score, c.date_added, c.notes,
+                GROUP_CONCAT(ct.email, ', ') as emails
+            FROM companies c
+            LEFT JOIN contacts ct ON c.id = ct.company_id
+            {where}
+            GROUP BY c.id
+            ORDER BY c.date_added DESC, c.id DESC
+        ''', params, chunk_size, row_type)
+
+    # ==================== KEYSET PAGINATION ====================
+
+    def _keyset_page(self, table: str, key_columns: Tuple[str, ...], where: str = '',
+                     params: Tuple = (), page_size: int = 50, after: Optional[Tuple] = None,
+                     descending: bool = True) -> Dict:
+        """Fetch one page ordered by key_columns, starting after the given cursor.
+
+        The cursor is the key_columns values of the last row of the previous
+        page, so every page is an index seek rather than an OFFSET scan.
+        Returns {'rows', 'next_cursor', 'has_more'}.
+        """
+        conditions = [where] if where else []
+        params = tuple(params)
+        if after is not None:
+            op = '<' if descending else '>'
+            keys = ', '.join(key_columns)
+            placeholders = ', '.join('?' for _ in key_columns)
+            conditions.append(f'({keys}) {op} ({placeholders})')
+            params += tuple(after)
+
+        direction = 'DESC' if descending else 'ASC'
+        order_by = ', '.join(f'{col} {direction}' for col in key_columns)
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        # Fetch one extra row to know whether another page exists
+        self.cursor.execute(f'''
+            SELECT * FROM {table} {where_clause} ORDER BY {order_by} LIMIT ?
+        ''', params + (int(page_size) + 1,))
+        rows = [dict(row) for row in self.cursor.fetchall()]
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = tuple(rows[-1][col] for col in key_columns) if has_more else None
+        return {'rows': rows, 'next_cursor': next_cursor, 'has_more': has_more}
+
+    def estimate_count(self, table: str, where: str = '', params: Tuple = ()) -> int:
+        """Estimate the row count of a table.
+
+        Unfiltered counts use the rowid span (two index probes, an upper bound
+        when rows were deleted); filtered counts run over the covering index.
+        """
+        if where:
+            self.cursor.execute(f'SELECT COUNT(*) AS total FROM {table} WHERE {where}', params)
+            return self.cursor.fetchone()['total']
+        self.cursor.execute(f'SELECT MIN(rowid) AS lo, MAX(rowid) AS hi FROM {table}')
+        result = self.cursor.fetchone()
+        if result['hi'] is None:
+            return 0
+        return result['hi'] - result['lo'] + 1
+
+    def get_companies_page(self, company_type: str = None, page_size: int = 50,
+                           after: Optional[Tuple] = None) -> Dict:
+        """Get a page of companies (newest first), keyed on (date_added, id)."""
+        where, params = ('type = ?', (company_type,)) if company_type else ('', ())
+        page = self._keyset_page('companies', ('date_added', 'id'), where, params,
+                                 page_size, after)
+        page['total_estimate'] = self.estimate_count('companies', where, params)
+        return page
+
+    def search_companies_page(self, search_term: str, page_size: int = 50,
+                              after: Optional[Tuple] = None) -> Dict:
+        """Get a page of search matches, keyed on (relevance_score, date_added, id)."""
+        search_pattern = f'%{search_term}%'
+        where = '(name LIKE ? OR url LIKE ? OR project_part LIKE ? OR notes LIKE ?)'
+        params = (search_pattern,) * 4
+        page = self._keyset_page('companies', ('relevance_score', 'date_added', 'id'),
+                                 where, params, page_size, after)
+        page['total_estimate'] = self.estimate_count('companies', where, params)
+        return page
+
+    def get_emails_page(self, status: str = None, page_size: int = 50,
+                        after: Optional[Tuple] = None) -> Dict:
+        """Get a page of emails (newest first), keyed on (created_at, id)."""
+        where, params = ('status = ?', (status,)) if status else ('', ())
+        page = self._keyset_page('emails', ('created_at', 'id'), where, params,
+                                 page_size, after)
+        page['total_estimate'] = self.estimate_count('emails', where, params)
+        return page
+
+    def get_templates_page(self, category: str = None, page_size: int = 50,
+                           after: Optional[Tuple] = None) -> Dict:
+        """Get a page of templates (by name), keyed on (name, id)."""
+        where, params = ('category = ?', (category,)) if category else ('', ())
+        page = self._keyset_page('templates', ('name', 'id'), where, params,
+                                 page_size, after, descending=False)
+        page['total_estimate'] = self.estimate_count('templates', where, params)
+        return page
+
+    def get_search_history_page(self, page_size: int = 20, after: Optional[Tuple] = None) -> Dict:
+        """Get a page of search history (newest first), keyed on (search_date, id)."""
+        page = self._keyset_page('search_history', ('search_date', 'id'),
+                                 page_size=page_size, after=after)
+        page['total_estimate'] = self.estimate_count('search_history')
+        return page
+
     # ==================== COMPANY OPERATIONS ====================
     
     def add_company(self, name: str, url: str, company_type: str, 
                    industry: str = None, project_part: str = None,
                    relevance_score: int = 0, notes: str = None) -> int:
-        """Add a new company to the database."""
+        """Add a new company to the database.
+
+        Returns the existing company's ID if one with the same canonical
+        domain (e.g. www.x.com vs x.com) is already stored.
+        """
+        domain = canonical_domain(url)
+        if domain:
+            existing_id = self.get_company_id_by_domain(domain)
+            if existing_id:
+                return existing_id
         try:
             self.cursor.execute('''
-                INSERT INTO companies (name, url, type, industry, project_part, relevance_score, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (name, url, company_type, industry, project_part, relevance_score, notes))
+                INSERT INTO companies (name, url, type, industry, project_part, relevance_score, notes, canonical_domain)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (name, url, company_type, industry, project_part, relevance_score, notes, domain))
             self.conn.commit()
             return self.cursor.lastrowid
         except sqlite3.IntegrityError:
@@ -147,21 +649,185 @@ class SponsorDatabase:
         result = self.cursor.fetchone()
         return dict(result) if result else None
     
+    def get_company_id_by_domain(self, url_or_domain: str) -> Optional[int]:
+        """Get the ID of the company with the same canonical domain as a URL or domain."""
+        domain = canonical_domain(url_or_domain)
+        if not domain:
+            return None
+        self.cursor.execute('SELECT id FROM companies WHERE canonical_domain = ? ORDER BY id LIMIT 1', (domain,))
+        result = self.cursor.fetchone()
+        return result['id'] if result else None
+
+    def get_company_by_domain(self, url_or_domain: str) -> Optional[Dict]:
+        """Get a company by canonical domain (any URL on the company's site works)."""
+        company_id = self.get_company_id_by_domain(url_or_domain)
+        return self.get_company(company_id) if company_id else None
+
     def get_all_companies(self, company_type: str = None, limit: int = None) -> List[Dict]:
         """Get all companies, optionally filtered by type."""
         if company_type:
-            query = 'SELECT * FROM companies WHERE type = ? ORDER BY date_added DESC'
+            query = 'SELECT * FROM companies WHERE type = ? ORDER BY date_added DESC, id DESC'
             params = (company_type,)
         else:
-            query = 'SELECT * FROM companies ORDER BY date_added DESC'
+            query = 'SELECT * FROM companies ORDER BY date_added DESC, id DESC'
             params = ()
-        
+
         if limit:
-            query += f' LIMIT {limit}'
-        
+            query += ' LIMIT ?'
+            params += (int(limit),)
+
         self.cursor.execute(query, params)
         return [dict(row) for row in self.cursor.fetchall()]
     
+    def get_company_ids_by_domains(self, domains: List[str]) -> Dict[str, int]:
+        """Map canonical domains to company IDs for the domains that already exist."""
+        found = {}
+        domains = list(domains)
+        for start in range(0, len(domains), SQL_PARAM_CHUNK):
+            chunk = domains[start:start + SQL_PARAM_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            self.cursor.execute(f'''
+                SELECT MIN(id) AS id, canonical_domain FROM companies
+                WHERE canonical_domain IN ({placeholders}) GROUP BY canonical_domain
+            ''', chunk)
+            found.update((row['canonical_domain'], row['id']) for row in self.cursor.fetchall())
+        return found
+
+    def get_company_ids_by_urls(self, urls: List[str]) -> Dict[str, int]:
+        """Map URLs to company IDs for the URLs that already exist (one indexed lookup per chunk)."""
+        found = {}
+        urls = list(urls)
+        for start in range(0, len(urls), SQL_PARAM_CHUNK):
+            chunk = urls[start:start + SQL_PARAM_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            self.cursor.execute(f'SELECT id, url FROM companies WHERE url IN ({placeholders})', chunk)
+            found.update((row['url'], row['id']) for row in self.cursor.fetchall())
+        return found
+
+    def bulk_add_companies(self, companies: List[Dict], commit: bool = True) -> int:
+        """Insert many companies in one transaction, skipping existing URLs. Returns rows inserted.
+
+        Callers should dedupe on canonical domain first (see get_company_ids_by_domains).
+        """
+        before = self.conn.total_changes
+        self.cursor.executemany('''
+            INSERT OR IGNORE INTO companies
+                (name, url, type, industry, project_part, relevance_score, notes, canonical_domain)
+            VALUES (:name, :url, :type, :industry, :project_part, :relevance_score, :notes,
+                    canonical_domain(:url))
+        ''', companies)
+        inserted = self.conn.total_changes - before
+        if commit:
+            self.conn.commit()
+        return inserted
+
+    def bulk_add_contacts(self, contacts: List[Tuple[int, str]], commit: bool = True) -> int:
+        """Insert many (company_id, email) contacts, skipping duplicates. Returns rows inserted."""
+        before = self.conn.total_changes
+        self.cursor.executemany('''
+            INSERT OR IGNORE INTO contacts (company_id, email) VALUES (?, ?)
+        ''', contacts)
+        inserted = self.conn.total_changes - before
+        if commit:
+            self.conn.commit()
+        return inserted
+
+    def get_contact_emails(self, company_ids: List[int]) -> Dict[int, Set[str]]:
+        """Map company IDs to the emails already stored for them (companies without contacts are left out)."""
+        found: Dict[int, Set[str]] = {}
+        company_ids = list(company_ids)
+        for start in range(0, len(company_ids), SQL_PARAM_CHUNK):
+            chunk = company_ids[start:start + SQL_PARAM_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            self.cursor.execute(f'SELECT company_id, email FROM contacts WHERE company_id IN ({placeholders})', chunk)
+            for row in self.cursor.fetchall():
+                found.setdefault(row['company_id'], set()).add(row['email'])
+        return found
+
+    def update_relevance_scores(self, scores: Dict[int, int]) -> int:
+        """Set relevance_score for many companies ({company_id: score}) in one transaction."""
+        if not scores:
+            return 0
+        before = self.conn.total_changes
+        self.cursor.executemany('''
+            UPDATE companies SET relevance_score = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?
+        ''', [(score, company_id) for company_id, score in scores.items()])
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def update_company_industries(self, industries: Dict[int, str]) -> int:
+        """Set industry for many companies ({company_id: industry}) in one transaction."""
+        if not industries:
+            return 0
+        before = self.conn.total_changes
+        self.cursor.executemany('''
+            UPDATE companies SET industry = ?, last_updated = CURRENT_TIMESTAMP WHERE id = ?
+        ''', [(industry, company_id) for company_id, industry in industries.items()])
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def backfill_canonical_domains(self) -> int:
+        """Fill canonical_domain for rows that don't have one yet. Returns rows updated."""
+        self.cursor.execute('''
+            UPDATE companies SET canonical_domain = canonical_domain(url) WHERE canonical_domain IS NULL
+        ''')
+        updated = self.cursor.rowcount
+        self.conn.commit()
+        return updated
+
+    def merge_duplicate_companies(self) -> Dict:
+        """Merge companies that share a canonical domain into the oldest one.
+
+        Contacts, emails and interactions are moved to the surviving company,
+        which keeps the highest relevance score and fills its empty fields from
+        the duplicates. Runs as one transaction.
+        """
+        self.backfill_canonical_domains()
+        self.cursor.execute('''
+            SELECT canonical_domain, GROUP_CONCAT(id) AS ids FROM companies
+            WHERE canonical_domain IS NOT NULL
+            GROUP BY canonical_domain HAVING COUNT(*) > 1
+        ''')
+        groups = [(row['canonical_domain'], sorted(int(i) for i in row['ids'].split(',')))
+                  for row in self.cursor.fetchall()]
+
+        removed = 0
+        try:
+            for domain, ids in groups:
+                survivor, duplicates = ids[0], ids[1:]
+                placeholders = ', '.join('?' for _ in duplicates)
+
+                for table in MERGE_DEDUPE_TABLES:
+                    self.cursor.execute(f'''
+                        UPDATE OR IGNORE {table} SET company_id = ? WHERE company_id IN ({placeholders})
+                    ''', [survivor] + duplicates)
+                    self.cursor.execute(f'DELETE FROM {table} WHERE company_id IN ({placeholders})', duplicates)
+                for table in MERGE_REPOINT_TABLES:
+                    self.cursor.execute(f'''
+                        UPDATE {table} SET company_id = ? WHERE company_id IN ({placeholders})
+                    ''', [survivor] + duplicates)
+
+                self.cursor.execute(f'''
+                    UPDATE companies SET
+                        relevance_score = (SELECT MAX(relevance_score) FROM companies WHERE id IN (?, {placeholders})),
+                        industry = COALESCE(industry, (SELECT industry FROM companies
+                            WHERE id IN ({placeholders}) AND industry IS NOT NULL ORDER BY id LIMIT 1)),
+                        project_part = COALESCE(project_part, (SELECT project_part FROM companies
+                            WHERE id IN ({placeholders}) AND project_part IS NOT NULL ORDER BY id LIMIT 1)),
+                        notes = COALESCE(notes, (SELECT notes FROM companies
+                            WHERE id IN ({placeholders}) AND notes IS NOT NULL ORDER BY id LIMIT 1)),
+                        last_updated = ?
+                    WHERE id = ?
+                ''', [survivor] + duplicates * 4 + [datetime.now().isoformat(), survivor])
+                self.cursor.execute(f'DELETE FROM companies WHERE id IN ({placeholders})', duplicates)
+                removed += len(duplicates)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        return {'groups': len(groups), 'removed': removed}
+
     def update_company(self, company_id: int, **kwargs) -> bool:
         """Update company fields."""
         if not kwargs:
@@ -181,6 +847,8 @@ class SponsorDatabase:
     
     def delete_company(self, company_id: int) -> bool:
         """Delete a company and all related records."""
+        self.cursor.execute('DELETE FROM campaign_members WHERE company_id = ?', (company_id,))
+        self.cursor.execute('DELETE FROM crawl_pages WHERE company_id = ?', (company_id,))
         self.cursor.execute('DELETE FROM companies WHERE id = ?', (company_id,))
         self.conn.commit()
         return self.cursor.rowcount > 0
@@ -191,7 +859,7 @@ class SponsorDatabase:
         self.cursor.execute('''
             SELECT * FROM companies 
             WHERE name LIKE ? OR url LIKE ? OR project_part LIKE ? OR notes LIKE ?
-            ORDER BY relevance_score DESC, date_added DESC
+            ORDER BY relevance_score DESC, date_added DESC, id DESC
         ''', (search_pattern, search_pattern, search_pattern, search_pattern))
         return [dict(row) for row in self.cursor.fetchall()]
     
@@ -218,6 +886,25 @@ class SponsorDatabase:
         ''', (company_id,))
         return [dict(row) for row in self.cursor.fetchall()]
     
+    def get_primary_contacts(self, company_ids: List[int]) -> Dict[int, Dict]:
+        """Each company's first contact (primary first, then oldest) as {company_id: {'id', 'email'}}."""
+        ids = list(dict.fromkeys(company_ids))
+        contacts = {}
+        for start in range(0, len(ids), SQL_PARAM_CHUNK):
+            chunk = ids[start:start + SQL_PARAM_CHUNK]
+            placeholders = ', '.join('?' for _ in chunk)
+            self.cursor.execute(f'''
+                SELECT company_id, id, email FROM (
+                    SELECT company_id, id, email,
+                           ROW_NUMBER() OVER (PARTITION BY company_id
+                                              ORDER BY is_primary DESC, date_added ASC, id ASC) AS position
+                    FROM contacts WHERE company_id IN ({placeholders})
+                ) WHERE position = 1
+            ''', chunk)
+            contacts.update((row['company_id'], {'id': row['id'], 'email': row['email']})
+                            for row in self.cursor.fetchall())
+        return contacts
+
     def update_contact(self, contact_id: int, **kwargs) -> bool:
         """Update contact fields."""
         if not kwargs:
@@ -249,6 +936,19 @@ class SponsorDatabase:
         ''', (company_id, contact_id, subject, body, template_used))
         self.conn.commit()
         return self.cursor.lastrowid
+
+    def bulk_add_emails(self, emails: List[Tuple[int, Optional[int], str, str, Optional[str]]],
+                        commit: bool = True) -> int:
+        """Insert many drafted (company_id, contact_id, subject, body, template_used) emails. Returns rows inserted."""
+        before = self.conn.total_changes
+        self.cursor.executemany('''
+            INSERT INTO emails (company_id, contact_id, subject, body, template_used)
+            VALUES (?, ?, ?, ?, ?)
+        ''', emails)
+        inserted = self.conn.total_changes - before
+        if commit:
+            self.conn.commit()
+        return inserted
     
     def get_email(self, email_id: int) -> Optional[Dict]:
         """Get an email by ID."""
@@ -266,10 +966,10 @@ class SponsorDatabase:
     def get_all_emails(self, status: str = None) -> List[Dict]:
         """Get all emails, optionally filtered by status."""
         if status:
-            query = 'SELECT * FROM emails WHERE status = ? ORDER BY created_at DESC'
+            query = 'SELECT * FROM emails WHERE status = ? ORDER BY created_at DESC, id DESC'
             params = (status,)
         else:
-            query = 'SELECT * FROM emails ORDER BY created_at DESC'
+            query = 'SELECT * FROM emails ORDER BY created_at DESC, id DESC'
             params = ()
         
         self.cursor.execute(query, params)
@@ -293,6 +993,215 @@ class SponsorDatabase:
         self.conn.commit()
         return self.cursor.rowcount > 0
     
+    # ==================== SEND QUEUE OPERATIONS ====================
+
+    def queue_emails(self, email_ids: Optional[List[int]] = None, statuses: Tuple[str, ...] = ('drafted',)) -> int:
+        """Move emails in the given statuses (all, or just email_ids) into the send queue. Returns emails queued."""
+        status_list = ', '.join('?' for _ in statuses)
+        query = f'''
+            UPDATE emails SET status = 'queued', queued_at = CURRENT_TIMESTAMP, attempts = 0,
+                              next_attempt_at = NULL, last_error = NULL
+            WHERE status IN ({status_list})
+        '''
+        if email_ids is None:
+            self.cursor.execute(query, statuses)
+            queued = self.cursor.rowcount
+        else:
+            queued = 0
+            for start in range(0, len(email_ids), SQL_PARAM_CHUNK):
+                chunk = email_ids[start:start + SQL_PARAM_CHUNK]
+                placeholders = ', '.join('?' for _ in chunk)
+                self.cursor.execute(f'{query} AND id IN ({placeholders})', tuple(statuses) + tuple(chunk))
+                queued += self.cursor.rowcount
+        self.conn.commit()
+        return queued
+
+    def unqueue_emails(self) -> int:
+        """Return every queued email to the drafts. Returns emails moved."""
+        self.cursor.execute("UPDATE emails SET status = 'drafted', next_attempt_at = NULL WHERE status = 'queued'")
+        self.conn.commit()
+        return self.cursor.rowcount
+
+    def get_due_emails(self, limit: int = 100) -> List[Dict]:
+        """Queued emails ready to send (oldest first), with the recipient address and company name."""
+        self.cursor.execute('''
+            SELECT e.id, e.company_id, e.contact_id, e.subject, e.body, e.attempts,
+                   ct.email AS recipient, c.name AS company_name
+            FROM emails e
+            JOIN companies c ON c.id = e.company_id
+            LEFT JOIN contacts ct ON ct.id = e.contact_id
+            WHERE e.status = 'queued' AND (e.next_attempt_at IS NULL OR e.next_attempt_at <= datetime('now'))
+            ORDER BY e.queued_at, e.id
+            LIMIT ?
+        ''', (limit,))
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    def count_sent_today(self) -> int:
+        """Emails sent since local midnight (sent_at is stored in local time)."""
+        self.cursor.execute('''
+            SELECT COUNT(*) AS total FROM emails WHERE sent_at >= date('now', 'localtime')
+        ''')
+        return self.cursor.fetchone()['total']
+
+    def record_send_results(self, results: List[Dict]) -> int:
+        """Apply a batch of delivery outcomes in one transaction. Returns results applied.
+
+        Each result has email_id, company_id, subject, recipient and an
+        outcome: 'sent' (with message_id), 'retry' (with error and
+        retry_seconds; stays queued), or 'failed' / 'bounced' (with error).
+        Sends and bounces are also logged as interactions.
+        """
+        if not results:
+            return 0
+        now = datetime.now().isoformat()
+        sent = [(now, r['message_id'], r['email_id']) for r in results if r['outcome'] == 'sent']
+        retries = [(f"+{int(r['retry_seconds'])} seconds", r['error'], r['email_id'])
+                   for r in results if r['outcome'] == 'retry']
+        failed = [(r['outcome'], r['error'], r['email_id']) for r in results if r['outcome'] in ('failed', 'bounced')]
+        interactions = [(r['company_id'], 'email_sent', f"Sent '{r['subject']}' to {r['recipient']}", 'pending')
+                        for r in results if r['outcome'] == 'sent']
+        interactions += [(r['company_id'], 'email_bounced', f"'{r['subject']}' to {r['recipient']}: {r['error']}",
+                          'negative') for r in results if r['outcome'] == 'bounced']
+        try:
+            self.cursor.executemany('''
+                UPDATE emails SET status = 'sent', sent_at = ?, message_id = ?, attempts = attempts + 1,
+                                  next_attempt_at = NULL, last_error = NULL
+                WHERE id = ?
+            ''', sent)
+            self.cursor.executemany('''
+                UPDATE emails SET attempts = attempts + 1, next_attempt_at = datetime('now', ?), last_error = ?
+                WHERE id = ?
+            ''', retries)
+            self.cursor.executemany('''
+                UPDATE emails SET status = ?, attempts = attempts + 1, next_attempt_at = NULL, last_error = ?
+                WHERE id = ?
+            ''', failed)
+            self.cursor.executemany('''
+                INSERT INTO interactions (company_id, interaction_type, description, outcome) VALUES (?, ?, ?, ?)
+            ''', interactions)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return len(results)
+
+    def get_send_stats(self) -> Dict:
+        """Count emails by delivery status, plus sends today and retries pending."""
+        self.cursor.execute('''
+            SELECT status, COUNT(*) AS total, SUM(status = 'queued' AND attempts > 0) AS retrying
+            FROM emails GROUP BY status
+        ''')
+        stats = {'drafted': 0, 'queued': 0, 'sent': 0, 'failed': 0, 'replied': 0, 'bounced': 0, 'retrying': 0}
+        for row in self.cursor.fetchall():
+            stats[row['status']] = row['total']
+            stats['retrying'] += row['retrying'] or 0
+        stats['sent_today'] = self.count_sent_today()
+        return stats
+
+    def get_failed_emails(self, limit: int = 20) -> List[Dict]:
+        """Most recent failed or bounced emails with their last error."""
+        self.cursor.execute('''
+            SELECT e.id, e.subject, e.status, e.attempts, e.last_error, c.name AS company_name, ct.email AS recipient
+            FROM emails e
+            JOIN companies c ON c.id = e.company_id
+            LEFT JOIN contacts ct ON ct.id = e.contact_id
+            WHERE e.status IN ('failed', 'bounced')
+            ORDER BY e.id DESC LIMIT ?
+        ''', (limit,))
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    # ==================== INBOX INGESTION OPERATIONS ====================
+
+    def get_inbox_source(self, source: str) -> Optional[Dict]:
+        """The stored scan state of a Maildir or mbox path."""
+        self.cursor.execute('SELECT * FROM inbox_sources WHERE source = ?', (source,))
+        row = self.cursor.fetchone()
+        return dict(row) if row else None
+
+    def get_inbox_seen(self, source: str) -> Set[str]:
+        """Keys of the Maildir messages already processed."""
+        self.cursor.execute('SELECT message_key FROM inbox_seen WHERE source = ?', (source,))
+        return {row[0] for row in self.cursor.fetchall()}
+
+    def reset_inbox_source(self, source: str):
+        """Forget a source's scan state, so the next scan reads every message again."""
+        self.cursor.execute('DELETE FROM inbox_seen WHERE source = ?', (source,))
+        self.cursor.execute('DELETE FROM inbox_sources WHERE source = ?', (source,))
+        self.conn.commit()
+
+    def get_sent_email_index(self) -> Tuple[Dict[str, Dict], Dict[str, Dict]]:
+        """Sent emails for reply matching: ({message_id: email}, {recipient: latest email}).
+
+        Each email has id, company_id, subject, status and recipient
+        (lowercased); Message-IDs are stored as sent, angle brackets included.
+        """
+        self.cursor.execute('''
+            SELECT e.id, e.company_id, e.subject, e.status, e.message_id, LOWER(ct.email) AS recipient
+            FROM emails e LEFT JOIN contacts ct ON ct.id = e.contact_id
+            WHERE e.status IN ('sent', 'replied', 'bounced')
+            ORDER BY e.id
+        ''')
+        by_message_id = {}
+        by_recipient = {}
+        for row in self.cursor.fetchall():
+            email = dict(row)
+            if email['message_id']:
+                by_message_id[email['message_id']] = email
+            if email['recipient']:
+                by_recipient[email['recipient']] = email
+        return by_message_id, by_recipient
+
+    def apply_inbox_batch(self, source: str, kind: str, replies: List[Tuple[int, int, str, str]],
+                          bounces: List[Tuple[int, int, str]], seen_keys: List[str] = (),
+                          offset: Optional[int] = None, inode: Optional[int] = None,
+                          messages: int = 0) -> Dict:
+        """Record one batch of an inbox scan in a single transaction.
+
+        replies are (email_id, company_id, replied_at, description) and
+        mark sent (or bounced) emails replied; bounces are (email_id,
+        company_id, error) and mark sent emails bounced. Both add an
+        interaction. The source's seen keys / mbox offset advance in the
+        same transaction, so an interrupted scan resumes cleanly.
+        Returns {'replied', 'bounced'}: emails whose status changed.
+        """
+        try:
+            before = self.conn.total_changes
+            self.cursor.executemany('''
+                UPDATE emails SET status = 'replied', replied_at = ?
+                WHERE id = ? AND status IN ('sent', 'bounced')
+            ''', [(replied_at, email_id) for email_id, _, replied_at, _ in replies])
+            replied = self.conn.total_changes - before
+            before = self.conn.total_changes
+            self.cursor.executemany('''
+                UPDATE emails SET status = 'bounced', last_error = ? WHERE id = ? AND status = 'sent'
+            ''', [(error, email_id) for email_id, _, error in bounces])
+            bounced = self.conn.total_changes - before
+            self.cursor.executemany('''
+                INSERT INTO interactions (company_id, interaction_type, description, outcome) VALUES (?, ?, ?, ?)
+            ''', [(company_id, 'reply_received', description, 'pending') for _, company_id, _, description in replies]
+                + [(company_id, 'email_bounced', error, 'negative') for _, company_id, error in bounces])
+            self.cursor.executemany('''
+                INSERT OR IGNORE INTO inbox_seen (source, message_key) VALUES (?, ?)
+            ''', [(source, key) for key in seen_keys])
+            self.cursor.execute('''
+                INSERT INTO inbox_sources (source, kind, offset, inode, messages, scanned_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (source) DO UPDATE SET
+                    kind = excluded.kind, offset = COALESCE(excluded.offset, offset),
+                    inode = COALESCE(excluded.inode, inode), messages = messages + excluded.messages,
+                    scanned_at = CURRENT_TIMESTAMP
+            ''', (source, kind, offset, inode, messages))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return {'replied': replied, 'bounced': bounced}
+
+    def get_inbox_stats(self) -> List[Dict]:
+        """Scan state of every inbox source."""
+        self.cursor.execute('SELECT source, kind, messages, scanned_at FROM inbox_sources ORDER BY source')
+        return [dict(row) for row in self.cursor.fetchall()]
+
     def delete_email(self, email_id: int) -> bool:
         """Delete an email."""
         self.cursor.execute('DELETE FROM emails WHERE id = ?', (email_id,))
@@ -350,14 +1259,21 @@ class SponsorDatabase:
         result = self.cursor.fetchone()
         return dict(result) if result else None
     
-    def update_template_usage(self, template_id: int) -> bool:
-        """Increment template usage counter and update last_used timestamp."""
+    def get_template_by_name(self, name: str) -> Optional[Dict]:
+        """Get a template by its (unique) name."""
+        self.cursor.execute('SELECT * FROM templates WHERE name = ?', (name,))
+        result = self.cursor.fetchone()
+        return dict(result) if result else None
+
+    def update_template_usage(self, template_id: int, count: int = 1, commit: bool = True) -> bool:
+        """Increment template usage counter (by count emails) and update last_used timestamp."""
         self.cursor.execute('''
             UPDATE templates 
-            SET times_used = times_used + 1, last_used = ?
+            SET times_used = times_used + ?, last_used = ?
             WHERE id = ?
-        ''', (datetime.now().isoformat(), template_id))
-        self.conn.commit()
+        ''', (count, datetime.now().isoformat(), template_id))
+        if commit:
+            self.conn.commit()
         return self.cursor.rowcount > 0
     
     def delete_template(self, template_id: int) -> bool:
@@ -380,10 +1296,518 @@ class SponsorDatabase:
     def get_recent_searches(self, limit: int = 10) -> List[Dict]:
         """Get recent searches."""
         self.cursor.execute('''
-            SELECT * FROM search_history ORDER BY search_date DESC LIMIT ?
+            SELECT * FROM search_history ORDER BY search_date DESC, id DESC LIMIT ?
         ''', (limit,))
         return [dict(row) for row in self.cursor.fetchall()]
     
+    # ==================== CAMPAIGN OPERATIONS ====================
+
+    def get_or_create_campaign(self, name: str = DEFAULT_CAMPAIGN) -> int:
+        """Get a campaign's ID, creating it if needed."""
+        self.cursor.execute('INSERT OR IGNORE INTO campaigns (name) VALUES (?)', (name,))
+        self.conn.commit()
+        self.cursor.execute('SELECT id FROM campaigns WHERE name = ?', (name,))
+        return self.cursor.fetchone()['id']
+
+    def add_campaign_member(self, campaign_id: int, company_id: int) -> bool:
+        """Add a company to a campaign. Returns False if it was already a member."""
+        self.cursor.execute('''
+            INSERT OR IGNORE INTO campaign_members (campaign_id, company_id) VALUES (?, ?)
+        ''', (campaign_id, company_id))
+        self.conn.commit()
+        return self.cursor.rowcount > 0
+
+    def remove_campaign_member(self, campaign_id: int, company_id: int) -> bool:
+        """Remove a company from a campaign."""
+        self.cursor.execute('''
+            DELETE FROM campaign_members WHERE campaign_id = ? AND company_id = ?
+        ''', (campaign_id, company_id))
+        self.conn.commit()
+        return self.cursor.rowcount > 0
+
+    def is_campaign_member(self, campaign_id: int, company_id: int) -> bool:
+        """Check campaign membership (primary key lookup)."""
+        self.cursor.execute('''
+            SELECT 1 FROM campaign_members WHERE campaign_id = ? AND company_id = ?
+        ''', (campaign_id, company_id))
+        return self.cursor.fetchone() is not None
+
+    def clear_campaign(self, campaign_id: int) -> int:
+        """Remove every member from a campaign. Returns the number removed."""
+        self.cursor.execute('DELETE FROM campaign_members WHERE campaign_id = ?', (campaign_id,))
+        self.conn.commit()
+        return self.cursor.rowcount
+
+    def iter_campaign_members(self, campaign_id: int, company_type: str = None,
+                              chunk_size: int = DEFAULT_CHUNK_SIZE,
+                              row_type: str = 'dict') -> Iterator[Any]:
+        """Stream a campaign's companies (in the order added) with their contact emails."""
+        type_filter = 'AND c.type = ?' if company_type else ''
+        params = (campaign_id, company_type) if company_type else (campaign_id,)
+        return self._iter_query('iter_campaign_members', f'''
+            SELECT
+                c.id, c.name, c.url, c.type, c.industry, c.project_part, c.relevance_score,
+                m.added_at,
+                (SELECT GROUP_CONCAT(ct.email, ', ') FROM contacts ct WHERE ct.company_id = c.id) AS emails
+            FROM campaign_members m
+            JOIN companies c ON c.id = m.company_id
+            WHERE m.campaign_id = ? {type_filter}
+            ORDER BY m.added_at, c.id
+        ''', params, chunk_size, row_type)
+
+    def get_campaign_members_page(self, campaign_id: int, company_type: str = None, page_size: int = 50,
+                                  after: Optional[Tuple] = None) -> Dict:
+        """Get a page of a campaign's companies (in the order added), keyed on (added_at, company_id).
+
+        Rows have the same columns as iter_campaign_members.
+        Returns {'rows', 'next_cursor', 'has_more'}.
+        """
+        conditions = ['m.campaign_id = ?']
+        params = (campaign_id,)
+        if company_type:
+            conditions.append('c.type = ?')
+            params += (company_type,)
+        if after is not None:
+            conditions.append('(m.added_at, m.company_id) > (?, ?)')
+            params += tuple(after)
+
+        # Fetch one extra row to know whether another page exists
+        self.cursor.execute(f'''
+            SELECT
+                c.id, c.name, c.url, c.type, c.industry, c.project_part, c.relevance_score,
+                m.added_at,
+                (SELECT GROUP_CONCAT(ct.email, ', ') FROM contacts ct WHERE ct.company_id = c.id) AS emails
+            FROM campaign_members m
+            JOIN companies c ON c.id = m.company_id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY m.added_at, m.company_id
+            LIMIT ?
+        ''', params + (int(page_size) + 1,))
+        rows = [dict(row) for row in self.cursor.fetchall()]
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = (rows[-1]['added_at'], rows[-1]['id']) if has_more else None
+        return {'rows': rows, 'next_cursor': next_cursor, 'has_more': has_more}
+
+    def get_campaign_version(self, campaign_id: int) -> Tuple[int, int]:
+        """(member count, newest member rowid) - changes whenever members are added or removed."""
+        self.cursor.execute('''
+            SELECT COUNT(*) AS total, COALESCE(MAX(rowid), 0) AS newest FROM campaign_members WHERE campaign_id = ?
+        ''', (campaign_id,))
+        row = self.cursor.fetchone()
+        return row['total'], row['newest']
+
+    def count_campaign_members(self, campaign_id: int, with_emails: bool = False) -> Dict[str, int]:
+        """Count a campaign's members by company type (with with_emails, only those with a contact)."""
+        email_filter = 'AND EXISTS (SELECT 1 FROM contacts ct WHERE ct.company_id = c.id)' if with_emails else ''
+        self.cursor.execute(f'''
+            SELECT c.type, COUNT(*) AS total
+            FROM campaign_members m JOIN companies c ON c.id = m.company_id
+            WHERE m.campaign_id = ? {email_filter}
+            GROUP BY c.type
+        ''', (campaign_id,))
+        return {row['type']: row['total'] for row in self.cursor.fetchall()}
+
+    # ==================== SERP CACHE OPERATIONS ====================
+
+    def get_serp_cache(self, engine: str, query_key: str, location: str = '',
+                       max_age_seconds: Optional[float] = None) -> Optional[Dict]:
+        """Get a cached result page's URLs (in rank order) if it is fresher than max_age_seconds."""
+        age_filter = "AND fetched_at >= datetime('now', ?)" if max_age_seconds is not None else ''
+        params = (engine, query_key, location)
+        if max_age_seconds is not None:
+            params += (f'-{int(max_age_seconds)} seconds',)
+        self.cursor.execute(f'''
+            SELECT id, query, via, fetched_at FROM serp_cache
+            WHERE engine = ? AND query_key = ? AND location = ? {age_filter}
+        ''', params)
+        row = self.cursor.fetchone()
+        if not row:
+            return None
+        entry = dict(row)
+        self.cursor.execute('''
+            SELECT url FROM serp_cache_results WHERE cache_id = ? ORDER BY rank
+        ''', (entry['id'],))
+        entry['urls'] = [r['url'] for r in self.cursor.fetchall()]
+        return entry
+
+    def put_serp_cache(self, engine: str, query_key: str, location: str, query: str,
+                       urls: List[str], via: str = None) -> int:
+        """Store (or refresh) a result page's URLs in rank order. Returns the cache entry ID."""
+        try:
+            self.cursor.execute('''
+                INSERT INTO serp_cache (engine, query_key, location, query, via)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (engine, query_key, location) DO UPDATE SET
+                    query = excluded.query, via = excluded.via, fetched_at = CURRENT_TIMESTAMP
+            ''', (engine, query_key, location, query, via))
+            self.cursor.execute('''
+                SELECT id FROM serp_cache WHERE engine = ? AND query_key = ? AND location = ?
+            ''', (engine, query_key, location))
+            cache_id = self.cursor.fetchone()['id']
+            self.cursor.execute('DELETE FROM serp_cache_results WHERE cache_id = ?', (cache_id,))
+            self.cursor.executemany('''
+                INSERT INTO serp_cache_results (cache_id, rank, url) VALUES (?, ?, ?)
+            ''', [(cache_id, rank, url) for rank, url in enumerate(urls, 1)])
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return cache_id
+
+    def purge_serp_cache(self, max_age_seconds: Optional[float] = None) -> int:
+        """Delete cache entries older than max_age_seconds (all entries if None). Returns the number removed."""
+        if max_age_seconds is None:
+            stale = 'SELECT id FROM serp_cache'
+            params = ()
+        else:
+            stale = "SELECT id FROM serp_cache WHERE fetched_at < datetime('now', ?)"
+            params = (f'-{int(max_age_seconds)} seconds',)
+        self.cursor.execute(f'DELETE FROM serp_cache_results WHERE cache_id IN ({stale})', params)
+        self.cursor.execute(f'DELETE FROM serp_cache WHERE id IN ({stale})', params)
+        removed = self.cursor.rowcount
+        self.conn.commit()
+        return removed
+
+    def get_serp_cache_stats(self) -> Dict:
+        """Count cached result pages and URLs."""
+        self.cursor.execute('''
+            SELECT COUNT(*) AS entries, MIN(fetched_at) AS oldest, MAX(fetched_at) AS newest
+            FROM serp_cache
+        ''')
+        stats = dict(self.cursor.fetchone())
+        self.cursor.execute('SELECT COUNT(*) AS total FROM serp_cache_results')
+        stats['urls'] = self.cursor.fetchone()['total']
+        return stats
+
+    # ==================== DISTRIBUTOR DIRECTORY OPERATIONS ====================
+
+    def set_directory_categories(self, categories: Dict[int, str]) -> int:
+        """Mark companies as directory distributors ({company_id: category}) in one transaction."""
+        if not categories:
+            return 0
+        before = self.conn.total_changes
+        self.cursor.executemany('''
+            UPDATE companies SET directory_category = ? WHERE id = ? AND directory_category IS NOT ?
+        ''', [(category, company_id, category) for company_id, category in categories.items()])
+        self.conn.commit()
+        return self.conn.total_changes - before
+
+    def get_directory_companies(self, categories: Optional[List[str]] = None) -> List[Dict]:
+        """Directory distributors (optionally only some categories) with their contact emails as a list."""
+        where = 'c.directory_category IS NOT NULL'
+        params: Tuple = ()
+        if categories is not None:
+            if not categories:
+                return []
+            where = f"c.directory_category IN ({', '.join('?' for _ in categories)})"
+            params = tuple(categories)
+        self.cursor.execute(f'''
+            SELECT c.*, (SELECT GROUP_CONCAT(ct.email, ', ') FROM contacts ct WHERE ct.company_id = c.id) AS emails
+            FROM companies c
+            WHERE {where}
+            ORDER BY c.directory_category, c.id
+        ''', params)
+        companies = []
+        for row in self.cursor.fetchall():
+            company = dict(row)
+            company['emails'] = company['emails'].split(', ') if company['emails'] else []
+            companies.append(company)
+        return companies
+
+    def get_stale_directory_companies(self, max_age_seconds: float) -> List[Dict]:
+        """Directory distributors never crawled, or last crawled more than max_age_seconds ago (oldest first)."""
+        self.cursor.execute('''
+            SELECT id, name, url, directory_category, last_crawled_at FROM companies
+            WHERE directory_category IS NOT NULL
+              AND (last_crawled_at IS NULL OR last_crawled_at < datetime('now', ?))
+            ORDER BY last_crawled_at IS NOT NULL, last_crawled_at, id
+        ''', (f'-{int(max_age_seconds)} seconds',))
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    def record_crawl(self, company_id: int, emails: Iterable[str]) -> int:
+        """Store the emails found on a company's site and stamp last_crawled_at. Returns new contacts."""
+        inserted = self.bulk_add_contacts([(company_id, email) for email in emails], commit=False)
+        self.cursor.execute('''
+            UPDATE companies SET last_crawled_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', (company_id,))
+        self.conn.commit()
+        return inserted
+
+    def get_directory_stats(self) -> Dict:
+        """Count directory distributors, how many have been crawled and their contacts."""
+        self.cursor.execute('''
+            SELECT COUNT(*) AS companies, COUNT(last_crawled_at) AS crawled,
+                   MIN(last_crawled_at) AS oldest_crawl,
+                   (SELECT COUNT(*) FROM contacts ct JOIN companies c2 ON c2.id = ct.company_id
+                    WHERE c2.directory_category IS NOT NULL) AS contacts
+            FROM companies WHERE directory_category IS NOT NULL
+        ''')
+        return dict(self.cursor.fetchone())
+
+    # ==================== RE-CRAWL OPERATIONS ====================
+
+    def get_recrawl_candidates(self, max_age_seconds: float, limit: Optional[int] = None,
+                               company_type: str = None) -> List[Dict]:
+        """Companies not crawled within max_age_seconds, most overdue first.
+
+        Overdue is days since the last crawl (or since the company was added,
+        if never crawled), weighted up by relevance_score, so relevant
+        companies are refreshed before equally stale irrelevant ones.
+        """
+        type_filter = 'AND type = ?' if company_type else ''
+        params: Tuple = (f'-{int(max_age_seconds)} seconds',)
+        if company_type:
+            params += (company_type,)
+        limit_clause = ''
+        if limit is not None:
+            limit_clause = 'LIMIT ?'
+            params += (int(limit),)
+        self.cursor.execute(f'''
+            SELECT id, name, url, type, relevance_score, last_crawled_at,
+                   (julianday('now') - julianday(COALESCE(last_crawled_at, date_added)))
+                       * (1 + MAX(relevance_score, 0) / 50.0) AS priority
+            FROM companies
+            WHERE (last_crawled_at IS NULL OR last_crawled_at < datetime('now', ?)) {type_filter}
+            ORDER BY priority DESC, id
+            {limit_clause}
+        ''', params)
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    def get_crawl_pages(self, company_id: int) -> Dict[str, Dict]:
+        """A company's pages from its last crawl, in crawl order: {url: {etag, last_modified, content_hash, emails}}."""
+        self.cursor.execute('''
+            SELECT url, etag, last_modified, content_hash, emails FROM crawl_pages
+            WHERE company_id = ? ORDER BY position
+        ''', (company_id,))
+        pages = {}
+        for row in self.cursor.fetchall():
+            page = dict(row)
+            page['emails'] = json.loads(page['emails']) if page['emails'] else []
+            pages[page.pop('url')] = page
+        return pages
+
+    def save_crawl(self, company_id: int, pages: List[Dict], emails: Iterable[str]) -> int:
+        """Store a crawl's page records and new contacts and stamp last_crawled_at, in one transaction.
+
+        pages are the records from EmailSearcher.recrawl_site; pages no
+        longer crawled are forgotten. Returns the number of new contacts.
+        """
+        try:
+            self.cursor.executemany('''
+                INSERT INTO crawl_pages (company_id, url, position, etag, last_modified, content_hash, emails)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (company_id, url) DO UPDATE SET
+                    position = excluded.position, etag = excluded.etag,
+                    last_modified = excluded.last_modified, emails = excluded.emails,
+                    checked_at = CURRENT_TIMESTAMP,
+                    changed_at = CASE WHEN content_hash IS excluded.content_hash THEN changed_at
+                                      ELSE CURRENT_TIMESTAMP END,
+                    content_hash = excluded.content_hash
+            ''', [(company_id, page['url'], position, page.get('etag'), page.get('last_modified'),
+                   page.get('content_hash'), json.dumps(page.get('emails') or []))
+                  for position, page in enumerate(pages)])
+            urls = [page['url'] for page in pages]
+            placeholders = ', '.join('?' for _ in urls)
+            self.cursor.execute(f'''
+                DELETE FROM crawl_pages WHERE company_id = ? AND url NOT IN ({placeholders})
+            ''', [company_id] + urls)
+            inserted = self.bulk_add_contacts([(company_id, email) for email in emails], commit=False)
+            self.cursor.execute('''
+                UPDATE companies SET last_crawled_at = CURRENT_TIMESTAMP WHERE id = ?
+            ''', (company_id,))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return inserted
+
+    def get_crawl_stats(self, max_age_seconds: float) -> Dict:
+        """Count crawled, never-crawled and stale companies and the pages tracked for them."""
+        self.cursor.execute('''
+            SELECT COUNT(*) AS companies, COUNT(last_crawled_at) AS crawled,
+                   SUM(last_crawled_at IS NULL OR last_crawled_at < datetime('now', ?)) AS stale,
+                   MIN(last_crawled_at) AS oldest_crawl
+            FROM companies
+        ''', (f'-{int(max_age_seconds)} seconds',))
+        stats = dict(self.cursor.fetchone())
+        stats['stale'] = stats['stale'] or 0
+        self.cursor.execute('SELECT COUNT(*) AS total FROM crawl_pages')
+        stats['pages'] = self.cursor.fetchone()['total']
+        return stats
+
+    # ==================== SCRAPER USAGE OPERATIONS ====================
+
+    def log_fetch(self, url: str, host: str, tier: str, status_code: Optional[int], outcome: str,
+                  credits: int = 0, elapsed_ms: int = None, search_id: str = None,
+                  search_label: str = None) -> int:
+        """Record one outbound fetch and the credits it cost."""
+        self.cursor.execute('''
+            INSERT INTO scraper_usage (url, host, tier, status_code, outcome, credits, elapsed_ms,
+                                       search_id, search_label)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (url, host, tier, status_code, outcome, credits, elapsed_ms, search_id, search_label))
+        self.conn.commit()
+        return self.cursor.lastrowid
+
+    def get_scraper_credits_used(self, since: str = None) -> int:
+        """Total credits metered since a UTC timestamp (default: since UTC midnight)."""
+        if since is None:
+            self.cursor.execute('''
+                SELECT COALESCE(SUM(credits), 0) AS total FROM scraper_usage
+                WHERE created_at >= datetime('now', 'start of day')
+            ''')
+        else:
+            self.cursor.execute('''
+                SELECT COALESCE(SUM(credits), 0) AS total FROM scraper_usage WHERE created_at >= ?
+            ''', (since,))
+        return self.cursor.fetchone()['total']
+
+    def get_fetch_usage(self, days: int = 1) -> Dict:
+        """Summarize fetches over the last N UTC days (1 = today) by tier and outcome."""
+        self.cursor.execute('''
+            SELECT tier, outcome, COUNT(*) AS requests, COALESCE(SUM(credits), 0) AS credits
+            FROM scraper_usage
+            WHERE created_at >= datetime('now', 'start of day', ?)
+            GROUP BY tier, outcome
+        ''', (f'-{max(days, 1) - 1} days',))
+        usage = {'requests': 0, 'credits': 0, 'direct_ok': 0, 'direct_blocked': 0,
+                 'scraper_ok': 0, 'scraper_failed': 0, 'errors': 0}
+        for row in self.cursor.fetchall():
+            usage['requests'] += row['requests']
+            usage['credits'] += row['credits']
+            if row['tier'] == 'direct' and row['outcome'] == 'ok':
+                usage['direct_ok'] += row['requests']
+            elif row['tier'] == 'direct' and row['outcome'] == 'blocked':
+                usage['direct_blocked'] += row['requests']
+            elif row['tier'] == 'scraper' and row['outcome'] == 'ok':
+                usage['scraper_ok'] += row['requests']
+            elif row['tier'] == 'scraper':
+                usage['scraper_failed'] += row['requests']
+            else:
+                usage['errors'] += row['requests']
+        return usage
+
+    def get_recent_search_usage(self, limit: int = 5) -> List[Dict]:
+        """Credits and request counts for the most recent searches."""
+        self.cursor.execute('''
+            SELECT search_id, search_label, MIN(created_at) AS started_at,
+                   COUNT(*) AS requests, COALESCE(SUM(credits), 0) AS credits
+            FROM scraper_usage
+            WHERE search_id IS NOT NULL
+            GROUP BY search_id
+            ORDER BY MAX(id) DESC
+            LIMIT ?
+        ''', (limit,))
+        return [dict(row) for row in self.cursor.fetchall()]
+
+    # ==================== LLM GATEWAY OPERATIONS ====================
+
+    def get_llm_cache(self, cache_key: str, max_age_seconds: Optional[float] = None) -> Optional[Dict]:
+        """Get a cached completion if it is fresher than max_age_seconds, counting the hit."""
+        age_filter = "AND created_at >= datetime('now', ?)" if max_age_seconds is not None else ''
+        params = (cache_key,)
+        if max_age_seconds is not None:
+            params += (f'-{int(max_age_seconds)} seconds',)
+        self.cursor.execute(f'''
+            SELECT cache_key, model, response, prompt_tokens, completion_tokens, hits, created_at
+            FROM llm_cache WHERE cache_key = ? {age_filter}
+        ''', params)
+        row = self.cursor.fetchone()
+        if not row:
+            return None
+        self.cursor.execute('''
+            UPDATE llm_cache SET hits = hits + 1, last_hit_at = CURRENT_TIMESTAMP WHERE cache_key = ?
+        ''', (cache_key,))
+        self.conn.commit()
+        return dict(row)
+
+    def put_llm_cache(self, cache_key: str, model: str, response: str, prompt_tokens: int = None,
+                      completion_tokens: int = None):
+        """Store (or replace) a completion under its cache key."""
+        self.cursor.execute('''
+            INSERT INTO llm_cache (cache_key, model, response, prompt_tokens, completion_tokens)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (cache_key) DO UPDATE SET
+                model = excluded.model, response = excluded.response,
+                prompt_tokens = excluded.prompt_tokens, completion_tokens = excluded.completion_tokens,
+                hits = 0, created_at = CURRENT_TIMESTAMP, last_hit_at = NULL
+        ''', (cache_key, model, response, prompt_tokens, completion_tokens))
+        self.conn.commit()
+
+    def purge_llm_cache(self, max_age_seconds: Optional[float] = None) -> int:
+        """Delete cached completions older than max_age_seconds (all if None). Returns the number removed."""
+        if max_age_seconds is None:
+            self.cursor.execute('DELETE FROM llm_cache')
+        else:
+            self.cursor.execute("DELETE FROM llm_cache WHERE created_at < datetime('now', ?)",
+                                (f'-{int(max_age_seconds)} seconds',))
+        removed = self.cursor.rowcount
+        self.conn.commit()
+        return removed
+
+    def get_llm_cache_stats(self) -> Dict:
+        """Count cached completions and the hits they served."""
+        self.cursor.execute('''
+            SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits, MIN(created_at) AS oldest
+            FROM llm_cache
+        ''')
+        return dict(self.cursor.fetchone())
+
+    def log_llm_call(self, model: str, purpose: str = None, prompt_tokens: int = 0,
+                     completion_tokens: int = 0, cost: float = 0.0, latency_ms: int = None,
+                     first_token_ms: int = None, cached: bool = False, outcome: str = 'ok',
+                     error: str = None) -> int:
+        """Record one completion request with its tokens, latency and estimated cost."""
+        self.cursor.execute('''
+            INSERT INTO llm_usage (model, purpose, prompt_tokens, completion_tokens, cost, latency_ms,
+                                   first_token_ms, cached, outcome, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (model, purpose, prompt_tokens, completion_tokens, cost, latency_ms, first_token_ms,
+              int(cached), outcome, error))
+        self.conn.commit()
+        return self.cursor.lastrowid
+
+    def get_llm_usage(self, days: int = 1) -> Dict:
+        """Summarize completion requests over the last N UTC days (1 = today), overall and per model."""
+        self.cursor.execute('''
+            SELECT model, COUNT(*) AS requests,
+                   SUM(cached) AS cached,
+                   SUM(outcome = 'error') AS errors,
+                   COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                   COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
+                   COALESCE(SUM(cost), 0) AS cost,
+                   AVG(CASE WHEN NOT cached AND outcome = 'ok' THEN latency_ms END) AS avg_latency_ms,
+                   AVG(first_token_ms) AS avg_first_token_ms
+            FROM llm_usage
+            WHERE created_at >= datetime('now', 'start of day', ?)
+            GROUP BY model
+            ORDER BY cost DESC
+        ''', (f'-{max(days, 1) - 1} days',))
+        models = [dict(row) for row in self.cursor.fetchall()]
+        usage = {'requests': 0, 'cached': 0, 'errors': 0, 'prompt_tokens': 0, 'completion_tokens': 0,
+                 'cost': 0.0, 'models': models}
+        for row in models:
+            for key in ('requests', 'cached', 'errors', 'prompt_tokens', 'completion_tokens', 'cost'):
+                usage[key] += row[key] or 0
+        # Latency of requests that reached the API (cache hits would drag the average down)
+        self.cursor.execute('''
+            SELECT AVG(latency_ms) AS avg_latency_ms FROM llm_usage
+            WHERE created_at >= datetime('now', 'start of day', ?) AND NOT cached AND outcome = 'ok'
+        ''', (f'-{max(days, 1) - 1} days',))
+        usage['avg_latency_ms'] = self.cursor.fetchone()['avg_latency_ms']
+        return usage
+
+    def get_recent_llm_calls(self, limit: int = 20) -> List[Dict]:
+        """The most recent completion requests, newest first."""
+        self.cursor.execute('''
+            SELECT created_at, model, purpose, prompt_tokens, completion_tokens, cost, latency_ms,
+                   first_token_ms, cached, outcome, error
+            FROM llm_usage ORDER BY id DESC LIMIT ?
+        ''', (limit,))
+        return [dict(row) for row in self.cursor.fetchall()]
+
     # ==================== STATISTICS ====================
     
     def get_statistics(self) -> Dict:
@@ -432,17 +1856,7 @@ class SponsorDatabase:
     
     def get_companies_with_contacts(self) -> List[Dict]:
         """Get all companies with their contact information."""
-        self.cursor.execute('''
-            SELECT 
-                c.id, c.name, c.url, c.type, c.industry, c.project_part, 
-                c.relevance_score, c.date_added, c.notes,
-                GROUP_CONCAT(ct.email, ', ') as emails
-            FROM companies c
-            LEFT JOIN contacts ct ON c.id = ct.company_id
-            GROUP BY c.id
-            ORDER BY c.date_added DESC
-        ''')
-        return [dict(row) for row in self.cursor.fetchall()]
+        return list(self.iter_companies_with_contacts())
     
     def close(self):
         """Close the database connection."""
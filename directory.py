@@ -0,0 +1,164 @@
+"""
+Distributor Directory for Integrated Sponsor Center
+Well-known distributors kept in the companies table with pre-crawled contacts
+"""
+
+from typing import Dict, List, Optional
+
+from domains import canonical_domain, display_domain
+from recrawl import recrawl_companies
+from taxonomy import TAXONOMY
+from worker import PeriodicWorker
+
+# Distributors are re-crawled for contacts after this long
+DEFAULT_REFRESH_SECONDS = 7 * 24 * 3600
+
+# How often the background refresher looks for stale distributors
+DEFAULT_CHECK_SECONDS = 3600
+
+# Sites crawled at once during a refresh
+REFRESH_MAX_WORKERS = 4
+
+# Relevance points for a directory distributor: its category's match score plus this
+DIRECTORY_SCORE_BONUS = 2
+
+
+def sync_directory(db, taxonomy: Dict[str, Dict] = TAXONOMY) -> Dict:
+    """Make sure every taxonomy distributor exists as a vendor company tagged with its category.
+
+    Existing companies on the same domain are reused, so distributors
+    already added by hand keep their contacts. Returns {'companies', 'added'}.
+    """
+    categories = {}
+    added = 0
+    for category, entry in taxonomy.items():
+        for url in entry['distributors']:
+            company_id = db.get_company_id_by_domain(url)
+            if company_id is None:
+                company_id = db.add_company(name=display_domain(url), url=url, company_type='vendor',
+                                            industry=entry['industry'], notes="Distributor directory")
+                added += 1
+            # A distributor listed under several categories stays in its first one
+            categories.setdefault(company_id, category)
+    db.set_directory_categories(categories)
+    return {'companies': len(categories), 'added': added}
+
+
+def refresh_directory(db, searcher, max_age_seconds: float = DEFAULT_REFRESH_SECONDS,
+                      max_workers: int = REFRESH_MAX_WORKERS, limit: Optional[int] = None) -> Dict:
+    """Re-crawl stale distributors for contacts, oldest first.
+
+    Uses the incremental re-crawl (see recrawl.recrawl_companies), so
+    pages unchanged since the last refresh are not re-extracted.
+    Returns {'stale', 'crawled', 'contacts', 'errors'} plus page totals.
+    """
+    stale = db.get_stale_directory_companies(max_age_seconds)
+    if limit is not None:
+        stale = stale[:limit]
+    stats = recrawl_companies(db, searcher, stale, max_workers)
+    stats['stale'] = stats.pop('companies')
+    return stats
+
+
+def record_crawls(db, results: List[Dict], directory: List[Dict]) -> int:
+    """Store contacts that a search found for not-yet-crawled directory distributors.
+
+    directory is the directory_vendors list the search was seeded from;
+    results are matched to it by domain. Returns crawls recorded.
+    """
+    pending = {vendor['domain']: vendor['directory_id'] for vendor in directory if not vendor['crawled']}
+    recorded = 0
+    for result in results:
+        company_id = pending.get(result.get('domain'))
+        if company_id and not result.get('error') and result.get('pages') != 0:
+            db.record_crawl(company_id, result.get('emails') or [])
+            recorded += 1
+    return recorded
+
+
+def directory_vendors(db, matches: List[Dict]) -> List[Dict]:
+    """Directory distributors for taxonomy matches, shaped like discovery results.
+
+    matches come from TaxonomyMatcher.match; each distributor scores its
+    category's match score plus DIRECTORY_SCORE_BONUS (and +5 with
+    contacts, as in vendor_scorer). Entries never crawled have
+    crawled=False and no emails yet.
+    """
+    category_scores = {match['category']: match['score'] for match in matches}
+    vendors = []
+    for company in db.get_directory_companies(list(category_scores)):
+        score = category_scores[company['directory_category']] + DIRECTORY_SCORE_BONUS
+        if company['emails']:
+            score += 5
+        vendors.append({
+            'url': company['url'], 'name': company['name'], 'source': 'Directory',
+            'engine': None, 'rank': None, 'domain': company['canonical_domain'] or canonical_domain(company['url']),
+            'emails': company['emails'], 'relevance_score': score, 'position': len(vendors),
+            'category': company['directory_category'], 'directory_id': company['id'],
+            'crawled': company['last_crawled_at'] is not None, 'last_crawled_at': company['last_crawled_at'],
+            'error': None,
+        })
+    return vendors
+
+
+class DirectoryRefresher(PeriodicWorker):
+    """Background thread that keeps directory contacts fresh.
+
+    Every check_seconds it syncs the directory with the taxonomy and
+    re-crawls distributors older than max_age_seconds, using its own
+    database connection and a direct-only (no ScraperAPI credits) fetcher.
+    Fetched pages go to archive (a PageArchive) if given. The first check
+    runs as soon as the thread starts.
+    """
+
+    def __init__(self, db_path: str = "sponsor_center.db", max_age_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 check_seconds: float = DEFAULT_CHECK_SECONDS, max_workers: int = REFRESH_MAX_WORKERS,
+                 archive=None):
+        super().__init__(check_seconds, run_immediately=True, name="directory-refresher")
+        self.db_path = db_path
+        self.archive = archive
+        self.max_age_seconds = max_age_seconds
+        self.max_workers = max_workers
+        self.last_refresh: Optional[Dict] = None
+
+    def run_once(self) -> Dict:
+        """Sync the directory and crawl stale distributors."""
+        from crawler import EmailSearcher
+        from database import SponsorDatabase
+        from fetcher import FetchManager
+
+        with SponsorDatabase(self.db_path) as db, \
+                FetchManager(self.db_path, search_label="directory refresh") as fetcher:
+            sync_directory(db)
+            searcher = EmailSearcher(max_pages=2, delay=0.3, fetcher=fetcher, archive=self.archive)
+            result = refresh_directory(db, searcher, self.max_age_seconds, self.max_workers)
+        self.last_refresh = result
+        return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sync and refresh the distributor directory")
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--max-age-hours', type=float, default=DEFAULT_REFRESH_SECONDS / 3600,
+                        help='Re-crawl distributors last crawled longer ago than this (0 = all)')
+    parser.add_argument('--limit', type=int, help='Crawl at most this many distributors')
+    parser.add_argument('--sync-only', action='store_true', help="Add taxonomy distributors without crawling")
+    args = parser.parse_args()
+
+    from database import SponsorDatabase
+    with SponsorDatabase(args.db) as db:
+        synced = sync_directory(db)
+        print(f"{synced['companies']} distributors in the directory ({synced['added']} added)")
+        if not args.sync_only:
+            from crawler import EmailSearcher
+            from fetcher import FetchManager
+            with FetchManager(args.db, search_label="directory cli") as fetcher:
+                searcher = EmailSearcher(max_pages=2, delay=0.3, fetcher=fetcher)
+                stats = refresh_directory(db, searcher, args.max_age_hours * 3600, limit=args.limit)
+            print(f"Crawled {stats['crawled']} of {stats['stale']} stale distributors: "
+                  f"{stats['contacts']} new contacts, {stats['errors']} errors")
+        stats = db.get_directory_stats()
+        print(f"{stats['crawled']}/{stats['companies']} crawled, {stats['contacts']} contacts, "
+              f"oldest crawl {stats['oldest_crawl'] or 'n/a'}")
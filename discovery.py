@@ -0,0 +1,342 @@
+"""
+Discovery Pipeline for Integrated Sponsor Center
+Composable generator stages: queries -> SERP -> candidates -> dedupe -> enrich -> score
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from domains import canonical_domain, display_domain
+from relevance import content_scores
+from serp import DEFAULT_CACHE_TTL, fan_out
+
+# Sites crawled for emails at once
+ENRICH_MAX_WORKERS = 4
+
+# Candidates pulled ahead of the enrichment workers (bounds memory and SERP work)
+ENRICH_MAX_PENDING = 8
+
+# URL words that suggest a distributor or shop
+DISTRIBUTOR_URL_WORDS = ('supply', 'distributor', 'direct', 'shop')
+
+# Search settings per company type
+# (queries: how many of the built queries are searched, target: unique domains
+# that stop the SERP fan-out, limit: companies enriched and returned)
+DISCOVERY_PROFILES = {
+    'sponsor': {'engines': ['google', 'bing', 'duckduckgo'], 'queries': 2, 'target': 10, 'limit': 8},
+    'vendor': {'engines': ['duckduckgo_lite', 'google'], 'queries': 2, 'target': 15, 'limit': 10},
+}
+
+
+def sponsor_queries(project: str, industry: str = None, location: str = 'Canada') -> List[str]:
+    """Search queries for sponsors of a project (most effective first)."""
+    industry_part = f"{industry} " if industry else ""
+    return [
+        f"{project} {industry_part}companies {location}",
+        f"{project} {industry_part}manufacturers {location}",
+        f"{project} {industry_part}suppliers {location}",
+    ]
+
+
+def vendor_queries(part_name: str, location: str = 'Canada') -> List[str]:
+    """Search queries for vendors of a specific part."""
+    return [
+        f"{part_name} supplier {location}",
+        f"{part_name} distributor {location}",
+    ]
+
+
+# ==================== STAGES ====================
+
+def _close(stage):
+    """Close an upstream generator so it can cancel its own work."""
+    close = getattr(stage, 'close', None)
+    if close:
+        close()
+
+
+def candidate_stage(serp_results: Iterable[Dict], seeds: Iterable[str] = (),
+                    on_serp: Optional[Callable[[Dict], None]] = None) -> Iterator[Dict]:
+    """Turn SERP results into candidate dicts as each page arrives, then yield seed URLs.
+
+    on_serp is called with every SERP result (including failures) so a UI
+    can report progress. Candidates carry url, name, source, engine and rank.
+    """
+    for result in serp_results:
+        if on_serp:
+            on_serp(result)
+        if result['error']:
+            continue
+        source = 'ScraperAPI' if result['via'] == 'ScraperAPI' else result['label']
+        for rank, url in enumerate(result['urls'], 1):
+            yield {'url': url, 'name': display_domain(url), 'source': source,
+                   'engine': result['engine'], 'rank': rank}
+    for url in seeds:
+        yield {'url': url, 'name': display_domain(url), 'source': 'Common', 'engine': None, 'rank': None}
+
+
+def dedupe_stage(candidates: Iterable[Dict], limit: Optional[int] = None,
+                 exclude_domains: Iterable[str] = ()) -> Iterator[Dict]:
+    """Drop candidates whose canonical domain was already seen; stop after limit.
+
+    Stopping closes the upstream generators, which cancels any SERP
+    requests that are still queued.
+    """
+    seen = set(exclude_domains)
+    emitted = 0
+    try:
+        for candidate in candidates:
+            if limit is not None and emitted >= limit:
+                break
+            domain = canonical_domain(candidate['url'])
+            if not domain or domain in seen:
+                continue
+            seen.add(domain)
+            candidate['domain'] = domain
+            candidate['position'] = emitted  # discovery order, used to break score ties
+            emitted += 1
+            yield candidate
+    finally:
+        _close(candidates)
+
+
+def enrich_stage(candidates: Iterable[Dict], enrich: Optional[Callable[[str], Any]],
+                 max_workers: int = ENRICH_MAX_WORKERS,
+                 max_pending: int = ENRICH_MAX_PENDING) -> Iterator[Dict]:
+    """Crawl each candidate on a worker pool, yielding candidates as they finish.
+
+    enrich(url) returns either the site's emails or a dict with 'emails'
+    and 'text' (see EmailSearcher.crawl_site); the text feeds content
+    ranking. At most max_pending candidates are in flight; the next one is
+    only pulled from upstream when a slot frees, so slow crawls apply
+    backpressure to the SERP stage. Closing the generator cancels queued
+    crawls and waits for running ones. Without enrich, candidates pass
+    straight through with no emails.
+    """
+    if enrich is None:
+        for candidate in candidates:
+            candidate['emails'] = []
+            candidate['text'] = ''
+            yield candidate
+        return
+
+    def run(candidate: Dict) -> Dict:
+        started = time.perf_counter()
+        try:
+            found = enrich(candidate['url'])
+            if isinstance(found, dict):
+                candidate['text'] = found.get('text') or ''
+                candidate['pages'] = found.get('pages')
+                found = found.get('emails')
+            candidate['emails'] = sorted(found or [])
+            candidate['error'] = None
+        except Exception as e:
+            candidate['emails'] = []
+            candidate['error'] = str(e)[:200]
+        candidate.setdefault('text', '')
+        candidate['enrich_seconds'] = time.perf_counter() - started
+        return candidate
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='enrich')
+    pending = set()
+    upstream = iter(candidates)
+    exhausted = False
+    try:
+        while True:
+            while not exhausted and len(pending) < max(max_pending, 1):
+                candidate = next(upstream, None)
+                if candidate is None:
+                    exhausted = True
+                else:
+                    pending.add(executor.submit(run, candidate))
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        # Crawls already running finish before the caller can close the fetcher they use
+        executor.shutdown(wait=True, cancel_futures=True)
+        _close(upstream)
+
+
+def score_stage(candidates: Iterable[Dict], scorer: Callable[[Dict], int]) -> Iterator[Dict]:
+    """Attach relevance_score to each candidate."""
+    for candidate in candidates:
+        candidate['relevance_score'] = scorer(candidate)
+        yield candidate
+
+
+# ==================== SCORERS ====================
+
+def sponsor_scorer(project: str, industry: str = None) -> Callable[[Dict], int]:
+    """URL relevance for sponsors: project words, industry words (x2), +5 with emails."""
+    project_words = project.lower().split()[:3]
+    industry_words = industry.lower().split() if industry else []
+
+    def score(candidate: Dict) -> int:
+        url_lower = candidate['url'].lower()
+        total = sum(1 for word in industry_words if word in url_lower) * 2
+        total += sum(1 for word in project_words if word in url_lower)
+        if candidate.get('emails'):
+            total += 5
+        return total
+
+    return score
+
+
+def vendor_scorer(part_name: str) -> Callable[[Dict], int]:
+    """URL relevance for vendors: part words, +2 for distributor-like URLs, +5 with emails."""
+    part_words = part_name.lower().split()[:3]
+
+    def score(candidate: Dict) -> int:
+        url_lower = candidate['url'].lower()
+        total = sum(1 for word in part_words if word in url_lower)
+        if any(word in url_lower for word in DISTRIBUTOR_URL_WORDS):
+            total += 2
+        if candidate.get('emails'):
+            total += 5
+        return total
+
+    return score
+
+
+# ==================== PIPELINE ====================
+
+def discover(queries: List[str], engines: List[str], fetcher=None, *,
+             enrich: Optional[Callable[[str], Iterable[str]]] = None,
+             scorer: Optional[Callable[[Dict], int]] = None,
+             seeds: Iterable[str] = (), exclude_domains: Iterable[str] = (),
+             target: Optional[int] = 10, limit: Optional[int] = 8, cache=None, location: str = '', cache_ttl: float = DEFAULT_CACHE_TTL,
+             refresh: bool = False, on_serp: Optional[Callable[[Dict], None]] = None,
+             max_workers: int = ENRICH_MAX_WORKERS) -> Iterator[Dict]:
+    """Run the full discovery pipeline, yielding scored companies as they finish.
+
+    Results arrive in completion order; sort by relevance_score for the
+    final ranking. Candidates on exclude_domains (e.g. companies already
+    known with contacts) are skipped before any crawl. Closing the
+    generator early cancels outstanding work.
+    """
+    serp_results = fan_out(queries, engines, fetcher, target=target, cache=cache,
+                           location=location, cache_ttl=cache_ttl, refresh=refresh)
+    candidates = candidate_stage(serp_results, seeds, on_serp)
+    unique = dedupe_stage(candidates, limit, exclude_domains)
+    enriched = enrich_stage(unique, enrich, max_workers=max_workers)
+    return score_stage(enriched, scorer or (lambda candidate: 0))
+
+
+def discover_sponsors(project: str, industry: str = None, location: str = 'Canada', **kwargs) -> Iterator[Dict]:
+    """Discovery pipeline preset for the Real Sponsors page."""
+    profile = DISCOVERY_PROFILES['sponsor']
+    kwargs.setdefault('target', profile['target'])
+    kwargs.setdefault('limit', profile['limit'])
+    kwargs.setdefault('scorer', sponsor_scorer(project, industry))
+    queries = sponsor_queries(project, industry, location)[:profile['queries']]
+    return discover(queries, profile['engines'], location=location, **kwargs)
+
+
+def discover_vendors(part_name: str, location: str = 'Canada', seeds: Iterable[str] = (),
+                     **kwargs) -> Iterator[Dict]:
+    """Discovery pipeline preset for the Vendor Search page."""
+    profile = DISCOVERY_PROFILES['vendor']
+    kwargs.setdefault('target', profile['target'])
+    kwargs.setdefault('limit', profile['limit'])
+    kwargs.setdefault('scorer', vendor_scorer(part_name))
+    queries = vendor_queries(part_name, location)[:profile['queries']]
+    return discover(queries, profile['engines'], location=location, seeds=seeds, **kwargs)
+
+
+def content_rank(results: Iterable[Dict], description: str, db=None) -> List[Dict]:
+    """Add TF-IDF content relevance to a batch of results and rank them.
+
+    Each result's crawled page text is scored against the project/part
+    description in one vectorized pass (0-100 points, stored as
+    content_score) and added to its URL/email relevance_score. The page
+    text is dropped afterwards. With a db, the new scores are written to
+    companies.relevance_score for results already stored there.
+    """
+    results = list(results)
+    scores = content_scores([result.pop('text', '') for result in results], description)
+    for result, score in zip(results, scores):
+        result['content_score'] = score
+        result['relevance_score'] = result.get('relevance_score', 0) + score
+
+    if db is not None and results:
+        domains = [result.get('domain') or canonical_domain(result['url']) for result in results]
+        stored = db.get_company_ids_by_domains(domains)
+        updates = {}
+        for result, domain in zip(results, domains):
+            company_id = stored.get(domain)
+            if company_id:
+                updates[company_id] = result['relevance_score']
+        db.update_relevance_scores(updates)
+
+    return rank(results)
+
+
+def rank(results: Iterable[Dict]) -> List[Dict]:
+    """Collect pipeline results, highest relevance first (ties keep discovery order)."""
+    return sorted(results, key=lambda result: (-result['relevance_score'], result.get('position', 0)))
+
+
+def save_results(db, results: Iterable[Dict], company_type: str, project_part: str = None,
+                 industry: str = None) -> int:
+    """Store discovered companies and their emails (existing domains are reused). Returns the count stored."""
+    saved = 0
+    for result in results:
+        company_id = db.add_company(result['name'], result['url'], company_type,
+                                    industry=industry, project_part=project_part,
+                                    relevance_score=result.get('relevance_score', 0))
+        if company_id:
+            saved += 1
+            for email in result.get('emails', []):
+                db.add_contact(company_id, email)
+    return saved
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    from crawler import EmailSearcher
+    from database import SponsorDatabase
+    from fetcher import FetchManager
+
+    parser = argparse.ArgumentParser(description="Run sponsor or vendor discovery without the web app")
+    parser.add_argument('kind', choices=['sponsor', 'vendor'])
+    parser.add_argument('description', help='Project (sponsors) or part name (vendors)')
+    parser.add_argument('--industry')
+    parser.add_argument('--location', default='Canada')
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--no-emails', action='store_true')
+    parser.add_argument('--refresh', action='store_true', help='Bypass cached SERP results')
+    parser.add_argument('--save', action='store_true', help='Add the results to the companies table')
+    args = parser.parse_args()
+
+    with SponsorDatabase(args.db) as db, \
+            FetchManager(args.db, os.getenv('SCRAPER_API_KEY'),
+                         search_label=f"{args.kind} job: {args.description}") as fetcher:
+        searcher = EmailSearcher(max_pages=2, delay=0.3, fetcher=fetcher)
+        options = dict(fetcher=fetcher, cache=db, refresh=args.refresh,
+                       enrich=None if args.no_emails else searcher.crawl_site,
+                       on_serp=lambda r: print(f"  {r['label']:<10} {r['query']!r}: "
+                                               f"{r['error'] or str(len(r['urls'])) + ' urls'}"))
+        if args.kind == 'sponsor':
+            pipeline = discover_sponsors(args.description, args.industry, args.location, **options)
+        else:
+            pipeline = discover_vendors(args.description, args.location, **options)
+
+        started = time.perf_counter()
+        results = []
+        for result in pipeline:
+            print(f"[{time.perf_counter() - started:5.1f}s] {result['relevance_score']:>3} "
+                  f"{result['url']} {', '.join(result['emails'])}")
+            results.append(result)
+        results = content_rank(results, ' '.join(filter(None, [args.description, args.industry])), db)
+
+        if args.save:
+            saved = save_results(db, results, args.kind, args.description, args.industry)
+            print(f"Saved {saved} companies")
+        print(f"{len(results)} companies, {fetcher.search_credits} ScraperAPI credits, "
+              f"{time.perf_counter() - started:.1f}s")
@@ -0,0 +1,122 @@
+"""
+Domain Normalizer for Integrated Sponsor Center
+Canonical hosts and registrable domains used to dedupe companies
+"""
+
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlsplit
+
+# Multi-label public suffixes (a compact subset of the Public Suffix List).
+# Anything not listed falls back to its last label (com, ca, io, ...).
+PUBLIC_SUFFIXES = frozenset({
+    # Canada - provincial second levels
+    'ab.ca', 'bc.ca', 'mb.ca', 'nb.ca', 'nf.ca', 'nl.ca', 'ns.ca', 'nt.ca',
+    'nu.ca', 'on.ca', 'pe.ca', 'qc.ca', 'sk.ca', 'yk.ca', 'gc.ca',
+    # United Kingdom
+    'co.uk', 'org.uk', 'me.uk', 'ltd.uk', 'plc.uk', 'net.uk', 'ac.uk', 'gov.uk', 'sch.uk', 'nhs.uk',
+    # Australia / New Zealand
+    'com.au', 'net.au', 'org.au', 'edu.au', 'gov.au', 'asn.au', 'id.au',
+    'co.nz', 'org.nz', 'net.nz', 'ac.nz', 'govt.nz', 'geek.nz',
+    # Asia
+    'co.jp', 'ne.jp', 'or.jp', 'ac.jp', 'go.jp',
+    'co.kr', 'or.kr', 'ac.kr',
+    'com.cn', 'net.cn', 'org.cn', 'edu.cn', 'gov.cn',
+    'com.hk', 'org.hk', 'edu.hk',
+    'com.tw', 'org.tw', 'edu.tw',
+    'com.sg', 'edu.sg', 'gov.sg',
+    'co.in', 'net.in', 'org.in', 'firm.in', 'gen.in', 'ind.in', 'ac.in', 'edu.in', 'gov.in',
+    'com.my', 'com.ph', 'co.th', 'co.id', 'com.vn', 'com.pk',
+    # Americas
+    'com.mx', 'org.mx', 'edu.mx', 'com.br', 'net.br', 'org.br', 'com.ar', 'com.co', 'com.pe', 'cl.cl',
+    # Europe / Middle East / Africa
+    'co.at', 'or.at', 'com.pl', 'net.pl', 'org.pl', 'com.tr', 'com.ua', 'co.il', 'org.il', 'ac.il',
+    'co.za', 'org.za', 'ac.za', 'com.eg', 'com.sa', 'com.ng', 'co.ke',
+    # Private suffixes that host many unrelated sites
+    'blogspot.com', 'github.io', 'gitlab.io', 'herokuapp.com', 'netlify.app', 'vercel.app',
+    'wixsite.com', 'myshopify.com', 'square.site', 'wordpress.com', 'weebly.com', 'azurewebsites.net',
+    'appspot.com', 'web.app', 'firebaseapp.com', 'pages.dev', 'cloudfront.net',
+})
+
+# Host prefixes that never identify a separate company site
+STRIP_HOST_PREFIXES = ('www.', 'www2.', 'www3.', 'm.')
+
+
+@lru_cache(maxsize=65536)
+def normalize_host(value: str) -> Optional[str]:
+    """Normalize a URL or bare host to a lowercase ASCII (punycode) host without www.
+
+    Returns None when no usable host can be found.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    if '://' not in value:
+        value = '//' + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+
+    host = host.rstrip('.').lower()
+    try:
+        # IDN hosts -> punycode (xn--...) so Unicode and ASCII forms compare equal
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        return None
+
+    for prefix in STRIP_HOST_PREFIXES:
+        if host.startswith(prefix) and host.count('.') > 1:
+            host = host[len(prefix):]
+            break
+
+    if '.' not in host:
+        return None
+    return host
+
+
+@lru_cache(maxsize=65536)
+def registrable_domain(host: str) -> Optional[str]:
+    """Get the registrable domain (public suffix + one label) of a normalized host."""
+    if not host:
+        return None
+    if host in PUBLIC_SUFFIXES:
+        return host
+    labels = host.split('.')
+    # Longest matching multi-label suffix wins
+    for size in range(min(len(labels) - 1, 3), 1, -1):
+        if '.'.join(labels[-size:]) in PUBLIC_SUFFIXES:
+            return '.'.join(labels[-(size + 1):])
+    return '.'.join(labels[-2:])
+
+
+def canonical_domain(url: str) -> Optional[str]:
+    """Get the dedupe key for a company URL (its registrable domain)."""
+    return registrable_domain(normalize_host(url))
+
+
+def canonical_url(url: str) -> Optional[str]:
+    """Normalize a company URL to the https://host form used by the app."""
+    host = normalize_host(url)
+    return f"https://{host}" if host else None
+
+
+def display_domain(url: str) -> str:
+    """Human-readable host for a URL (Unicode for IDN hosts), falling back to the input."""
+    host = normalize_host(url)
+    if not host:
+        return url
+    try:
+        return host.encode('ascii').decode('idna')
+    except UnicodeError:
+        return host
+
+
+def cache_info() -> dict:
+    """LRU cache statistics for the normalizers."""
+    return {
+        'normalize_host': normalize_host.cache_info()._asdict(),
+        'registrable_domain': registrable_domain.cache_info()._asdict(),
+    }
@@ -0,0 +1,314 @@
+"""
+AI Email Drafting for Integrated Sponsor Center
+Single-call streamed drafting and concurrent, rate-limited batches with retry/backoff
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Drafts requested at once
+DRAFT_MAX_WORKERS = 4
+
+# Request starts per minute across all workers (set to your OpenAI tier's limit)
+DEFAULT_REQUESTS_PER_MINUTE = 60
+
+# Retries for rate limits (429), server errors (5xx), timeouts and dropped connections
+MAX_RETRIES = 5
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 30.0
+
+# Subject and body come back in one response: "Subject: ..." then a blank line and the body
+BODY_MAX_TOKENS = 800
+SUBJECT_MAX_TOKENS = 50
+DRAFT_MAX_TOKENS = BODY_MAX_TOKENS + SUBJECT_MAX_TOKENS
+TEMPERATURE = 0.7
+SUBJECT_PREFIX = "subject:"
+
+SYSTEM_PROMPT = "You are a professional business email writer. Write clear, compelling emails that get responses."
+
+RETRYABLE_ERRORS = ('APIConnectionError', 'APITimeoutError')
+
+
+def build_prompt(contact: Dict, project_name: str, sender: str = '', amount: str = '',
+                 tone: str = 'Professional', length: str = 'Medium', notes: str = '',
+                 reference_template: Optional[Dict] = None) -> str:
+    """The drafting prompt for one contact (subject line and body)."""
+    contact_type = "sponsor" if contact['type'] == 'sponsor' else "vendor"
+    prompt = f"""Write a {tone.lower()} {length.lower()} business email to {contact['name']}.
+
+CONTEXT:
+- Purpose: {"Request sponsorship for" if contact['type'] == 'sponsor' else "Inquire about purchasing"} {project_name}
+- Recipient: {contact['name']} ({contact_type})
+- Sender: {sender}
+- Amount/Budget: {amount}
+- Additional context: {notes}
+
+REQUIREMENTS:
+- Tone: {tone}
+- Length: {length}
+- Include a clear call-to-action
+- Professional formatting with proper greeting and signature
+"""
+
+    if reference_template:
+        prompt += f"""\n\nIMPORTANT - Use this template as your base structure and style guide:
+
+TEMPLATE TO FOLLOW:
+Subject: {reference_template['subject']}
+
+{reference_template['body']}
+
+Adapt this template's structure, style, and tone to fit the current context. Replace placeholders with actual details about {contact['name']} and {project_name}."""
+
+    if contact['type'] == 'sponsor':
+        prompt += "\n\nKey points to emphasize:\n- Mutual benefits and ROI\n- Exposure opportunities\n- Brand alignment and values\n- Specific deliverables"
+    else:
+        prompt += "\n\nKey points to emphasize:\n- Specific product requirements\n- Timeline and delivery needs\n- Budget constraints\n- Request for quotes and technical specs"
+
+    prompt += ("\n\nStart with a compelling subject line written as 'Subject: ...', then a blank line, "
+               "then the email body. No other metadata.")
+    return prompt
+
+
+def default_subject(contact: Dict, project_name: str) -> str:
+    """The subject used when neither the user nor the model supplied one (as in the template mode)."""
+    if contact['type'] == 'sponsor':
+        return f"Sponsorship Partnership Opportunity - {project_name}"
+    return f"Product Inquiry - {project_name}"
+
+
+def split_draft(text: str, final: bool = True) -> Tuple[str, str]:
+    """Split a "Subject: ..." response into (subject, body).
+
+    Works on partial text while streaming: until the subject line is
+    complete the body is empty, and a response still spelling out the
+    prefix is held back. A response without the prefix is all body.
+    """
+    lead = text.lstrip()
+    if not final and len(lead) < len(SUBJECT_PREFIX) and SUBJECT_PREFIX.startswith(lead.lower()):
+        return '', ''
+    if not lead.lower().startswith(SUBJECT_PREFIX):
+        return '', text.strip() if final else text
+    subject, _, body = lead[len(SUBJECT_PREFIX):].partition('\n')
+    subject = subject.strip().strip('*"\'').strip()
+    return subject, body.strip() if final else body.lstrip('\n')
+
+
+def contact_project(contact: Dict) -> str:
+    """The project (sponsors) or part (vendors) a contact was added for."""
+    project = contact.get('project', contact.get('part', ''))
+    return '' if project == 'N/A' else project
+
+
+class RateLimiter:
+    """Spaces request starts evenly to stay under a per-minute limit (thread-safe)."""
+
+    def __init__(self, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_start = 0.0
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an OpenAI error is transient (rate limit, server error, timeout, connection)."""
+    status = getattr(error, 'status_code', None)
+    if status is not None:
+        # An exhausted quota is also a 429, but waiting won't fix it
+        return (status == 429 and 'insufficient_quota' not in str(error)) or status >= 500
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before the next attempt: the server's Retry-After, else jittered exponential backoff."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        retry_after = float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        retry_after = None
+    if retry_after is not None:
+        return min(retry_after, BACKOFF_MAX_SECONDS)
+    return min(BACKOFF_BASE_SECONDS * 2 ** attempt, BACKOFF_MAX_SECONDS) * random.uniform(0.5, 1.0)
+
+
+def call_with_retry(request: Callable[[], object], limiter: Optional[RateLimiter] = None,
+                    max_retries: int = MAX_RETRIES):
+    """Run one API request, pacing it through limiter and retrying transient errors."""
+    for attempt in range(max_retries + 1):
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            return request()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            time.sleep(retry_delay(e, attempt))
+
+
+def complete(gateway, messages: List[Dict], model: str = DEFAULT_MODEL, max_tokens: int = BODY_MAX_TOKENS,
+             temperature: float = TEMPERATURE, limiter: Optional[RateLimiter] = None,
+             cache: bool = True, purpose: str = 'draft') -> str:
+    """One chat completion's text through an llm.LLMGateway, with pacing and retries."""
+    return call_with_retry(lambda: gateway.complete(messages, model, max_tokens, temperature,
+                                                    cache=cache, purpose=purpose), limiter)
+
+
+def _draft_messages(contact: Dict, options: Dict) -> Tuple[List[Dict], str]:
+    """Chat messages for one draft, and the project name they were built with."""
+    project_name = options.get('project') or contact_project(contact)
+    prompt = build_prompt(contact, project_name, options.get('sender', ''), options.get('amount', ''),
+                          options.get('tone', 'Professional'), options.get('length', 'Medium'),
+                          options.get('notes', ''), options.get('reference_template'))
+    return [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": prompt}], project_name
+
+
+def _finish_draft(text: str, contact: Dict, options: Dict, project_name: str) -> Dict:
+    subject, body = split_draft(text)
+    # A custom subject wins over the model's
+    subject = options.get('subject') or subject or default_subject(contact, project_name)
+    return {'subject': subject, 'body': body}
+
+
+def draft_email(gateway, contact: Dict, options: Dict, model: str = DEFAULT_MODEL,
+                limiter: Optional[RateLimiter] = None, cache: bool = True, purpose: str = 'draft') -> Dict:
+    """Draft one email in a single completion. Returns {'subject', 'body'}.
+
+    options: sender, amount, tone, length, notes, reference_template,
+    project (defaults to the contact's project/part) and subject
+    (replaces the model's subject when set). With cache, identical
+    inputs return the gateway's cached draft.
+    """
+    messages, project_name = _draft_messages(contact, options)
+    text = complete(gateway, messages, model, DRAFT_MAX_TOKENS, limiter=limiter, cache=cache, purpose=purpose)
+    return _finish_draft(text, contact, options, project_name)
+
+
+def stream_draft(gateway, contact: Dict, options: Dict, model: str = DEFAULT_MODEL,
+                 limiter: Optional[RateLimiter] = None, cache: bool = True,
+                 purpose: str = 'draft') -> Iterator[Dict]:
+    """Draft one email, yielding {'subject', 'body', 'done'} as tokens arrive.
+
+    Partial yields carry the subject and body streamed so far; the last
+    one has done=True and the same cleanup as draft_email. Only opening
+    the stream is retried, since a retry after tokens were shown would
+    restart the text.
+    """
+    messages, project_name = _draft_messages(contact, options)
+    stream = call_with_retry(lambda: gateway.stream(messages, model, DRAFT_MAX_TOKENS, TEMPERATURE,
+                                                    cache=cache, purpose=purpose), limiter)
+    parts = []
+    for delta in stream:
+        parts.append(delta)
+        subject, body = split_draft(''.join(parts), final=False)
+        yield {'subject': options.get('subject') or subject, 'body': body, 'done': False}
+    draft = _finish_draft(''.join(parts), contact, options, project_name)
+    draft['done'] = True
+    yield draft
+
+
+def draft_batch(gateway, contacts: List[Dict], options: Dict, model: str = DEFAULT_MODEL,
+                max_workers: int = DRAFT_MAX_WORKERS,
+                requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                cache: bool = True) -> Iterator[Dict]:
+    """Draft emails for many contacts concurrently, yielding each as it completes.
+
+    Requests share one rate limiter, and transient errors are retried
+    with backoff, so a batch is bounded by the slowest few calls rather
+    than their sum. Yields {'contact', 'subject', 'body', 'error',
+    'seconds'}; a failed draft has error set and no subject/body.
+    Closing the generator early cancels drafts not yet started.
+    """
+    limiter = RateLimiter(requests_per_minute)
+
+    def run(contact: Dict) -> Dict:
+        started = time.perf_counter()
+        result = {'contact': contact, 'subject': None, 'body': None, 'error': None}
+        try:
+            result.update(draft_email(gateway, contact, options, model, limiter, cache, purpose='draft:batch'))
+        except Exception as e:
+            result['error'] = str(e)[:300]
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    if not contacts:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(contacts))),
+                                  thread_name_prefix='draft')
+    try:
+        futures = [executor.submit(run, contact) for contact in contacts]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def save_draft(db, contact: Dict, draft: Dict, recipient: Optional[str] = None,
+               template_used: str = 'ai') -> int:
+    """Store a draft in the emails table, addressed to recipient (default: the contact's first email)."""
+    recipient = recipient or (contact['emails'][0] if contact.get('emails') else None)
+    contact_id = None
+    if recipient:
+        contact_id = next((row['id'] for row in db.get_company_contacts(contact['id'])
+                           if row['email'] == recipient), None)
+    return db.add_email(contact['id'], draft['subject'], draft['body'], contact_id=contact_id,
+                        template_used=template_used)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Draft AI emails for every company with contacts")
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--type', choices=['sponsor', 'vendor'])
+    parser.add_argument('--limit', type=int, help='Draft for at most this many companies')
+    parser.add_argument('--sender', default='')
+    parser.add_argument('--amount', default='')
+    parser.add_argument('--tone', default='Professional')
+    parser.add_argument('--length', default='Medium', choices=['Short', 'Medium', 'Long'])
+    parser.add_argument('--notes', default='')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--workers', type=int, default=DRAFT_MAX_WORKERS)
+    parser.add_argument('--rpm', type=float, default=DEFAULT_REQUESTS_PER_MINUTE, help='Requests per minute (0 = unpaced)')
+    args = parser.parse_args()
+
+    from database import SponsorDatabase
+    from llm import LLMGateway
+
+    gateway = LLMGateway(os.environ['OPENAI_API_KEY'], db_path=args.db)
+    options = {'sender': args.sender, 'amount': args.amount, 'tone': args.tone,
+               'length': args.length, 'notes': args.notes}
+    with SponsorDatabase(args.db) as db:
+        contacts = []
+        for company in db.iter_companies_with_contacts(args.type):
+            if company['emails'] and (args.limit is None or len(contacts) < args.limit):
+                contacts.append({'id': company['id'], 'name': company['name'], 'url': company['url'],
+                                 'type': company['type'], 'project': company['project_part'] or '',
+                                 'emails': company['emails'].split(', ')})
+
+        started = time.perf_counter()
+        drafted = 0
+        for result in draft_batch(gateway, contacts, options, args.model, args.workers, args.rpm):
+            if result['error']:
+                print(f"  FAILED {result['contact']['name']}: {result['error']}")
+                continue
+            save_draft(db, result['contact'], result, template_used='ai:batch')
+            drafted += 1
+            print(f"  {result['seconds']:5.1f}s  {result['contact']['name']}: {result['subject']}")
+        print(f"Drafted {drafted}/{len(contacts)} emails in {time.perf_counter() - started:.1f}s")
+    gateway.close()
@@ -0,0 +1,174 @@
+"""
+Export Manager for Integrated Sponsor Center
+Streams company rows from SQLite into CSV, NDJSON or JSON files on disk
+"""
+
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import time
+from operator import attrgetter
+from typing import Dict, List, Optional
+
+from database import SponsorDatabase, DEFAULT_CHUNK_SIZE
+
+# Columns each export source can provide, in default output order
+EXPORT_SOURCES = {
+    'companies': [
+        'id', 'name', 'url', 'type', 'industry', 'project_part',
+        'relevance_score', 'date_added', 'last_updated', 'notes', 'canonical_domain'
+    ],
+    'companies_with_contacts': [
+        'id', 'name', 'url', 'type', 'industry', 'project_part',
+        'relevance_score', 'date_added', 'notes', 'emails'
+    ],
+}
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'json')
+
+# Where the web app writes exports for download; files older than EXPORT_FILE_TTL_SECONDS are pruned
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "sponsor_center_exports")
+EXPORT_FILE_TTL_SECONDS = 3600
+
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def _iter_source(db: SponsorDatabase, source: str, company_type: str = None,
+                 search_term: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """Get the streaming record iterator for an export source."""
+    if source == 'companies':
+        if search_term:
+            return db.iter_search_companies(search_term, chunk_size=chunk_size, row_type='record')
+        return db.iter_companies(company_type=company_type, chunk_size=chunk_size, row_type='record')
+    if source == 'companies_with_contacts':
+        return db.iter_companies_with_contacts(company_type=company_type, chunk_size=chunk_size,
+                                               row_type='record')
+    raise ValueError(f"Unknown export source {source!r}; expected one of {list(EXPORT_SOURCES)}")
+
+
+def prune_exports(output_dir: str = EXPORT_DIR, max_age_seconds: float = EXPORT_FILE_TTL_SECONDS) -> int:
+    """Delete export files older than max_age_seconds (left by sessions that never downloaded). Returns files removed."""
+    if not os.path.isdir(output_dir):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        try:
+            if os.path.isfile(path) and os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                removed += 1
+        except OSError:
+            pass  # Already removed by another session
+    return removed
+
+
+def export_companies(db: SponsorDatabase, fmt: str = 'csv', source: str = 'companies',
+                     columns: Optional[List[str]] = None, company_type: str = None,
+                     search_term: str = None, compress: bool = False,
+                     output_dir: str = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict:
+    """Stream an export of the company database to a temporary file.
+
+    Rows go straight from the database cursor to the (optionally gzip
+    compressed) file, so memory use does not grow with table size. The
+    caller owns the returned file and should delete it when done.
+
+    Returns a summary dict with path, file_name, mime, rows, bytes,
+    seconds and rows_per_sec.
+    """
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {EXPORT_FORMATS}")
+    if source not in EXPORT_SOURCES:
+        raise ValueError(f"Unknown export source {source!r}; expected one of {list(EXPORT_SOURCES)}")
+
+    columns = list(columns) if columns else list(EXPORT_SOURCES[source])
+    unknown = [col for col in columns if col not in EXPORT_SOURCES[source]]
+    if unknown:
+        raise ValueError(f"Unknown columns for {source}: {', '.join(unknown)}")
+
+    pick = attrgetter(*columns)
+    if len(columns) == 1:
+        # attrgetter returns a bare value for a single name
+        single = pick
+        pick = lambda record: (single(record),)
+
+    suffix = f".{fmt}.gz" if compress else f".{fmt}"
+    fd, path = tempfile.mkstemp(prefix=f"{source}_", suffix=suffix, dir=output_dir)
+    os.close(fd)
+
+    rows = 0
+    started = time.perf_counter()
+    try:
+        raw = gzip.open(path, 'wb') if compress else open(path, 'wb')
+        with raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as out:
+            records = _iter_source(db, source, company_type, search_term, chunk_size)
+
+            if fmt == 'csv':
+                writer = csv.writer(out)
+                writer.writerow(columns)
+                for record in records:
+                    writer.writerow(pick(record))
+                    rows += 1
+            elif fmt == 'ndjson':
+                for record in records:
+                    out.write(json.dumps(dict(zip(columns, pick(record)))))
+                    out.write('\n')
+                    rows += 1
+            else:
+                # JSON array written element by element
+                out.write('[')
+                for record in records:
+                    out.write(',\n  ' if rows else '\n  ')
+                    out.write(json.dumps(dict(zip(columns, pick(record)))))
+                    rows += 1
+                out.write('\n]\n' if rows else ']\n')
+    except Exception:
+        os.remove(path)
+        raise
+
+    seconds = time.perf_counter() - started
+    return {
+        'path': path,
+        'file_name': f"{source}_{time.strftime('%Y%m%d_%H%M%S')}{suffix}",
+        'mime': 'application/gzip' if compress else MIME_TYPES[fmt],
+        'format': fmt,
+        'compressed': compress,
+        'columns': columns,
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else float(rows),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export the company database")
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+    parser.add_argument('--source', choices=list(EXPORT_SOURCES), default='companies')
+    parser.add_argument('--columns', help='Comma-separated column list')
+    parser.add_argument('--type', dest='company_type', choices=['sponsor', 'vendor'])
+    parser.add_argument('--gzip', action='store_true')
+    parser.add_argument('--output-dir', default='.')
+    args = parser.parse_args()
+
+    with SponsorDatabase(args.db) as db:
+        result = export_companies(
+            db, fmt=args.format, source=args.source,
+            columns=args.columns.split(',') if args.columns else None,
+            company_type=args.company_type, compress=args.gzip,
+            output_dir=args.output_dir
+        )
+
+    print(f"Exported {result['rows']} rows to {result['path']}")
+    print(f"  {result['bytes']:,} bytes in {result['seconds']:.2f}s ({result['rows_per_sec']:,.0f} rows/sec)")
@@ -0,0 +1,292 @@
+"""
+Fetch Manager for Integrated Sponsor Center
+Direct-first page fetching that escalates to ScraperAPI only when blocked,
+with per-request credit metering and daily / per-search budgets
+"""
+
+import re
+import threading
+import time
+import urllib.parse
+import uuid
+from typing import Dict, Optional
+
+import requests
+
+import metrics
+from domains import normalize_host
+
+DIRECT_TIMEOUT = 8
+SCRAPER_TIMEOUT = 30
+
+# Credits charged per ScraperAPI request (adjust to your plan's pricing)
+SCRAPER_CREDIT_COST = 1
+
+# Default budgets in credits; 0 means unlimited
+DEFAULT_DAILY_CREDITS = 200
+DEFAULT_SEARCH_CREDITS = 25
+
+# Responses that mean "blocked", not "missing"
+BLOCK_STATUS_CODES = frozenset({403, 429, 503})
+
+# Bot-check pages that come back with a 200
+CAPTCHA_RE = re.compile(
+    r'captcha|unusual traffic|/sorry/index|are you a robot|verify you are (?:a )?human'
+    r'|cf-challenge|challenge-platform|anomaly-modal|detected unusual activity',
+    re.IGNORECASE
+)
+
+# Only the start of a page is checked for captcha markers
+CAPTCHA_SCAN_BYTES = 20000
+
+# Hosts that blocked a direct fetch go straight to ScraperAPI for this long
+BLOCK_MEMORY_SECONDS = 3600
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+
+FETCH_SECONDS = metrics.histogram('fetch_seconds', "Page fetch latency by host and tier", ('host', 'tier'))
+FETCH_REQUESTS = metrics.counter('fetch_requests_total', "Page fetches by tier and outcome", ('tier', 'outcome'))
+FETCH_BYTES = metrics.counter('fetch_bytes_total', "Response bytes downloaded by tier", ('tier',))
+FETCHES_IN_FLIGHT = metrics.gauge('fetches_in_flight', "Page fetches waiting on the network", ('tier',))
+SCRAPER_CREDITS = metrics.counter('scraper_credits_total', "ScraperAPI credits charged")
+
+# Shared across searches in this process
+_blocked_hosts: Dict[str, float] = {}
+_budget_lock = threading.Lock()
+_reserved_credits = 0
+
+
+class BudgetExceeded(Exception):
+    """Raised when a ScraperAPI request would exceed the daily or per-search budget."""
+
+
+def is_blocked(status_code: int, text: str) -> bool:
+    """Check whether a response looks like a block or bot check."""
+    if status_code in BLOCK_STATUS_CODES:
+        return True
+    return status_code == 200 and bool(CAPTCHA_RE.search(text[:CAPTCHA_SCAN_BYTES]))
+
+
+def host_recently_blocked(host: str) -> bool:
+    """Check whether direct fetches to a host were blocked within BLOCK_MEMORY_SECONDS."""
+    blocked_at = _blocked_hosts.get(host)
+    return blocked_at is not None and time.time() - blocked_at < BLOCK_MEMORY_SECONDS
+
+
+class FetchManager:
+    """Tiered fetcher for one search.
+
+    Each fetch tries a plain request first with a short timeout and only
+    escalates to ScraperAPI on a block signal (403/429/503 or a captcha
+    page). Every request is logged to the scraper_usage table, with the
+    credits it cost. ScraperAPI requests are refused once the per-search
+    budget (this instance) or the daily budget (all searches since UTC
+    midnight) would be exceeded. Safe to share between worker threads.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, scraper_api_key: str = None,
+                 daily_budget: int = DEFAULT_DAILY_CREDITS,
+                 search_budget: int = DEFAULT_SEARCH_CREDITS,
+                 search_label: str = None, credit_cost: int = SCRAPER_CREDIT_COST):
+        self.scraper_api_key = scraper_api_key
+        self.daily_budget = daily_budget
+        self.search_budget = search_budget
+        self.search_label = search_label
+        self.credit_cost = credit_cost
+        self.search_id = uuid.uuid4().hex[:12]
+        self.search_credits = 0
+        self.stats = {'direct': 0, 'escalated': 0, 'scraper': 0, 'blocked': 0, 'budget_refused': 0}
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            from database import SponsorDatabase
+            # Own connection, so worker threads never share the app's cursor
+            self._db = SponsorDatabase(db_path)
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update({'User-Agent': USER_AGENT})
+            session.verify = False  # allow sites with cert issues
+            self._local.session = session
+        return session
+
+    def _log(self, url: str, host: str, tier: str, status_code: Optional[int],
+             outcome: str, credits: int, elapsed: float, size: int = 0):
+        FETCH_SECONDS.observe(elapsed, host=host, tier=tier)
+        FETCH_REQUESTS.inc(tier=tier, outcome=outcome)
+        if size:
+            FETCH_BYTES.inc(size, tier=tier)
+        if credits:
+            SCRAPER_CREDITS.inc(credits)
+        with self._lock:
+            # Checked under the lock: close() may run while workers still finish fetches
+            if self._db is None:
+                return
+            self._db.log_fetch(url, host, tier, status_code, outcome, credits,
+                               int(elapsed * 1000), self.search_id, self.search_label)
+
+    def credits_used_today(self) -> int:
+        """Credits metered since UTC midnight (all searches)."""
+        with self._lock:
+            if self._db is None:
+                return 0
+            return self._db.get_scraper_credits_used()
+
+    def _reserve(self, credits: int):
+        """Reserve credits against both budgets, or raise BudgetExceeded."""
+        global _reserved_credits
+        with _budget_lock:
+            if self.search_budget and self.search_credits + credits > self.search_budget:
+                raise BudgetExceeded(f"Search budget of {self.search_budget} credits used")
+            if self.daily_budget and (self.credits_used_today() + _reserved_credits + credits
+                                      > self.daily_budget):
+                raise BudgetExceeded(f"Daily budget of {self.daily_budget} credits used")
+            _reserved_credits += credits
+            self.search_credits += credits
+
+    def _release(self, credits: int):
+        global _reserved_credits
+        with _budget_lock:
+            _reserved_credits -= credits
+
+    def _fetch_direct(self, url: str, host: str, timeout: float,
+                      headers: Optional[Dict[str, str]] = None) -> Dict:
+        started = time.perf_counter()
+        try:
+            with FETCHES_IN_FLIGHT.track(tier='direct'):
+                response = self._session().get(url, timeout=timeout, headers=headers)
+        except requests.RequestException as e:
+            self._log(url, host, 'direct', None, 'error', 0, time.perf_counter() - started)
+            return {'html': None, 'status': None, 'blocked': False, 'error': str(e)[:200]}
+        if response.status_code == 304:
+            self._log(url, host, 'direct', 304, 'not_modified', 0, time.perf_counter() - started)
+            return {'html': None, 'status': 304, 'blocked': False, 'error': None, 'not_modified': True,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')}
+        blocked = is_blocked(response.status_code, response.text)
+        outcome = 'blocked' if blocked else ('ok' if response.status_code == 200 else 'error')
+        self._log(url, host, 'direct', response.status_code, outcome, 0, time.perf_counter() - started,
+                  len(response.content))
+        return {
+            'html': response.text if outcome == 'ok' else None,
+            'status': response.status_code,
+            'blocked': blocked,
+            'error': None if outcome == 'ok' else f"Status {response.status_code}",
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+
+    def _fetch_scraper(self, url: str, host: str) -> Dict:
+        self._reserve(self.credit_cost)
+        # The reservation is held until the charge is logged, so a concurrent
+        # _reserve always sees these credits in one place or the other
+        try:
+            return self._request_scraper(url, host)
+        finally:
+            self._release(self.credit_cost)
+
+    def _request_scraper(self, url: str, host: str) -> Dict:
+        started = time.perf_counter()
+        scraper_url = ("http://api.scraperapi.com?api_key="
+                       f"{self.scraper_api_key}&url={urllib.parse.quote(url, safe='')}")
+        try:
+            with FETCHES_IN_FLIGHT.track(tier='scraper'):
+                response = self._session().get(scraper_url, timeout=SCRAPER_TIMEOUT)
+        except requests.RequestException as e:
+            # Failed ScraperAPI requests are not charged
+            with _budget_lock:
+                self.search_credits -= self.credit_cost
+            self._log(url, host, 'scraper', None, 'error', 0, time.perf_counter() - started)
+            return {'html': None, 'status': None, 'blocked': False, 'error': str(e)[:200]}
+
+        ok = response.status_code == 200
+        credits = self.credit_cost if ok else 0
+        if not ok:
+            with _budget_lock:
+                self.search_credits -= self.credit_cost
+        self._log(url, host, 'scraper', response.status_code, 'ok' if ok else 'error',
+                  credits, time.perf_counter() - started, len(response.content))
+        error = None
+        if not ok:
+            error = f"Status {response.status_code}"
+            if response.text:
+                error += f": {response.text[:100]}"
+        return {'html': response.text if ok else None, 'status': response.status_code,
+                'blocked': False, 'error': error}
+
+    def fetch(self, url: str, allow_scraper: bool = True, force_scraper: bool = False,
+              direct_timeout: float = DIRECT_TIMEOUT, headers: Optional[Dict[str, str]] = None) -> Dict:
+        """Fetch a page, escalating to ScraperAPI only if the direct request is blocked.
+
+        Returns {'html', 'status', 'tier', 'credits', 'blocked', 'error'},
+        plus the response's 'etag' and 'last_modified' validators for
+        direct fetches; html is None on failure. headers go on the direct
+        request only - pass If-None-Match / If-Modified-Since there, and a
+        304 comes back with not_modified=True and no html. Never raises for
+        network errors or budget exhaustion - those come back in 'error'.
+        """
+        host = normalize_host(url) or ''
+        can_escalate = allow_scraper and bool(self.scraper_api_key)
+
+        # Skip the doomed direct attempt for hosts that just blocked us
+        if not (force_scraper or (can_escalate and host_recently_blocked(host))):
+            result = self._fetch_direct(url, host, direct_timeout, headers)
+            result['tier'] = 'direct'
+            result['credits'] = 0
+            if result['blocked']:
+                _blocked_hosts[host] = time.time()
+                with self._lock:
+                    self.stats['blocked'] += 1
+            if not result['blocked'] or not can_escalate:
+                if result['html'] is not None:
+                    with self._lock:
+                        self.stats['direct'] += 1
+                return result
+            with self._lock:
+                self.stats['escalated'] += 1
+        elif not can_escalate:
+            return {'html': None, 'status': None, 'tier': 'scraper', 'credits': 0,
+                    'blocked': False, 'error': "requires ScraperAPI"}
+
+        try:
+            result = self._fetch_scraper(url, host)
+        except BudgetExceeded as e:
+            FETCH_REQUESTS.inc(tier='scraper', outcome='budget_refused')
+            with self._lock:
+                self.stats['budget_refused'] += 1
+            return {'html': None, 'status': None, 'tier': 'scraper', 'credits': 0,
+                    'blocked': True, 'error': str(e)}
+        result['tier'] = 'scraper'
+        result['credits'] = self.credit_cost if result['html'] is not None else 0
+        if result['html'] is not None:
+            with self._lock:
+                self.stats['scraper'] += 1
+        return result
+
+    def usage(self) -> Dict:
+        """Credits used by this search and today, with the budgets and tier counts."""
+        return {
+            'search_credits': self.search_credits,
+            'search_budget': self.search_budget,
+            'daily_credits': self.credits_used_today(),
+            'daily_budget': self.daily_budget,
+            **self.stats,
+        }
+
+    def close(self):
+        """Close the metering connection (fetches still running afterwards go unlogged)."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
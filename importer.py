@@ -0,0 +1,250 @@
+"""
+Import Manager for Integrated Sponsor Center
+Streams companies and contacts from CSV/NDJSON files into the database
+"""
+
+import csv
+import io
+import json
+import re
+import time
+from typing import Dict, Iterator, List, Optional, Set, TextIO, Tuple
+
+from database import SponsorDatabase
+from domains import canonical_domain, canonical_url, display_domain
+
+# Rows written per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Per-row errors kept in the report (the total is always counted)
+MAX_REPORTED_ERRORS = 500
+
+COMPANY_TYPES = ('sponsor', 'vendor')
+
+EMAIL_RE = re.compile(r'^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$')
+EMAIL_SPLIT_RE = re.compile(r'[,;\s]+')
+
+
+def detect_format(file_name: str) -> str:
+    """Guess the import format from a file name."""
+    lower = file_name.lower()
+    if lower.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_records(stream: TextIO, fmt: str = 'csv') -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Yield (line_number, record, parse_error) for each row without loading the whole file."""
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Invalid JSON: {e}"
+                continue
+            if not isinstance(record, dict):
+                yield line_number, None, "Expected a JSON object"
+                continue
+            # Keys are matched case-insensitively, as CSV headers are
+            yield line_number, {str(k).strip().lower(): v for k, v in record.items()}, None
+    elif fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            # Header is line 1, so data rows start at 2
+            yield reader.line_num, {k.strip().lower(): v for k, v in record.items() if k}, None
+    else:
+        raise ValueError(f"Unknown import format {fmt!r}; expected 'csv' or 'ndjson'")
+
+
+def _text(record: Dict, *keys: str) -> Optional[str]:
+    """The first non-empty value among keys as stripped text.
+
+    Numbers and booleans are converted; lists and objects raise ValueError.
+    """
+    for key in keys:
+        value = record.get(key)
+        if value is None:
+            continue
+        if isinstance(value, (dict, list)):
+            raise ValueError(f"Invalid {key} {value!r}")
+        text = str(value).strip()
+        if text:
+            return text
+    return None
+
+
+def _parse_record(record: Dict, default_type: str) -> Tuple[Dict, List[str]]:
+    """Turn a raw record into a companies row plus its emails. Raises ValueError on bad rows."""
+    url = canonical_url(_text(record, 'url', 'website') or '')
+    if not url:
+        raise ValueError("Missing or invalid url")
+
+    company_type = (_text(record, 'type') or default_type or '').strip().lower()
+    if company_type not in COMPANY_TYPES:
+        raise ValueError(f"Invalid type {company_type!r}")
+
+    try:
+        relevance_score = int(record.get('relevance_score') or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid relevance_score {record.get('relevance_score')!r}")
+
+    raw_emails = record.get('emails') or record.get('email') or []
+    if isinstance(raw_emails, str):
+        raw_emails = EMAIL_SPLIT_RE.split(raw_emails)
+    elif not isinstance(raw_emails, (list, tuple)):
+        raise ValueError(f"Invalid emails {raw_emails!r}")
+    emails = []
+    for email in raw_emails:
+        if not isinstance(email, str):
+            raise ValueError(f"Invalid email {email!r}")
+        email = email.strip().lower()
+        if not email:
+            continue
+        if not EMAIL_RE.match(email):
+            raise ValueError(f"Invalid email {email!r}")
+        if email not in emails:
+            emails.append(email)
+
+    company = {
+        'name': _text(record, 'name') or display_domain(url),
+        'url': url,
+        'type': company_type,
+        'industry': _text(record, 'industry'),
+        'project_part': _text(record, 'project_part', 'project', 'part'),
+        'relevance_score': relevance_score,
+        'notes': _text(record, 'notes'),
+    }
+    return company, emails
+
+
+def import_companies(db: SponsorDatabase, stream: TextIO, fmt: str = 'csv',
+                     default_type: str = 'sponsor', dry_run: bool = False,
+                     batch_size: int = IMPORT_BATCH_SIZE) -> Dict:
+    """Import companies (and their emails) from a CSV or NDJSON text stream.
+
+    URLs are normalized and deduplicated by canonical domain, both within
+    the file and against the companies table; contacts from duplicate rows
+    are still merged into the company kept. Each batch is written in a single
+    transaction. With dry_run nothing is written, but the report shows
+    what would have been.
+    """
+    stats = {
+        'rows_read': 0, 'companies_inserted': 0, 'duplicates': 0,
+        'contacts_added': 0, 'error_count': 0, 'errors': [], 'dry_run': dry_run,
+    }
+    seen_domains = set()
+    # Canonical domain -> (company row, emails); the row is None for a domain
+    # first seen in an earlier batch, whose later rows only add contacts
+    batch: Dict[str, Tuple[Optional[Dict], List[str]]] = {}
+    # Dry run only: emails counted for companies that would be inserted
+    planned: Dict[str, Set[str]] = {}
+
+    def record_error(line_number: int, message: str):
+        stats['error_count'] += 1
+        if len(stats['errors']) < MAX_REPORTED_ERRORS:
+            stats['errors'].append({'line': line_number, 'error': message})
+
+    def flush():
+        existing = db.get_company_ids_by_domains(list(batch))
+        rows = [(domain, company) for domain, (company, _) in batch.items() if company is not None]
+        new_companies = [company for domain, company in rows if domain not in existing]
+        stats['duplicates'] += len(rows) - len(new_companies)
+
+        if dry_run:
+            stats['companies_inserted'] += len(new_companies)
+            stored = db.get_contact_emails(list(existing.values()))
+            for domain, (_, emails) in batch.items():
+                if domain in existing:
+                    known = stored.get(existing[domain], set())
+                else:
+                    known = planned.setdefault(domain, set())
+                new_emails = set(emails) - known
+                stats['contacts_added'] += len(new_emails)
+                if domain not in existing:
+                    known.update(new_emails)
+        else:
+            try:
+                stats['companies_inserted'] += db.bulk_add_companies(new_companies, commit=False)
+                ids = db.get_company_ids_by_domains(list(batch))
+                contacts = [(ids[domain], email)
+                            for domain, (_, emails) in batch.items()
+                            for email in emails if domain in ids]
+                stats['contacts_added'] += db.bulk_add_contacts(contacts, commit=False)
+                db.conn.commit()
+            except Exception:
+                db.conn.rollback()
+                raise
+        batch.clear()
+
+    started = time.perf_counter()
+    for line_number, record, parse_error in iter_records(stream, fmt):
+        stats['rows_read'] += 1
+        if parse_error:
+            record_error(line_number, parse_error)
+            continue
+        try:
+            company, emails = _parse_record(record, default_type)
+        except ValueError as e:
+            record_error(line_number, str(e))
+            continue
+
+        domain = canonical_domain(company['url'])
+        if domain in seen_domains:
+            # The company is kept from its first row; this row's contacts are merged into it
+            stats['duplicates'] += 1
+            merged = batch.setdefault(domain, (None, []))[1]
+            merged.extend(email for email in emails if email not in merged)
+        else:
+            seen_domains.add(domain)
+            batch[domain] = (company, emails)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    stats['seconds'] = time.perf_counter() - started
+    stats['rows_per_sec'] = stats['rows_read'] / stats['seconds'] if stats['seconds'] > 0 else 0.0
+    return stats
+
+
+def import_file(db: SponsorDatabase, path: str, fmt: str = None, **kwargs) -> Dict:
+    """Import companies from a CSV/NDJSON file on disk."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as stream:
+        return import_companies(db, stream, fmt or detect_format(path), **kwargs)
+
+
+def import_upload(db: SponsorDatabase, uploaded_file, fmt: str = None, **kwargs) -> Dict:
+    """Import companies from a binary file-like upload (e.g. Streamlit's UploadedFile)."""
+    stream = io.TextIOWrapper(uploaded_file, encoding='utf-8-sig', newline='')
+    try:
+        return import_companies(db, stream, fmt or detect_format(getattr(uploaded_file, 'name', '')), **kwargs)
+    finally:
+        stream.detach()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk import companies from CSV/NDJSON")
+    parser.add_argument('path')
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--format', choices=['csv', 'ndjson'])
+    parser.add_argument('--type', dest='default_type', choices=COMPANY_TYPES, default='sponsor')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    with SponsorDatabase(args.db) as db:
+        result = import_file(db, args.path, args.format, default_type=args.default_type,
+                             dry_run=args.dry_run)
+
+    print(f"{'Dry run: ' if result['dry_run'] else ''}{result['rows_read']:,} rows in "
+          f"{result['seconds']:.2f}s ({result['rows_per_sec']:,.0f} rows/sec)")
+    print(f"  companies inserted: {result['companies_inserted']:,}")
+    print(f"  duplicates skipped: {result['duplicates']:,}")
+    print(f"  contacts added:     {result['contacts_added']:,}")
+    print(f"  errors:             {result['error_count']:,}")
+    for error in result['errors'][:20]:
+        print(f"    line {error['line']}: {error['error']}")
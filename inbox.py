@@ -0,0 +1,440 @@
+"""
+Inbox Ingestion for Integrated Sponsor Center
+Incremental Maildir/mbox scan matching replies and delivery failures to sent emails
+"""
+
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from email.parser import BytesHeaderParser, BytesParser, HeaderParser
+from email.utils import getaddresses, parseaddr, parsedate_to_datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from worker import PeriodicWorker
+
+# Messages recorded per transaction
+BATCH_SIZE = 500
+
+# Bytes read from a Maildir file for header-only parsing (bounces are read whole)
+HEADER_READ_BYTES = 16 * 1024
+
+MESSAGE_ID_RE = re.compile(r'<[^<>\s]+@[^<>\s]+>')
+STATUS_CODE_RE = re.compile(r'\b([245])\.\d{1,3}\.\d{1,3}\b')
+
+# Senders and subjects of delivery failure notices that aren't proper multipart/report DSNs
+BOUNCE_SENDER_RE = re.compile(r'^(mailer-daemon|postmaster|mail-daemon|mailer)@', re.I)
+BOUNCE_SUBJECT_RE = re.compile(
+    r'undeliver|delivery (status notification|failure|has failed)|returned mail|mail delivery failed|'
+    r'failure notice|could not be delivered', re.I)
+
+AUTO_REPLY_SUBJECT_RE = re.compile(r'^(auto(matic)?[ -]?reply|out of (the )?office|autoreply)', re.I)
+
+COUNTERS = ('messages', 'replies', 'bounces', 'delayed', 'auto_replies', 'own', 'unmatched', 'errors')
+
+_header_parser = BytesHeaderParser()
+_full_parser = BytesParser()
+
+
+def detect_kind(path: str) -> str:
+    """'maildir' for a directory with cur/ and new/, otherwise 'mbox'."""
+    if os.path.isdir(path):
+        if os.path.isdir(os.path.join(path, 'cur')) or os.path.isdir(os.path.join(path, 'new')):
+            return 'maildir'
+        raise ValueError(f"{path} is a directory but not a Maildir (no cur/ or new/)")
+    return 'mbox'
+
+
+def maildir_key(name: str) -> str:
+    """A Maildir message's unique name, stable when it moves from new/ to cur/ and its flags change."""
+    return name.split(':', 1)[0]
+
+
+def iter_maildir(path: str, seen: set) -> Iterator[Tuple[str, str]]:
+    """(key, file path) of every Maildir message whose key isn't in seen."""
+    for sub in ('new', 'cur'):
+        directory = os.path.join(path, sub)
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                key = maildir_key(entry.name)
+                if key not in seen:
+                    seen.add(key)
+                    yield key, entry.path
+
+
+def iter_mbox(path: str, offset: int = 0) -> Iterator[Tuple[bytes, int]]:
+    """(raw message, end offset) of every mbox message starting at byte offset.
+
+    Reads sequentially from offset instead of indexing the whole file as
+    mailbox.mbox does. A trailing message without its final newline is
+    treated as still being written and left for the next scan.
+    """
+    with open(path, 'rb') as handle:
+        handle.seek(offset)
+        lines = []
+        position = offset
+        previous_blank = True
+        for line in handle:
+            if line.startswith(b'From ') and previous_blank and lines:
+                yield b''.join(lines), position
+                lines = []
+            position += len(line)
+            lines.append(line)
+            previous_blank = line in (b'\n', b'\r\n')
+        if lines and lines[-1].endswith(b'\n'):
+            yield b''.join(lines), position
+
+
+def _mbox_body(raw: bytes) -> bytes:
+    """An mbox message without its From_ line."""
+    if raw.startswith(b'From '):
+        newline = raw.find(b'\n')
+        return raw[newline + 1:] if newline >= 0 else b''
+    return raw
+
+
+def _message_ids(value: Optional[str]) -> List[str]:
+    return MESSAGE_ID_RE.findall(str(value)) if value else []
+
+
+def _local_time(value: Optional[str]) -> str:
+    """A Date header as local ISO time (as update_email_status stores it), or now."""
+    try:
+        parsed = parsedate_to_datetime(str(value))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone().replace(tzinfo=None)
+        return parsed.isoformat()
+    except (TypeError, ValueError, IndexError):
+        return datetime.now().isoformat()
+
+
+def looks_like_bounce(headers) -> bool:
+    """Whether headers belong to a delivery failure notice (read the whole message to parse it)."""
+    content_type = str(headers.get('Content-Type', '')).lower()
+    if 'multipart/report' in content_type and 'delivery-status' in content_type:
+        return True
+    sender = parseaddr(str(headers.get('From', '')))[1]
+    return bool(BOUNCE_SENDER_RE.match(sender) or (
+        not headers.get('In-Reply-To') and BOUNCE_SUBJECT_RE.search(str(headers.get('Subject', '')))))
+
+
+def is_auto_reply(headers) -> bool:
+    """Out-of-office and other automatic answers (RFC 3834 plus common vendor headers)."""
+    auto_submitted = str(headers.get('Auto-Submitted', 'no')).lower()
+    return (auto_submitted != 'no'
+            or bool(headers.get('X-Autoreply') or headers.get('X-Autorespond'))
+            or str(headers.get('Precedence', '')).lower() in ('auto_reply', 'bulk', 'junk')
+            or bool(AUTO_REPLY_SUBJECT_RE.match(str(headers.get('Subject', '')))))
+
+
+def parse_bounce(message) -> Dict:
+    """Details of a delivery failure notice.
+
+    Returns {'action', 'status', 'recipients', 'message_ids', 'diagnostic'}:
+    action is 'failed' or 'delayed' (RFC 3464 Action, else from the status
+    code; defaults to 'failed'), recipients are lowercased Final-Recipient
+    addresses, and message_ids are the returned message's Message-IDs.
+    Falls back to scanning the text for non-standard notices.
+    """
+    actions = []
+    status = None
+    diagnostic = None
+    recipients = []
+    message_ids = []
+    text_parts = []
+
+    for part in message.walk():
+        content_type = part.get_content_type()
+        if content_type == 'message/delivery-status':
+            # compat32 parses each field block into a Message
+            for block in part.get_payload() or []:
+                if not hasattr(block, 'get'):
+                    continue
+                if block.get('Action'):
+                    actions.append(str(block['Action']).strip().lower())
+                if block.get('Status') and status is None:
+                    status = str(block['Status']).strip().split()[0]
+                if block.get('Diagnostic-Code') and diagnostic is None:
+                    diagnostic = ' '.join(str(block['Diagnostic-Code']).split())
+                recipient = block.get('Final-Recipient') or block.get('Original-Recipient')
+                if recipient:
+                    recipients.append(str(recipient).split(';')[-1].strip().strip('<>').lower())
+        elif content_type == 'message/rfc822':
+            for returned in part.get_payload() or []:
+                if hasattr(returned, 'get'):
+                    message_ids += _message_ids(returned.get('Message-ID'))
+        elif content_type == 'text/rfc822-headers':
+            payload = part.get_payload(decode=True) or b''
+            returned = HeaderParser().parsestr(payload.decode('utf-8', 'replace'))
+            message_ids += _message_ids(returned.get('Message-ID'))
+        elif part.get_content_maintype() == 'text':
+            payload = part.get_payload(decode=True)
+            if payload:
+                text_parts.append(payload.decode(part.get_content_charset() or 'utf-8', 'replace'))
+
+    text = '\n'.join(text_parts)
+    if status is None:
+        match = STATUS_CODE_RE.search(text)
+        status = match.group(0) if match else None
+    if not message_ids:
+        # Non-standard notices quote the original headers in the body
+        message_ids = _message_ids(text)
+    if diagnostic is None:
+        diagnostic = next((line.strip() for line in text.splitlines()
+                           if STATUS_CODE_RE.search(line) or re.search(r'\b5\d\d\b', line)), None)
+
+    if actions:
+        action = 'failed' if 'failed' in actions else actions[0]
+    else:
+        action = 'delayed' if status and status.startswith('4.') else 'failed'
+    return {'action': action, 'status': status, 'recipients': recipients,
+            'message_ids': message_ids, 'diagnostic': (diagnostic or '')[:300] or None}
+
+
+class InboxIndex:
+    """Sent emails to match incoming mail against, by Message-ID and by recipient."""
+
+    def __init__(self, db):
+        self.by_message_id, self.by_recipient = db.get_sent_email_index()
+
+    def find(self, message_ids: List[str], addresses: List[str] = ()) -> Tuple[Optional[Dict], Optional[str]]:
+        """(email, matched_by) for the first referenced Message-ID, else the latest email to an address."""
+        for message_id in message_ids:
+            email = self.by_message_id.get(message_id)
+            if email is not None:
+                return email, 'message_id'
+        for address in addresses:
+            email = self.by_recipient.get(address.lower())
+            if email is not None:
+                return email, 'recipient'
+        return None, None
+
+
+def classify(headers, index: InboxIndex, read_full) -> Tuple[str, Optional[Dict], Optional[str]]:
+    """Classify one incoming message: (kind, matched email, detail).
+
+    kind is one of 'reply', 'bounce', 'delayed', 'auto_reply', 'own' (a
+    copy of a message we sent) or 'unmatched'. Replies match on
+    In-Reply-To/References, else on the sender being a contact we
+    emailed; bounces match on the returned Message-ID, else on the failed
+    recipient. read_full() returns the whole parsed message and is only
+    called for suspected bounces.
+    """
+    if index.find(_message_ids(headers.get('Message-ID')))[0] is not None:
+        return 'own', None, None
+
+    if looks_like_bounce(headers):
+        bounce = parse_bounce(read_full())
+        email, _ = index.find(bounce['message_ids'], bounce['recipients'])
+        if email is None:
+            return 'unmatched', None, None
+        if bounce['action'] != 'failed':
+            return 'delayed', email, None
+        detail = ' '.join(filter(None, [bounce['status'], bounce['diagnostic']])) or 'Delivery failed'
+        return 'bounce', email, detail
+
+    referenced = _message_ids(headers.get('In-Reply-To')) + _message_ids(headers.get('References'))[::-1]
+    senders = [address for _, address in getaddresses([str(headers.get('From', ''))]) if address]
+    email, matched_by = index.find(referenced, senders)
+    if email is None:
+        return 'unmatched', None, None
+    if is_auto_reply(headers):
+        return 'auto_reply', email, None
+    return 'reply', email, matched_by
+
+
+class _Batch:
+    """Classified messages waiting for one apply_inbox_batch transaction."""
+
+    def __init__(self, db, source: str, kind: str, stats: Dict):
+        self.db = db
+        self.source = source
+        self.kind = kind
+        self.stats = stats
+        self.replies = []
+        self.bounces = []
+        self.keys = []
+        self.messages = 0
+
+    def add(self, headers, kind: str, email: Optional[Dict], detail: Optional[str], key: str = None):
+        self.messages += 1
+        if key is not None:
+            self.keys.append(key)
+        if kind == 'reply':
+            sender = parseaddr(str(headers.get('From', '')))[1] or 'unknown sender'
+            self.replies.append((email['id'], email['company_id'], _local_time(headers.get('Date')),
+                                 f"Reply from {sender} to '{email['subject']}'"))
+        elif kind == 'bounce':
+            self.bounces.append((email['id'], email['company_id'], detail[:500]))
+
+    def flush(self, offset: int = None, inode: int = None, force: bool = False):
+        if not (self.messages or force):
+            return
+        changed = self.db.apply_inbox_batch(self.source, self.kind, self.replies, self.bounces, self.keys,
+                                            offset, inode, self.messages)
+        self.stats['replied'] += changed['replied']
+        self.stats['bounced'] += changed['bounced']
+        self.replies, self.bounces, self.keys, self.messages = [], [], [], 0
+
+
+def _new_stats(source: str, kind: str) -> Dict:
+    stats = {'source': source, 'kind': kind, 'replied': 0, 'bounced': 0}
+    stats.update((counter, 0) for counter in COUNTERS)
+    return stats
+
+
+def _count(stats: Dict, kind: str):
+    stats['messages'] += 1
+    stats[{'reply': 'replies', 'bounce': 'bounces', 'delayed': 'delayed', 'auto_reply': 'auto_replies',
+           'own': 'own', 'unmatched': 'unmatched'}[kind]] += 1
+
+
+def _read_headers(path: str):
+    with open(path, 'rb') as handle:
+        head = handle.read(HEADER_READ_BYTES)
+    # Headers end at the first blank line; a longer header block is parsed as far as it was read
+    end = head.find(b'\n\n')
+    if end < 0:
+        end = head.find(b'\r\n\r\n')
+    return _header_parser.parsebytes(head[:end + 1] if end >= 0 else head)
+
+
+def _read_message(path: str):
+    with open(path, 'rb') as handle:
+        return _full_parser.parse(handle)
+
+
+def ingest_maildir(db, path: str, index: Optional[InboxIndex] = None, batch_size: int = BATCH_SIZE) -> Dict:
+    """Process the Maildir messages not seen by a previous scan."""
+    source = os.path.abspath(path)
+    stats = _new_stats(source, 'maildir')
+    index = index or InboxIndex(db)
+    batch = _Batch(db, source, 'maildir', stats)
+    for key, file_path in iter_maildir(source, db.get_inbox_seen(source)):
+        try:
+            headers = _read_headers(file_path)
+            kind, email, detail = classify(headers, index, lambda: _read_message(file_path))
+        except FileNotFoundError:
+            # Moved between new/ and cur/ mid-scan; picked up under its new name next time
+            continue
+        except Exception:
+            stats['errors'] += 1
+            batch.add(None, 'unmatched', None, None, key)
+            continue
+        _count(stats, kind)
+        batch.add(headers, kind, email, detail, key)
+        if batch.messages >= batch_size:
+            batch.flush()
+    batch.flush(force=True)
+    return stats
+
+
+def ingest_mbox(db, path: str, index: Optional[InboxIndex] = None, batch_size: int = BATCH_SIZE) -> Dict:
+    """Process the mbox messages appended since the stored offset.
+
+    The file is read from the byte offset reached by the previous scan;
+    if it shrank or was replaced (new inode), it is read from the start.
+    """
+    source = os.path.abspath(path)
+    stats = _new_stats(source, 'mbox')
+    if not os.path.exists(source):
+        return stats
+    index = index or InboxIndex(db)
+    state = db.get_inbox_source(source) or {}
+    file_stat = os.stat(source)
+    offset = state.get('offset') or 0
+    if offset > file_stat.st_size or (state.get('inode') and state['inode'] != file_stat.st_ino):
+        offset = 0
+
+    batch = _Batch(db, source, 'mbox', stats)
+    end = offset
+    for raw, end in iter_mbox(source, offset):
+        raw = _mbox_body(raw)
+        try:
+            headers = _header_parser.parsebytes(raw)
+            kind, email, detail = classify(headers, index, lambda: _full_parser.parsebytes(raw))
+        except Exception:
+            stats['errors'] += 1
+            batch.add(None, 'unmatched', None, None)
+            continue
+        _count(stats, kind)
+        batch.add(headers, kind, email, detail)
+        if batch.messages >= batch_size:
+            batch.flush(end, file_stat.st_ino)
+    batch.flush(end, file_stat.st_ino, force=True)
+    return stats
+
+
+def ingest(db, paths: List[str], batch_size: int = BATCH_SIZE) -> Dict:
+    """Scan each Maildir or mbox path for new replies and bounces.
+
+    The sent-email index is built once for all paths. Returns totals
+    (messages, replies, bounces, replied, bounced, ...; replied/bounced
+    count emails whose status changed) plus per-source stats and seconds.
+    """
+    started = time.perf_counter()
+    index = InboxIndex(db)
+    totals = {'replied': 0, 'bounced': 0, 'sources': []}
+    totals.update((counter, 0) for counter in COUNTERS)
+    for path in paths:
+        if detect_kind(path) == 'maildir':
+            stats = ingest_maildir(db, path, index, batch_size)
+        else:
+            stats = ingest_mbox(db, path, index, batch_size)
+        totals['sources'].append(stats)
+        for counter in COUNTERS + ('replied', 'bounced'):
+            totals[counter] += stats[counter]
+    totals['seconds'] = time.perf_counter() - started
+    return totals
+
+
+class InboxWatcher(PeriodicWorker):
+    """Background thread ingesting new replies and bounces every interval.
+
+    Uses its own database connection per run.
+    """
+
+    def __init__(self, db_path: str, paths: List[str], interval_seconds: float = 600):
+        super().__init__(interval_seconds, name="inbox-watcher")
+        self.db_path = db_path
+        self.paths = paths
+        self.last_run: Optional[Dict] = None
+        self._run_lock = threading.Lock()
+
+    def run_once(self) -> Dict:
+        """Ingest whatever arrived since the last scan."""
+        from database import SponsorDatabase
+
+        with self._run_lock, SponsorDatabase(self.db_path) as db:
+            result = ingest(db, self.paths)
+        self.last_run = result
+        return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Match replies and bounces in a Maildir or mbox to sent emails")
+    parser.add_argument('paths', nargs='+', help='Maildir directories and/or mbox files')
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--rescan', action='store_true', help='Forget previous scans and read every message again')
+    args = parser.parse_args()
+
+    from database import SponsorDatabase
+    with SponsorDatabase(args.db) as db:
+        if args.rescan:
+            for path in args.paths:
+                db.reset_inbox_source(os.path.abspath(path))
+        totals = ingest(db, args.paths, args.batch_size)
+        for stats in totals['sources']:
+            print(f"  {stats['source']} ({stats['kind']}): {stats['messages']:,} new messages, "
+                  f"{stats['replies']} replies, {stats['bounces']} bounces, {stats['delayed']} delayed, "
+                  f"{stats['auto_replies']} auto-replies, {stats['unmatched']:,} unmatched, {stats['errors']} errors")
+        print(f"Processed {totals['messages']:,} messages in {totals['seconds']:.2f}s: "
+              f"{totals['replied']} emails marked replied, {totals['bounced']} bounced")
@@ -0,0 +1,279 @@
+"""
+LLM Gateway for Integrated Sponsor Center
+One shared OpenAI client with a prompt-keyed SQLite response cache and per-call usage metering
+"""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import metrics
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+# Cached completions are reused for this long (None = forever)
+DEFAULT_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+# USD per million (prompt, completion) tokens; models match by longest prefix (adjust to current pricing)
+MODEL_PRICES = {
+    'gpt-3.5-turbo': (0.50, 1.50),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-4-turbo': (10.00, 30.00),
+    'gpt-4': (30.00, 60.00),
+}
+
+# Rough characters per token, for streams that don't report usage
+CHARS_PER_TOKEN = 4
+
+LLM_REQUESTS = metrics.counter('llm_requests_total', "Chat completions by model, purpose and outcome (ok, cached, error)",
+                               ('model', 'purpose', 'outcome'))
+LLM_SECONDS = metrics.histogram('llm_seconds', "Chat completion latency (uncached)", ('model',))
+LLM_FIRST_TOKEN_SECONDS = metrics.histogram('llm_first_token_seconds', "Time to the first streamed token", ('model',))
+LLM_TOKENS = metrics.counter('llm_tokens_total', "Tokens used by model and kind (prompt, completion)",
+                             ('model', 'kind'))
+LLM_COST = metrics.counter('llm_cost_usd_total', "Estimated OpenAI spend in USD", ('model',))
+
+
+def cache_key(model: str, messages: List[Dict], params: Dict) -> str:
+    """Stable hash of everything that determines a completion."""
+    payload = json.dumps({'model': model, 'messages': messages, 'params': params},
+                         sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD cost of a completion (0 for unknown models)."""
+    prefix = max((name for name in MODEL_PRICES if model.startswith(name)), key=len, default=None)
+    if prefix is None:
+        return 0.0
+    prompt_price, completion_price = MODEL_PRICES[prefix]
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def usage_tokens(usage, name: str) -> Optional[int]:
+    """A token count from a response's usage, or None.
+
+    openai 1.12 doesn't declare usage on stream chunks, so there it
+    arrives as a plain dict rather than a CompletionUsage.
+    """
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get(name)
+    return getattr(usage, name, None)
+
+
+class LLMGateway:
+    """All OpenAI chat completions go through one gateway per process.
+
+    The OpenAI client (and its HTTP connection pool) is shared by every
+    session and worker thread. Completions are cached in the llm_cache
+    table by a hash of model, messages and parameters, so regenerating a
+    draft with unchanged inputs is answered locally; pass cache=False to
+    force a fresh completion. Every request, cache hits included, is
+    logged to llm_usage with its tokens, latency and estimated cost.
+    Safe to share between threads.
+    """
+
+    def __init__(self, api_key: str = None, db_path: Optional[str] = None,
+                 cache_ttl_seconds: Optional[float] = DEFAULT_CACHE_TTL_SECONDS, client=None):
+        if client is None:
+            from openai import OpenAI
+            # call_with_retry owns retries; the SDK would otherwise retry each attempt twice more
+            client = OpenAI(api_key=api_key, max_retries=0)
+        self.client = client
+        self.cache_ttl_seconds = cache_ttl_seconds
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            from database import SponsorDatabase
+            # Own connection, so worker threads never share the app's cursor
+            self._db = SponsorDatabase(db_path)
+
+    def _cached(self, key: str) -> Optional[Dict]:
+        if self._db is None:
+            return None
+        with self._lock:
+            return self._db.get_llm_cache(key, self.cache_ttl_seconds)
+
+    def _store(self, key: str, model: str, text: str, prompt_tokens: int, completion_tokens: int):
+        if self._db is None or not text:
+            return
+        with self._lock:
+            self._db.put_llm_cache(key, model, text, prompt_tokens, completion_tokens)
+
+    def _log(self, model: str, purpose: Optional[str], started: float, prompt_tokens: int = 0,
+             completion_tokens: int = 0, cached: bool = False, first_token: Optional[float] = None,
+             error: Optional[Exception] = None):
+        cost = 0.0 if cached else estimate_cost(model, prompt_tokens, completion_tokens)
+        LLM_REQUESTS.inc(model=model, purpose=purpose or '', outcome='error' if error else ('cached' if cached else 'ok'))
+        if not cached:
+            LLM_SECONDS.observe(time.perf_counter() - started, model=model)
+            LLM_TOKENS.inc(prompt_tokens, model=model, kind='prompt')
+            LLM_TOKENS.inc(completion_tokens, model=model, kind='completion')
+            LLM_COST.inc(cost, model=model)
+        if first_token:
+            LLM_FIRST_TOKEN_SECONDS.observe(first_token - started, model=model)
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.log_llm_call(
+                model, purpose, prompt_tokens, completion_tokens, cost,
+                latency_ms=int((time.perf_counter() - started) * 1000),
+                first_token_ms=int((first_token - started) * 1000) if first_token else None,
+                cached=cached, outcome='error' if error else 'ok',
+                error=str(error)[:300] if error else None)
+
+    def _lookup(self, model: str, messages: List[Dict], params: Dict, cache: bool) -> Tuple[str, Optional[Dict]]:
+        key = cache_key(model, messages, params)
+        return key, (self._cached(key) if cache else None)
+
+    def complete(self, messages: List[Dict], model: str = DEFAULT_MODEL, max_tokens: int = None,
+                 temperature: float = None, cache: bool = True, purpose: str = None) -> str:
+        """One chat completion's text, from the cache when possible (a TTL of 0 disables caching)."""
+        params = {'max_tokens': max_tokens, 'temperature': temperature}
+        cache = cache and self.cache_ttl_seconds != 0
+        started = time.perf_counter()
+        key, hit = self._lookup(model, messages, params, cache)
+        if hit is not None:
+            self._log(model, purpose, started, hit['prompt_tokens'] or 0, hit['completion_tokens'] or 0,
+                      cached=True)
+            return hit['response']
+
+        try:
+            response = self.client.chat.completions.create(
+                model=model, messages=messages,
+                **{name: value for name, value in params.items() if value is not None})
+        except Exception as e:
+            self._log(model, purpose, started, error=e)
+            raise
+        text = response.choices[0].message.content or ''
+        usage = getattr(response, 'usage', None)
+        prompt_tokens = usage_tokens(usage, 'prompt_tokens') or 0
+        completion_tokens = usage_tokens(usage, 'completion_tokens') or 0
+        self._log(model, purpose, started, prompt_tokens, completion_tokens)
+        if cache:
+            self._store(key, model, text, prompt_tokens, completion_tokens)
+        return text
+
+    def stream(self, messages: List[Dict], model: str = DEFAULT_MODEL, max_tokens: int = None,
+               temperature: float = None, cache: bool = True, purpose: str = None) -> Iterator[str]:
+        """Open a streamed chat completion and return an iterator of its text deltas.
+
+        The request is made before this returns, so connection errors and
+        rate limits raise here (and can be retried) rather than mid-stream.
+        A cache hit comes back as a single delta. The call is metered and
+        cached once the iterator is exhausted or closed.
+        """
+        params = {'max_tokens': max_tokens, 'temperature': temperature}
+        cache = cache and self.cache_ttl_seconds != 0
+        started = time.perf_counter()
+        key, hit = self._lookup(model, messages, params, cache)
+        if hit is not None:
+            self._log(model, purpose, started, hit['prompt_tokens'] or 0, hit['completion_tokens'] or 0,
+                      cached=True)
+            return iter([hit['response']])
+
+        try:
+            # Usage arrives in a final chunk with no choices
+            response = self.client.chat.completions.create(
+                model=model, messages=messages, stream=True,
+                extra_body={'stream_options': {'include_usage': True}},
+                **{name: value for name, value in params.items() if value is not None})
+        except Exception as e:
+            self._log(model, purpose, started, error=e)
+            raise
+        return self._relay(response, key, model, messages, purpose, started, cache)
+
+    def _relay(self, response, key: str, model: str, messages: List[Dict], purpose: Optional[str],
+               started: float, cache: bool) -> Iterator[str]:
+        parts = []
+        usage = None
+        first_token = None
+        error = None
+        complete = False
+        try:
+            for chunk in response:
+                usage = getattr(chunk, 'usage', None) or usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter()
+                parts.append(chunk.choices[0].delta.content)
+                yield chunk.choices[0].delta.content
+            complete = True
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Release the HTTP connection even when the consumer stops reading early
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
+            text = ''.join(parts)
+            prompt_tokens = usage_tokens(usage, 'prompt_tokens')
+            if prompt_tokens is None:
+                prompt_tokens = estimate_tokens(''.join(m.get('content') or '' for m in messages))
+            completion_tokens = usage_tokens(usage, 'completion_tokens') or estimate_tokens(text)
+            self._log(model, purpose, started, prompt_tokens, completion_tokens,
+                      first_token=first_token, error=error)
+            # Only whole responses are reused
+            if cache and complete:
+                self._store(key, model, text, prompt_tokens, completion_tokens)
+
+    def usage(self, days: int = 1) -> Dict:
+        """Requests, tokens, cost and cache hits over the last N UTC days (see get_llm_usage)."""
+        if self._db is None:
+            return {}
+        with self._lock:
+            return self._db.get_llm_usage(days)
+
+    def close(self):
+        """Close the cache and metering connection."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Show LLM usage and manage the response cache")
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--days', type=int, default=1, help='Usage over the last N UTC days (1 = today)')
+    parser.add_argument('--recent', type=int, default=0, help='Also list the N most recent calls')
+    parser.add_argument('--purge-hours', type=float, help='Delete cached completions older than this (0 = all)')
+    args = parser.parse_args()
+
+    from database import SponsorDatabase
+    with SponsorDatabase(args.db) as db:
+        if args.purge_hours is not None:
+            removed = db.purge_llm_cache(args.purge_hours * 3600 if args.purge_hours else None)
+            print(f"Removed {removed} cached completion(s)")
+        usage = db.get_llm_usage(args.days)
+        print(f"{usage['requests']} requests ({usage['cached']} cached, {usage['errors']} errors), "
+              f"{usage['prompt_tokens']:,} prompt + {usage['completion_tokens']:,} completion tokens, "
+              f"${usage['cost']:.4f}")
+        for row in usage['models']:
+            print(f"  {row['model']:<20} {row['requests']:>5} req  ${row['cost']:.4f}  "
+                  f"avg {row['avg_latency_ms'] or 0:,.0f} ms")
+        cache_stats = db.get_llm_cache_stats()
+        print(f"Cache: {cache_stats['entries']} completions, {cache_stats['hits']} hits, "
+              f"oldest {cache_stats['oldest'] or 'n/a'}")
+        for call in db.get_recent_llm_calls(args.recent) if args.recent else []:
+            print(f"  {call['created_at']}  {call['purpose'] or '-':<12} {call['model']:<16} "
+                  f"{'cached' if call['cached'] else call['outcome']:<7} {call['latency_ms'] or 0:>6} ms  "
+                  f"${call['cost']:.5f}")
@@ -0,0 +1,327 @@
+"""
+Metrics for Integrated Sponsor Center
+In-process counters, gauges and histograms, exposed as Prometheus text and a local HTTP endpoint
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Prefix for every metric name in the Prometheus output
+NAMESPACE = "sponsor_center"
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# For sub-millisecond work such as single SQL statements
+FAST_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Label combinations kept per metric; further ones (e.g. more hosts) are folded into OVERFLOW_LABEL
+MAX_SERIES = 500
+OVERFLOW_LABEL = "_other"
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    """A named metric holding one series per label combination."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        key = tuple([labels.get(name, '') for name in self.labelnames])
+        if key not in self._series and len(self._series) >= MAX_SERIES:
+            return (OVERFLOW_LABEL,) * len(self.labelnames)
+        return key
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def series(self) -> Dict[Tuple[str, ...], object]:
+        """A copy of every series, keyed by label values."""
+        with self._lock:
+            return {key: (list(value) if isinstance(value, list) else value) for key, value in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    """A value that only goes up (requests, bytes, credits)."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(tuple([labels.get(name, '') for name in self.labelnames]), 0)
+
+    def expose(self, name: str) -> Iterator[str]:
+        for key, value in sorted(self.series().items()):
+            yield f"{name}{self._label_text(key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """A value that goes up and down (requests in flight, queue depth)."""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the block as in progress while it runs."""
+        self.inc(1, **labels)
+        try:
+            yield
+        finally:
+            self.dec(1, **labels)
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum (latencies, sizes).
+
+    Each series is [bucket counts..., +Inf count, sum].
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def summary(self, key: Tuple[str, ...]) -> Dict:
+        """{'count', 'sum', 'avg', 'p50', 'p95'} of one series (quantiles interpolated within buckets)."""
+        series = self.series().get(key)
+        if not series:
+            return {'count': 0, 'sum': 0.0, 'avg': 0.0, 'p50': 0.0, 'p95': 0.0}
+        counts, total = series[:-1], series[-1]
+        count = sum(counts)
+        return {'count': count, 'sum': total, 'avg': total / count if count else 0.0,
+                'p50': self._quantile(counts, count, 0.5), 'p95': self._quantile(counts, count, 0.95)}
+
+    def _quantile(self, counts: List[int], count: int, q: float) -> float:
+        if not count:
+            return 0.0
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]  # beyond the last bound, like Prometheus' histogram_quantile
+                lower = self.buckets[index - 1] if index else 0.0
+                return lower + (self.buckets[index] - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def expose(self, name: str) -> Iterator[str]:
+        for key, series in sorted(self.series().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                yield f"{name}_bucket{self._label_text(key, le)} {cumulative}"
+            yield f"{name}_sum{self._label_text(key)} {_format_value(series[-1])}"
+            yield f"{name}_count{self._label_text(key)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Every metric in the process, by name.
+
+    Modules create their metrics at import time with counter(), gauge()
+    and histogram(); asking again for an existing name returns the same
+    metric. Recording is a dict update under a per-metric lock, cheap
+    enough for per-request and per-query hot paths. Safe to share
+    between threads.
+    """
+
+    def __init__(self, namespace: str = NAMESPACE):
+        self.namespace = namespace
+        self.started = time.time()
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Tuple[str, ...], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already registered as a {metric.kind} "
+                                 f"with labels {metric.labelnames}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics():
+            name = f"{self.namespace}_{metric.name}" if self.namespace else metric.name
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.expose(name))
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> List[Dict]:
+        """One row per series for display: metric, labels, type, value (or count, sum, avg, p50, p95)."""
+        rows = []
+        for metric in self.metrics():
+            for key, value in sorted(metric.series().items()):
+                row = {'metric': metric.name, 'type': metric.kind,
+                       'labels': ', '.join(f"{name}={label}" for name, label in zip(metric.labelnames, key)
+                                           if label)}
+                if isinstance(metric, Histogram):
+                    row.update(metric.summary(key))
+                else:
+                    row['value'] = value
+                rows.append(row)
+        return rows
+
+    def reset(self):
+        """Clear every series (metrics stay registered)."""
+        for metric in self.metrics():
+            metric.clear()
+        self.started = time.time()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    """A counter in the process-wide registry."""
+    return REGISTRY.counter(name, documentation, labelnames)
+
+
+def gauge(name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+    """A gauge in the process-wide registry."""
+    return REGISTRY.gauge(name, documentation, labelnames)
+
+
+def histogram(name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+              buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    """A histogram in the process-wide registry."""
+    return REGISTRY.histogram(name, documentation, labelnames, buckets)
+
+
+class MetricsServer:
+    """Serves a registry at /metrics over HTTP for a Prometheus scraper.
+
+    Binds to localhost by default; pass host='0.0.0.0' to expose it. Port
+    0 picks a free port (see .port once started).
+    """
+
+    def __init__(self, port: int, host: str = '127.0.0.1', registry: Optional[MetricsRegistry] = None):
+        self.host = host
+        self.port = port
+        self.registry = registry or REGISTRY
+        self._server = None
+        self._thread = None
+
+    def _handler(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # scrapes every few seconds would flood the server log
+
+        return Handler
+
+    def start(self):
+        """Start serving (no-op if already running)."""
+        if self.running:
+            return
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
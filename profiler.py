@@ -0,0 +1,222 @@
+"""
+Rerun Profiler for Integrated Sponsor Center
+Opt-in timing of each section of a Streamlit rerun, with optional cProfile capture for offline analysis
+"""
+
+import cProfile
+import csv
+import io
+import os
+import pstats
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import metrics
+
+# Reruns kept for the rolling breakdown
+DEFAULT_HISTORY = 50
+
+# cProfile files kept in the profile directory (oldest deleted first)
+DEFAULT_KEEP_PROFILES = 20
+
+MODES = ('off', 'timing', 'cprofile')
+
+RERUN_SECTION_SECONDS = metrics.histogram('rerun_section_seconds', "Streamlit rerun time by script section "
+                                          "(profiling mode only)", ('section',))
+
+PROFILE_NAME_RE = re.compile(r'[^a-z0-9]+')
+
+
+def parse_mode(value: Optional[str]) -> str:
+    """Profiling mode from an env var or query param: 'cprofile', 'timing' (1/true/yes/on) or 'off'."""
+    value = (value or '').strip().lower()
+    if value == 'cprofile':
+        return 'cprofile'
+    if value in ('1', 'true', 'yes', 'on', 'timing'):
+        return 'timing'
+    return 'off'
+
+
+class RerunRecord:
+    """Section timings of one rerun.
+
+    checkpoint(name) charges the time since the previous checkpoint (or
+    the start of the rerun) to name, so a top-to-bottom script is timed
+    by marking the end of each section.
+    """
+
+    enabled = True
+
+    def __init__(self, profile: Optional[cProfile.Profile] = None):
+        self.started_at = datetime.now()
+        self.started = time.perf_counter()
+        self.sections: Dict[str, float] = {}
+        self.page: Optional[str] = None
+        self.profile = profile
+        self.profile_path: Optional[str] = None
+        self.total: Optional[float] = None
+        self.interrupted = False
+        self._mark = self.started
+
+    def checkpoint(self, name: str):
+        now = time.perf_counter()
+        self.sections[name] = self.sections.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+
+class _DisabledRecord:
+    """Stand-in when profiling is off: checkpoints cost one method call."""
+
+    enabled = False
+
+    def checkpoint(self, name: str):
+        pass
+
+
+DISABLED = _DisabledRecord()
+
+
+class RerunProfiler:
+    """Collects RerunRecords from every session into a rolling history.
+
+    A rerun ended by st.rerun() or st.stop() never reaches finish(); pass
+    it to the next begin() and it is recorded as interrupted, timed up to
+    its last checkpoint. In 'cprofile' mode each rerun's stats are written
+    to profile_dir as a .prof file (open with pstats or snakeviz). Safe
+    to share between sessions.
+    """
+
+    def __init__(self, profile_dir: str = "profiles", history: int = DEFAULT_HISTORY,
+                 keep_profiles: int = DEFAULT_KEEP_PROFILES):
+        self.profile_dir = profile_dir
+        self.keep_profiles = keep_profiles
+        self.history = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def begin(self, mode: str, previous=None):
+        """Start timing a rerun (DISABLED when mode is 'off')."""
+        if isinstance(previous, RerunRecord) and previous.total is None:
+            self.finish(previous, interrupted=True)
+        if mode == 'off':
+            return DISABLED
+        profile = None
+        if mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None  # another profiler is active on this thread
+        return RerunRecord(profile)
+
+    def finish(self, record, page: Optional[str] = None, interrupted: bool = False):
+        """Close a rerun and add it to the history."""
+        if not isinstance(record, RerunRecord) or record.total is not None:
+            return
+        if record.profile is not None:
+            record.profile.disable()
+            record.profile_path = self._dump(record, page)
+            record.profile = None
+        record.page = page or record.page
+        record.interrupted = interrupted
+        record.total = (record._mark if interrupted else time.perf_counter()) - record.started
+        for section, seconds in record.sections.items():
+            RERUN_SECTION_SECONDS.observe(seconds, section=section)
+        RERUN_SECTION_SECONDS.observe(record.total, section='(total)')
+        with self._lock:
+            self.history.append(record)
+
+    def _dump(self, record: RerunRecord, page: Optional[str]) -> Optional[str]:
+        name = PROFILE_NAME_RE.sub('-', (page or 'rerun').lower()).strip('-')
+        path = os.path.join(self.profile_dir, f"rerun-{record.started_at:%Y%m%d-%H%M%S-%f}-{name}.prof")
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            record.profile.dump_stats(path)
+            for old in self.profile_files()[self.keep_profiles:]:
+                os.remove(old)
+        except OSError:
+            return None
+        return path
+
+    def profile_files(self) -> List[str]:
+        """Saved .prof files, newest first."""
+        if not os.path.isdir(self.profile_dir):
+            return []
+        return sorted((os.path.join(self.profile_dir, name) for name in os.listdir(self.profile_dir)
+                       if name.startswith('rerun-') and name.endswith('.prof')), reverse=True)
+
+    def records(self) -> List[RerunRecord]:
+        with self._lock:
+            return list(self.history)
+
+    def breakdown(self) -> List[Dict]:
+        """Per-section stats over the history, slowest on average first.
+
+        Each row has section, reruns, avg_ms, max_ms, last_ms and share
+        (fraction of the average rerun's total).
+        """
+        records = self.records()
+        if not records:
+            return []
+        timings: Dict[str, List[float]] = {}
+        for record in records:
+            for section, seconds in record.sections.items():
+                timings.setdefault(section, []).append(seconds)
+        average_total = sum(record.total for record in records) / len(records)
+        last = records[-1].sections
+        rows = []
+        for section, values in timings.items():
+            # Sections a rerun skipped count as 0 toward its average
+            average = sum(values) / len(records)
+            rows.append({'section': section, 'reruns': len(values), 'avg_ms': average * 1000,
+                         'max_ms': max(values) * 1000, 'last_ms': last.get(section, 0.0) * 1000,
+                         'share': average / average_total if average_total else 0.0})
+        return sorted(rows, key=lambda row: -row['avg_ms'])
+
+    def export_csv(self) -> str:
+        """The history as CSV: one row per rerun and section."""
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['started_at', 'page', 'interrupted', 'total_ms', 'section', 'ms', 'profile'])
+        for record in self.records():
+            for section, seconds in record.sections.items():
+                writer.writerow([record.started_at.isoformat(), record.page or '', int(record.interrupted),
+                                 round(record.total * 1000, 2), section, round(seconds * 1000, 2),
+                                 record.profile_path or ''])
+        return output.getvalue()
+
+
+def top_functions(path: str, sort: str = 'cumulative', limit: int = 25) -> str:
+    """The pstats report of a saved profile, limited to its top functions."""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return output.getvalue()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize saved rerun profiles")
+    parser.add_argument('paths', nargs='*', help='.prof files (default: the newest in --dir)')
+    parser.add_argument('--dir', default='profiles')
+    parser.add_argument('--sort', default='cumulative', choices=['cumulative', 'tottime', 'calls'])
+    parser.add_argument('--limit', type=int, default=25)
+    parser.add_argument('--merge', action='store_true', help='Combine every file in --dir into one report')
+    args = parser.parse_args()
+
+    profiler = RerunProfiler(args.dir)
+    paths = args.paths or (profiler.profile_files() if args.merge else profiler.profile_files()[:1])
+    if not paths:
+        raise SystemExit(f"No profiles in {args.dir} (run the app with PROFILE_RERUNS=cprofile)")
+    if args.merge:
+        stats = pstats.Stats(*paths)
+        print(f"{len(paths)} reruns merged")
+        stats.strip_dirs().sort_stats(args.sort).print_stats(args.limit)
+    else:
+        for path in paths:
+            print(f"== {path}")
+            print(top_functions(path, args.sort, args.limit))
@@ -0,0 +1,148 @@
+"""
+Re-crawl Scheduler for Integrated Sponsor Center
+Incremental contact refresh: only stale companies, only pages that changed
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from worker import PeriodicWorker
+
+# Companies are re-crawled once their last crawl is older than this
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+# Companies re-crawled per scheduler run
+DEFAULT_BATCH_SIZE = 50
+
+# Sites crawled at once
+RECRAWL_MAX_WORKERS = 4
+
+RECRAWL_COUNTERS = ('fetched', 'not_modified', 'unchanged', 'changed', 'failed')
+
+
+def recrawl_companies(db, searcher, companies: List[Dict], max_workers: int = RECRAWL_MAX_WORKERS,
+                      on_result: Optional[Callable[[Dict, Dict], None]] = None) -> Dict:
+    """Incrementally re-crawl companies for contacts.
+
+    Each site is re-crawled with searcher.recrawl_site (an EmailSearcher)
+    against the page validators and hashes stored from its last crawl, on
+    a worker pool; results are saved from the calling thread as each site
+    finishes. Sites whose homepage fails are not stamped, so they stay
+    stale and are retried. on_result(company, crawl) is called per site.
+
+    Returns {'companies', 'crawled', 'contacts', 'errors'} plus page totals
+    (fetched, not_modified, unchanged, changed, failed).
+    """
+    stats = {'companies': len(companies), 'crawled': 0, 'contacts': 0, 'errors': 0}
+    stats.update((counter, 0) for counter in RECRAWL_COUNTERS)
+    if not companies:
+        return stats
+
+    # Stored pages are read up front, on the calling thread's connection
+    known_pages = {company['id']: db.get_crawl_pages(company['id']) for company in companies}
+
+    def run(company: Dict) -> Dict:
+        return searcher.recrawl_site(company['url'], known_pages[company['id']])
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='recrawl') as executor:
+        futures = {executor.submit(run, company): company for company in companies}
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                crawl = future.result()
+            except Exception:
+                crawl = None
+            if not crawl or not crawl['pages']:
+                stats['errors'] += 1
+                if crawl:
+                    stats['failed'] += crawl['failed']
+                continue
+            stats['contacts'] += db.save_crawl(company['id'], crawl['pages'], sorted(crawl['emails']))
+            stats['crawled'] += 1
+            for counter in RECRAWL_COUNTERS:
+                stats[counter] += crawl[counter]
+            if on_result:
+                on_result(company, crawl)
+    return stats
+
+
+def recrawl_stale(db, searcher, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+                  limit: Optional[int] = DEFAULT_BATCH_SIZE, company_type: str = None,
+                  max_workers: int = RECRAWL_MAX_WORKERS,
+                  on_result: Optional[Callable[[Dict, Dict], None]] = None) -> Dict:
+    """Re-crawl up to limit companies older than max_age_seconds, most overdue (and relevant) first."""
+    companies = db.get_recrawl_candidates(max_age_seconds, limit, company_type)
+    return recrawl_companies(db, searcher, companies, max_workers, on_result)
+
+
+class RecrawlScheduler(PeriodicWorker):
+    """Background thread re-crawling a batch of stale companies every interval.
+
+    Uses its own database connection and a direct-only (no ScraperAPI
+    credits) fetcher. Fetched pages go to archive (a PageArchive) if given.
+    """
+
+    def __init__(self, db_path: str = "sponsor_center.db", interval_seconds: float = 24 * 3600,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_workers: int = RECRAWL_MAX_WORKERS, archive=None):
+        super().__init__(interval_seconds, name="recrawl-scheduler")
+        self.db_path = db_path
+        self.archive = archive
+        self.max_age_seconds = max_age_seconds
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.last_run: Optional[Dict] = None
+
+    def run_once(self) -> Dict:
+        """Re-crawl one batch of stale companies."""
+        from crawler import EmailSearcher
+        from database import SponsorDatabase
+        from fetcher import FetchManager
+
+        with SponsorDatabase(self.db_path) as db, \
+                FetchManager(self.db_path, search_label="scheduled re-crawl") as fetcher:
+            searcher = EmailSearcher(max_pages=3, delay=0.3, fetcher=fetcher, archive=self.archive)
+            result = recrawl_stale(db, searcher, self.max_age_seconds, self.batch_size,
+                                   max_workers=self.max_workers)
+        self.last_run = result
+        return result
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Re-crawl stale companies for contacts")
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--max-age-days', type=float, default=DEFAULT_MAX_AGE_SECONDS / 86400)
+    parser.add_argument('--limit', type=int, default=DEFAULT_BATCH_SIZE, help='Companies per run (0 = all)')
+    parser.add_argument('--type', choices=['sponsor', 'vendor'])
+    parser.add_argument('--workers', type=int, default=RECRAWL_MAX_WORKERS)
+    parser.add_argument('--dry-run', action='store_true', help='List the companies that would be re-crawled')
+    args = parser.parse_args()
+
+    from database import SponsorDatabase
+    with SponsorDatabase(args.db) as db:
+        max_age = args.max_age_days * 86400
+        limit = args.limit or None
+        if args.dry_run:
+            for company in db.get_recrawl_candidates(max_age, limit, args.type):
+                print(f"{company['priority']:8.1f}  {company['url']:<45} "
+                      f"last crawled {company['last_crawled_at'] or 'never'}")
+            raise SystemExit(0)
+
+        from crawler import EmailSearcher
+        from fetcher import FetchManager
+
+        def report(company: Dict, crawl: Dict):
+            print(f"  {company['url']:<45} {len(crawl['pages'])} pages: {crawl['changed']} changed, "
+                  f"{crawl['unchanged'] + crawl['not_modified']} unchanged ({crawl['not_modified']} 304)")
+
+        started = time.perf_counter()
+        with FetchManager(args.db, search_label="recrawl cli") as fetcher:
+            searcher = EmailSearcher(max_pages=3, delay=0.3, fetcher=fetcher)
+            stats = recrawl_stale(db, searcher, max_age, limit, args.type, args.workers, on_result=report)
+        print(f"Re-crawled {stats['crawled']}/{stats['companies']} companies in "
+              f"{time.perf_counter() - started:.1f}s: {stats['contacts']} new contacts, "
+              f"{stats['changed']} pages changed, {stats['unchanged'] + stats['not_modified']} unchanged, "
+              f"{stats['errors']} errors")
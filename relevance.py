@@ -0,0 +1,90 @@
+"""
+Relevance Scoring for Integrated Sponsor Center
+TF-IDF cosine similarity between crawled page text and a project/part description
+"""
+
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Tokens: letters/digits, keeping inner dots and dashes (e.g. "3d", "6061-t6", "rs-485")
+TOKEN_RE = re.compile(r'[a-z0-9]+(?:[-.][a-z0-9]+)*')
+
+STOP_WORDS = frozenset("""
+a about above after all also an and any are as at be been but by can could do does for from
+had has have how i if in into is it its more most my no not of on or our out over so such
+than that the their them then there these they this those to up us we were what when where
+which while who will with would you your
+""".split())
+
+# Content similarity (0-1) is scaled to this many points
+CONTENT_SCORE_SCALE = 100
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens without stop words or single characters."""
+    return [token for token in TOKEN_RE.findall((text or '').lower())
+            if len(token) > 1 and token not in STOP_WORDS]
+
+
+def tfidf_similarity(documents: Sequence[str], query: str) -> np.ndarray:
+    """Cosine similarity of each document's TF-IDF vector to the query's.
+
+    The corpus is stored as sparse (document, term, count) triples in flat
+    NumPy arrays, so memory grows with the text actually seen rather than
+    documents x vocabulary. Term frequencies are sublinear (1 + log tf) and
+    IDF is smoothed. Empty documents score 0.
+    """
+    n_docs = len(documents)
+    if n_docs == 0:
+        return np.zeros(0)
+    query_tokens = tokenize(query)
+    if not query_tokens:
+        return np.zeros(n_docs)
+
+    vocabulary: Dict[str, int] = {}
+    doc_ids = []
+    term_ids = []
+    for doc_id, document in enumerate(documents):
+        for token in tokenize(document):
+            term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+            doc_ids.append(doc_id)
+    if not term_ids:
+        return np.zeros(n_docs)
+
+    n_terms = len(vocabulary)
+    # Collapse repeated (doc, term) pairs into counts
+    keys, counts = np.unique(np.asarray(doc_ids, dtype=np.int64) * n_terms
+                             + np.asarray(term_ids, dtype=np.int64), return_counts=True)
+    doc_idx = keys // n_terms
+    term_idx = keys % n_terms
+
+    doc_freq = np.bincount(term_idx, minlength=n_terms)
+    idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1.0
+    weights = (1.0 + np.log(counts)) * idf[term_idx]
+    doc_norms = np.sqrt(np.bincount(doc_idx, weights=weights * weights, minlength=n_docs))
+
+    # Query vector over the same vocabulary (terms no document uses cannot match)
+    query_weights = np.zeros(n_terms)
+    query_terms, query_counts = np.unique(
+        [vocabulary[token] for token in query_tokens if token in vocabulary], return_counts=True)
+    if query_terms.size == 0:
+        return np.zeros(n_docs)
+    query_terms = query_terms.astype(np.int64)
+    query_weights[query_terms] = (1.0 + np.log(query_counts)) * idf[query_terms]
+    # Out-of-vocabulary query terms still count toward the query's length
+    missing = [token for token in set(query_tokens) if token not in vocabulary]
+    oov_idf = np.log(1 + n_docs) + 1.0
+    query_norm = np.sqrt(np.sum(query_weights ** 2) + sum(
+        ((1.0 + np.log(query_tokens.count(token))) * oov_idf) ** 2 for token in missing))
+
+    dots = np.bincount(doc_idx, weights=weights * query_weights[term_idx], minlength=n_docs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarity = np.where(doc_norms > 0, dots / (doc_norms * query_norm), 0.0)
+    return similarity
+
+
+def content_scores(documents: Sequence[str], query: str) -> List[int]:
+    """Integer 0-100 relevance of each document to the query."""
+    return [int(round(score * CONTENT_SCORE_SCALE)) for score in tfidf_similarity(documents, query)]
@@ -0,0 +1,471 @@
+"""
+Email Sender for Integrated Sponsor Center
+Paced SMTP send queue with pooled relay connections, a daily cap, retries and batched status updates
+"""
+
+import queue
+import smtplib
+import socketserver
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from typing import Dict, Iterator, List, Optional
+
+from drafting import RateLimiter
+from worker import PeriodicWorker
+
+# Pacing defaults; 0 means unlimited
+DEFAULT_RATE_PER_MINUTE = 20
+DEFAULT_DAILY_CAP = 200
+
+# Connections kept open per relay
+DEFAULT_POOL_SIZE = 2
+
+# Many relays cap messages per session; reconnect after this many
+MAX_MESSAGES_PER_CONNECTION = 100
+
+# Idle connections are checked with NOOP before reuse after this long
+IDLE_CHECK_SECONDS = 30
+
+SMTP_TIMEOUT = 30
+
+# Transient failures (4xx, dropped connections) are retried with backoff, up to MAX_ATTEMPTS sends
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 3600
+
+# Queued emails fetched per batch, and results written back per transaction
+SEND_BATCH_SIZE = 100
+RESULT_FLUSH_SIZE = 25
+
+# How often the background sender looks for queued emails
+DEFAULT_POLL_SECONDS = 30
+
+
+class SMTPPool:
+    """Reusable SMTP sessions to one relay.
+
+    Up to size connections are open at once; a connection goes back to
+    the pool after each message (or after a rejected message, once reset)
+    and is dropped when the server disconnects. Safe to share between
+    threads.
+    """
+
+    def __init__(self, host: str, port: int = 587, username: str = None, password: str = None,
+                 starttls: bool = True, use_ssl: bool = False, size: int = DEFAULT_POOL_SIZE,
+                 timeout: float = SMTP_TIMEOUT, max_messages: int = MAX_MESSAGES_PER_CONNECTION):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls and not use_ssl
+        self.use_ssl = use_ssl
+        self.size = size
+        self.timeout = timeout
+        self.max_messages = max_messages
+        self.connections_opened = 0
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        conn = smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.ehlo()
+            if self.starttls:
+                conn.starttls()
+                conn.ehlo()
+            if self.username:
+                conn.login(self.username, self.password or '')
+        except Exception:
+            _close(conn)
+            raise
+        conn.messages_sent = 0
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - conn.last_used < IDLE_CHECK_SECONDS:
+                return conn
+            try:
+                if conn.noop()[0] == 250:
+                    return conn
+            except (smtplib.SMTPException, OSError):
+                pass
+            _close(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """A connected, authenticated session for sending one message."""
+        self._slots.acquire()
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+            conn.messages_sent += 1
+        except smtplib.SMTPResponseException:
+            # The server answered, so the session is still usable once reset
+            try:
+                conn.rset()
+            except (smtplib.SMTPException, OSError, AttributeError):
+                _close(conn)
+                conn = None
+            raise
+        except BaseException:
+            _close(conn)
+            conn = None
+            raise
+        finally:
+            if conn is not None:
+                if conn.messages_sent >= self.max_messages:
+                    _close(conn)
+                else:
+                    conn.last_used = time.monotonic()
+                    self._idle.put(conn)
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                _close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def _close(conn: Optional[smtplib.SMTP]):
+    if conn is None:
+        return
+    try:
+        conn.quit()
+    except (smtplib.SMTPException, OSError):
+        conn.close()
+
+
+def build_message(email: Dict, sender: str, reply_to: str = None) -> EmailMessage:
+    """The MIME message for a queued email row, with a fresh Message-ID."""
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = email['recipient']
+    message['Subject'] = email['subject']
+    message['Date'] = formatdate(localtime=True)
+    message['Message-ID'] = make_msgid(domain=sender.rpartition('@')[2].strip('> ') or None)
+    if reply_to:
+        message['Reply-To'] = reply_to
+    message.set_content(email['body'])
+    return message
+
+
+def classify_error(error: Exception) -> str:
+    """'retry' for transient failures (4xx, dropped or refused connections), 'bounced' for
+    recipients rejected with a 5xx, else 'failed'."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        if codes and all(400 <= code < 500 for code in codes):
+            return 'retry'
+        return 'bounced'
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 'retry' if 400 <= error.smtp_code < 500 else 'failed'
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return 'retry'
+    # Other SMTPExceptions are OSErrors too, but mean a local or protocol problem
+    if isinstance(error, smtplib.SMTPException):
+        return 'failed'
+    if isinstance(error, OSError):
+        return 'retry'
+    return 'failed'
+
+
+def error_text(error: Exception) -> str:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return '; '.join(f"{code} {message.decode('utf-8', 'replace') if isinstance(message, bytes) else message}"
+                         for code, message in error.recipients.values())[:300]
+    if isinstance(error, smtplib.SMTPResponseException):
+        message = error.smtp_error
+        return f"{error.smtp_code} {message.decode('utf-8', 'replace') if isinstance(message, bytes) else message}"[:300]
+    return f"{type(error).__name__}: {error}"[:300]
+
+
+class SendQueue(PeriodicWorker):
+    """Sends queued emails through pooled SMTP relays at a steady pace.
+
+    Sends are spread across the relays' pooled connections on worker
+    threads, spaced to rate_per_minute, and stop for the day at
+    daily_cap (counted from emails.sent_at). Outcomes are written back
+    from the calling thread in batches of RESULT_FLUSH_SIZE: the email's
+    status and Message-ID plus an 'email_sent' interaction. Transient
+    failures stay queued with a backoff until MAX_ATTEMPTS. As a
+    background thread it polls the queue every poll_seconds.
+    """
+
+    def __init__(self, db_path: str, relays: List[SMTPPool], sender: str, reply_to: str = None,
+                 rate_per_minute: float = DEFAULT_RATE_PER_MINUTE, daily_cap: int = DEFAULT_DAILY_CAP,
+                 poll_seconds: float = DEFAULT_POLL_SECONDS, retry_base_seconds: float = RETRY_BASE_SECONDS):
+        super().__init__(poll_seconds, run_immediately=True, name="send-queue")
+        self.db_path = db_path
+        self.relays = relays
+        self.sender = sender
+        self.reply_to = reply_to
+        self.rate_per_minute = rate_per_minute
+        self.daily_cap = daily_cap
+        self.retry_base_seconds = retry_base_seconds
+        self.last_run: Optional[Dict] = None
+        self._limiter = RateLimiter(rate_per_minute)
+        self._next_relay = 0
+        self._relay_lock = threading.Lock()
+        self._run_lock = threading.Lock()
+
+    def _relay(self) -> SMTPPool:
+        with self._relay_lock:
+            relay = self.relays[self._next_relay % len(self.relays)]
+            self._next_relay += 1
+        return relay
+
+    def _send(self, email: Dict) -> Dict:
+        result = {'email_id': email['id'], 'company_id': email['company_id'], 'subject': email['subject'],
+                  'recipient': email['recipient'], 'message_id': None, 'error': None}
+        if not email['recipient']:
+            result.update(outcome='failed', error="No recipient address")
+            return result
+        message = build_message(email, self.sender, self.reply_to)
+        self._limiter.acquire()
+        try:
+            with self._relay().connection() as conn:
+                conn.send_message(message)
+        except Exception as e:
+            outcome = classify_error(e)
+            if outcome == 'retry' and email['attempts'] + 1 >= MAX_ATTEMPTS:
+                outcome = 'failed'
+            result.update(outcome=outcome, error=error_text(e),
+                          retry_seconds=min(self.retry_base_seconds * 2 ** email['attempts'], RETRY_MAX_SECONDS))
+            return result
+        result.update(outcome='sent', message_id=message['Message-ID'])
+        return result
+
+    def run_once(self, limit: Optional[int] = None) -> Dict:
+        """Send every due queued email (up to limit and the daily cap).
+
+        Returns {'sent', 'retry', 'failed', 'bounced', 'seconds', 'capped'}.
+        """
+        from database import SponsorDatabase
+
+        with self._run_lock, SponsorDatabase(self.db_path) as db:
+            stats = {'sent': 0, 'retry': 0, 'failed': 0, 'bounced': 0, 'capped': False}
+            started = time.perf_counter()
+            workers = sum(relay.size for relay in self.relays)
+            pending: List[Dict] = []
+            retried = set()
+
+            def flush():
+                db.record_send_results(pending)
+                pending.clear()
+
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='smtp') as executor:
+                while limit is None or stats['sent'] + stats['failed'] + stats['bounced'] < limit:
+                    batch = SEND_BATCH_SIZE
+                    if self.daily_cap:
+                        remaining = self.daily_cap - db.count_sent_today()
+                        if remaining <= 0:
+                            stats['capped'] = True
+                            break
+                        batch = min(batch, remaining)
+                    if limit is not None:
+                        batch = min(batch, limit - stats['sent'] - stats['failed'] - stats['bounced'])
+                    # Emails retried in this run wait for the next one, even with no backoff
+                    due = [email for email in db.get_due_emails(batch + len(retried))
+                           if email['id'] not in retried][:batch]
+                    if not due:
+                        break
+                    for future in as_completed([executor.submit(self._send, email) for email in due]):
+                        result = future.result()
+                        stats[result['outcome']] += 1
+                        if result['outcome'] == 'retry':
+                            retried.add(result['email_id'])
+                        pending.append(result)
+                        if len(pending) >= RESULT_FLUSH_SIZE:
+                            flush()
+                    flush()
+            stats['seconds'] = time.perf_counter() - started
+        self.last_run = stats
+        return stats
+
+    def stop(self):
+        """Stop the sender thread and close pooled connections."""
+        super().stop()
+        for relay in self.relays:
+            relay.close()
+
+
+class _SMTPStandInHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, code: int, text: str):
+        self.wfile.write(f"{code} {text}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply(220, "localhost SMTP stand-in")
+        in_data = False
+        data = []
+        for raw in self.rfile:
+            line = raw.rstrip(b'\r\n')
+            if in_data:
+                if line == b'.':
+                    in_data = False
+                    with server.lock:
+                        server.attempts += 1
+                        fail = server.fail_every and server.attempts % server.fail_every == 0
+                        if not fail:
+                            server.received += 1
+                            server.messages.append(b'\r\n'.join(data))
+                    if fail:
+                        self.reply(451, "4.3.0 Temporary failure, try again")
+                    else:
+                        self.reply(250, "2.0.0 OK")
+                else:
+                    data.append(line[1:] if line.startswith(b'..') else line)
+                continue
+            verb = line[:4].upper()
+            if verb == b'EHLO':
+                self.wfile.write(b"250-localhost\r\n250-8BITMIME\r\n250 SMTPUTF8\r\n")
+            elif verb == b'RCPT' and b'bounce' in line.lower():
+                self.reply(550, "5.1.1 User unknown")
+            elif verb in (b'HELO', b'MAIL', b'RCPT', b'RSET', b'NOOP'):
+                self.reply(250, "OK")
+            elif verb == b'DATA':
+                in_data = True
+                data = []
+                self.reply(354, "End data with <CR><LF>.<CR><LF>")
+            elif verb == b'QUIT':
+                self.reply(221, "Bye")
+                break
+            else:
+                self.reply(502, "Command not implemented")
+
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """In-process SMTP stand-in for tests and benchmarks (no TLS or auth).
+
+    Every fail_every-th message is answered with a transient 451, and
+    recipients containing "bounce" are rejected with 550.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port: int = 0, fail_every: int = 0):
+        super().__init__(('127.0.0.1', port), _SMTPStandInHandler)
+        self.fail_every = fail_every
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.attempts = 0
+        self.received = 0
+        self.messages = deque(maxlen=100)
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> 'LocalSMTPServer':
+        self._thread = threading.Thread(target=self.serve_forever, name="smtp-stand-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def benchmark(count: int = 500, pool_size: int = DEFAULT_POOL_SIZE, fail_every: int = 0,
+              max_messages: int = MAX_MESSAGES_PER_CONNECTION) -> Dict:
+    """Send count emails from a scratch database through a LocalSMTPServer, unpaced.
+
+    Returns {'sent', 'retried', 'bounced', 'seconds', 'per_second', 'connections'}.
+    """
+    import os
+    import tempfile
+    from database import SponsorDatabase
+
+    server = LocalSMTPServer(fail_every=fail_every).start()
+    with tempfile.TemporaryDirectory() as scratch:
+        db_path = os.path.join(scratch, 'bench.db')
+        with SponsorDatabase(db_path) as db:
+            db.bulk_add_companies([{'name': f"Company {i}", 'url': f"https://company{i}.example",
+                                    'type': 'sponsor', 'industry': None, 'project_part': None,
+                                    'relevance_score': 0, 'notes': None} for i in range(count)])
+            ids = [row['id'] for row in db.conn.execute('SELECT id FROM companies ORDER BY id')]
+            db.bulk_add_contacts([(company_id, f"contact{company_id}@company{company_id}.example")
+                                  for company_id in ids])
+            contacts = db.get_primary_contacts(ids)
+            db.bulk_add_emails([(company_id, contacts[company_id]['id'], "Benchmark", "Hello there.\n" * 20,
+                                 'benchmark') for company_id in ids])
+            db.queue_emails()
+
+        relay = SMTPPool('127.0.0.1', server.port, starttls=False, size=pool_size, max_messages=max_messages)
+        sender_queue = SendQueue(db_path, [relay], "bench@localhost", rate_per_minute=0, daily_cap=0,
+                                 retry_base_seconds=0)
+        totals = {'sent': 0, 'retry': 0, 'bounced': 0, 'failed': 0}
+        started = time.perf_counter()
+        while True:
+            stats = sender_queue.run_once()
+            for key in totals:
+                totals[key] += stats[key]
+            if not any(stats[key] for key in totals):
+                break
+        seconds = time.perf_counter() - started
+        relay.close()
+    server.stop()
+    return {'sent': totals['sent'], 'retried': totals['retry'], 'bounced': totals['bounced'],
+            'failed': totals['failed'], 'seconds': seconds, 'per_second': totals['sent'] / seconds if seconds else 0,
+            'connections': relay.connections_opened}
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Send queued emails, or benchmark against a local SMTP stand-in")
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--queue-drafts', action='store_true', help='Queue every drafted email first')
+    parser.add_argument('--limit', type=int, help='Send at most this many emails')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE_PER_MINUTE, help='Emails per minute (0 = unpaced)')
+    parser.add_argument('--daily-cap', type=int, default=DEFAULT_DAILY_CAP, help='Emails per day (0 = no cap)')
+    parser.add_argument('--benchmark', type=int, metavar='N', help='Send N emails to a local stand-in and report msgs/sec')
+    parser.add_argument('--pool', type=int, default=DEFAULT_POOL_SIZE, help='Connections per relay')
+    parser.add_argument('--fail-every', type=int, default=0, help='Benchmark: answer every Nth message with a 451')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for label, max_messages in (("new connection per message", 1), ("pooled connections", MAX_MESSAGES_PER_CONNECTION)):
+            result = benchmark(args.benchmark, args.pool, args.fail_every, max_messages)
+            print(f"{label:<28} {result['sent']} sent in {result['seconds']:.2f}s = {result['per_second']:,.0f} msgs/sec "
+                  f"({result['connections']} connections, {result['retried']} retried)")
+        raise SystemExit(0)
+
+    from database import SponsorDatabase
+    if args.queue_drafts:
+        with SponsorDatabase(args.db) as db:
+            print(f"Queued {db.queue_emails()} drafted emails")
+    relay = SMTPPool(os.environ['SMTP_HOST'], int(os.getenv('SMTP_PORT', '587')), os.getenv('SMTP_USER'),
+                     os.getenv('SMTP_PASSWORD'), starttls=os.getenv('SMTP_STARTTLS', '1') != '0',
+                     use_ssl=os.getenv('SMTP_SSL', '0') == '1', size=args.pool)
+    sender_queue = SendQueue(args.db, [relay], os.getenv('SMTP_FROM') or os.getenv('SMTP_USER'),
+                             rate_per_minute=args.rate, daily_cap=args.daily_cap)
+    stats = sender_queue.run_once(args.limit)
+    relay.close()
+    print(f"Sent {stats['sent']} in {stats['seconds']:.1f}s: {stats['retry']} to retry, {stats['failed']} failed, "
+          f"{stats['bounced']} bounced" + (" (daily cap reached)" if stats['capped'] else ""))
@@ -0,0 +1,231 @@
+"""
+SERP Fan-out for Integrated Sponsor Center
+Runs search-engine queries concurrently and stops once enough companies are found
+"""
+
+import re
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import metrics
+from domains import canonical_domain
+from fetcher import FetchManager
+from serp_parser import SKIP_DOMAINS, parse_serp
+
+# Search engines and their result-page URL templates
+SERP_ENGINES = {
+    'google': {'label': 'Google', 'url': 'https://www.google.com/search?q={}&num=20'},
+    'bing': {'label': 'Bing', 'url': 'https://www.bing.com/search?q={}'},
+    'duckduckgo': {'label': 'DuckDuckGo', 'url': 'https://html.duckduckgo.com/html/?q={}'},
+    'duckduckgo_lite': {'label': 'DuckDuckGo', 'url': 'https://lite.duckduckgo.com/lite/?q={}'},
+}
+
+# Requests in flight at once (ScraperAPI free plans allow 5 concurrent)
+SERP_MAX_WORKERS = 4
+
+# Bytes of raw HTML kept on each result for the debug panels
+PREVIEW_BYTES = 1000
+
+# How long cached result pages are reused
+DEFAULT_CACHE_TTL = 24 * 3600
+
+# Words that don't change what a search engine returns for our queries
+QUERY_STOP_WORDS = frozenset({'a', 'an', 'and', 'for', 'in', 'of', 'the', 'to', 'with'})
+
+QUERY_TOKEN_RE = re.compile(r'[a-z0-9]+(?:[.+#-][a-z0-9]+)*')
+
+SERP_SECONDS = metrics.histogram('serp_seconds', "Result-page fetch and parse time by engine", ('engine', 'outcome'))
+SERP_PARSE_SECONDS = metrics.histogram('serp_parse_seconds', "Result-page parse time by engine", ('engine',))
+SERP_CACHE = metrics.counter('serp_cache_total', "SERP cache lookups by result (hit, miss, bypass)", ('result',))
+
+
+def normalize_query(query: str, location: str = '') -> str:
+    """Cache key for a query: lowercase tokens, minus stop words and location words, sorted.
+
+    Reordered, re-cased or re-punctuated variants of a query share a key.
+    """
+    location_tokens = set(QUERY_TOKEN_RE.findall((location or '').lower()))
+    tokens = {token for token in QUERY_TOKEN_RE.findall((query or '').lower())
+              if token not in QUERY_STOP_WORDS and token not in location_tokens}
+    return ' '.join(sorted(tokens))
+
+
+def build_search_url(engine: str, query: str) -> str:
+    """Build the result-page URL for a query on an engine."""
+    return SERP_ENGINES[engine]['url'].format(urllib.parse.quote_plus(query))
+
+
+def fetch_serp(engine: str, query: str, fetcher: FetchManager) -> Dict:
+    """Fetch one result page (direct first, ScraperAPI if blocked).
+
+    Returns {'html', 'via', 'credits'}; raises RuntimeError when no page could be fetched.
+    """
+    page = fetcher.fetch(build_search_url(engine, query))
+    if page['html'] is None:
+        raise RuntimeError(page['error'] or "No response")
+    return {
+        'html': page['html'],
+        'via': 'ScraperAPI' if page['tier'] == 'scraper' else 'direct',
+        'credits': page['credits'],
+    }
+
+
+def extract_result_urls(engine: str, html: str, skip_domains: Iterable[str] = SKIP_DOMAINS) -> List[str]:
+    """Pull company homepages (https://host) from a result page, in rank order."""
+    return parse_serp(engine, html, skip_domains)
+
+
+def _run_task(engine: str, query: str, fetcher: FetchManager,
+              skip_domains: Iterable[str]) -> Dict:
+    """Fetch and parse one engine x query pair. Never raises."""
+    result = {
+        'engine': engine, 'label': SERP_ENGINES[engine]['label'], 'query': query,
+        'via': None, 'urls': [], 'bytes': 0, 'credits': 0, 'preview': '', 'error': None,
+    }
+    started = time.perf_counter()
+    try:
+        page = fetch_serp(engine, query, fetcher)
+        result['via'] = page['via']
+        result['credits'] = page['credits']
+        result['bytes'] = len(page['html'])
+        result['preview'] = page['html'][:PREVIEW_BYTES]
+        with SERP_PARSE_SECONDS.time(engine=engine):
+            result['urls'] = extract_result_urls(engine, page['html'], skip_domains)
+    except Exception as e:
+        result['error'] = str(e)[:200]
+    result['seconds'] = time.perf_counter() - started
+    outcome = 'error' if result['error'] else ('ok' if result['urls'] else 'empty')
+    SERP_SECONDS.observe(result['seconds'], engine=engine, outcome=outcome)
+    return result
+
+
+def _cached_result(engine: str, query: str, entry: Dict) -> Dict:
+    """Shape a cache entry like a freshly fetched result."""
+    return {
+        'engine': engine, 'label': SERP_ENGINES[engine]['label'], 'query': query,
+        'via': entry['via'], 'urls': entry['urls'], 'bytes': 0, 'credits': 0, 'preview': '', 'error': None,
+        'seconds': 0.0, 'cached': True, 'fetched_at': entry['fetched_at'],
+    }
+
+
+def fan_out(queries: List[str], engines: List[str], fetcher: Optional[FetchManager] = None,
+            target: Optional[int] = 10, max_workers: int = SERP_MAX_WORKERS,
+            skip_domains: Iterable[str] = SKIP_DOMAINS, cache=None, location: str = '',
+            cache_ttl: float = DEFAULT_CACHE_TTL, refresh: bool = False) -> Iterator[Dict]:
+    """Run every engine x query search concurrently, yielding results as they arrive.
+
+    Pages are fetched through fetcher (a FetchManager, so direct first
+    and metered ScraperAPI escalation); without one, only direct requests
+    are made. Each yielded dict has engine, label, query, via, urls,
+    bytes, credits, seconds, error, preview and cached, plus new_urls (URLs whose canonical domain
+    was not seen in an earlier result) and total_domains. Once target
+    unique domains have been collected, queued requests are cancelled and
+    the generator stops once the requests already in flight finish, so the
+    caller can close fetcher as soon as it returns. Pass target=None to
+    wait for every request.
+
+    With a cache (a SponsorDatabase), result pages fetched within
+    cache_ttl seconds are served from the serp_cache table before any
+    request is made, and fresh results are written back. refresh=True
+    skips the lookup but still stores what is fetched.
+    """
+    unknown = [engine for engine in engines if engine not in SERP_ENGINES]
+    if unknown:
+        raise ValueError(f"Unknown search engines: {', '.join(unknown)}")
+
+    # Query-major order so the first wave covers every engine
+    tasks = [(engine, query) for query in queries for engine in engines]
+    if not tasks:
+        return
+
+    seen_domains = set()
+
+    def tally(result: Dict) -> Dict:
+        result['new_urls'] = []
+        for url in result['urls']:
+            domain = canonical_domain(url)
+            if domain and domain not in seen_domains:
+                seen_domains.add(domain)
+                result['new_urls'].append(url)
+        result['total_domains'] = len(seen_domains)
+        result['target_reached'] = target is not None and len(seen_domains) >= target
+        return result
+
+    # Cache hits are served first and count toward the target
+    pending = []
+    for engine, query in tasks:
+        entry = None
+        if cache is not None and not refresh:
+            entry = cache.get_serp_cache(engine, normalize_query(query, location), location, cache_ttl)
+        if cache is not None:
+            SERP_CACHE.inc(result='bypass' if refresh else ('hit' if entry and entry['urls'] else 'miss'))
+        if entry and entry['urls']:
+            result = tally(_cached_result(engine, query, entry))
+            yield result
+            if result['target_reached']:
+                return
+        else:
+            pending.append((engine, query))
+    if not pending:
+        return
+
+    if fetcher is None:
+        fetcher = FetchManager()
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(pending))),
+                                  thread_name_prefix='serp')
+    try:
+        futures = [executor.submit(_run_task, engine, query, fetcher, skip_domains)
+                   for engine, query in pending]
+        for future in as_completed(futures):
+            result = future.result()
+            result['cached'] = False
+            # Empty pages are usually blocks or captchas, so only real results are kept
+            if cache is not None and result['urls']:
+                cache.put_serp_cache(result['engine'], normalize_query(result['query'], location),
+                                     location, result['query'], result['urls'], result['via'])
+            yield tally(result)
+            if result['target_reached']:
+                break
+    finally:
+        # Drop queued requests and let in-flight ones finish before the caller closes the fetcher
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Run a concurrent search-engine fan-out")
+    parser.add_argument('queries', nargs='+')
+    parser.add_argument('--engines', default='google,bing,duckduckgo')
+    parser.add_argument('--target', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=SERP_MAX_WORKERS)
+    parser.add_argument('--location', default='')
+    parser.add_argument('--db', help='Use the SERP cache in this database')
+    parser.add_argument('--refresh', action='store_true', help='Bypass cached results')
+    args = parser.parse_args()
+
+    cache = None
+    if args.db:
+        from database import SponsorDatabase
+        cache = SponsorDatabase(args.db)
+    fetcher = FetchManager(args.db, os.getenv('SCRAPER_API_KEY'), search_label='serp cli')
+
+    started = time.perf_counter()
+    found = []
+    for result in fan_out(args.queries, args.engines.split(','), fetcher,
+                          target=args.target, max_workers=args.workers, cache=cache,
+                          location=args.location, refresh=args.refresh):
+        status = result['error'] or f"{len(result['urls'])} urls, {len(result['new_urls'])} new"
+        if result['cached']:
+            status += f" (cached {result['fetched_at']})"
+        print(f"[{result['seconds']:5.1f}s] {result['label']:<10} {result['query']!r}: {status}")
+        found.extend(result['new_urls'])
+
+    print(f"{len(found)} unique companies in {time.perf_counter() - started:.1f}s "
+          f"({fetcher.search_credits} ScraperAPI credits)")
+    for url in found:
+        print(f"  {url}")
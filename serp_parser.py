@@ -0,0 +1,295 @@
+"""
+SERP Parser for Integrated Sponsor Center
+Single-pass extraction of result links from Google, Bing and DuckDuckGo pages
+"""
+
+import base64
+import html as html_lib
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Pattern, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from domains import normalize_host
+
+# Result links on hosts containing any of these are never company sites
+SKIP_DOMAINS = (
+    'duckduckgo', 'google', 'bing', 'yahoo', 'facebook', 'twitter',
+    'linkedin', 'youtube', 'wikipedia', 'reddit', 'amazon', 'instagram'
+)
+
+# One scan over the page: script/style bodies and comments are consumed whole so
+# markup inside them is never mistaken for results; only tags the extractors
+# care about are matched.
+TAG_RE = re.compile(
+    r'<script\b.*?</script\s*>|<style\b.*?</style\s*>|<!--.*?-->'
+    r'|<(/?)(a|div|li|h2|span)\b([^>]*)>',
+    re.IGNORECASE | re.DOTALL
+)
+
+ATTR_RE = re.compile(r'''([a-zA-Z_:][-\w:.]*)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))''')
+
+
+@lru_cache(maxsize=32)
+def compile_skip_domains(skip_domains: Tuple[str, ...]) -> Optional[Pattern]:
+    """Compile skip-domain substrings into one regex (cached per tuple)."""
+    if not skip_domains:
+        return None
+    return re.compile('|'.join(re.escape(skip) for skip in sorted(skip_domains, key=len, reverse=True)))
+
+
+def _attrs(raw: str) -> dict:
+    attrs = {}
+    for match in ATTR_RE.finditer(raw):
+        name, dq, sq, bare = match.groups()
+        attrs[name.lower()] = dq if dq is not None else (sq if sq is not None else bare)
+    return attrs
+
+
+def resolve_href(href: str) -> Optional[str]:
+    """Resolve a result href to the target URL, unwrapping engine redirect links.
+
+    Handles Google /url?q=, DuckDuckGo /l/?uddg= and Bing /ck/a?u=a1<base64>
+    redirects. Returns None for anything that is not an absolute http(s) URL.
+    """
+    if not href:
+        return None
+    href = html_lib.unescape(href.strip())
+    if href.startswith('//'):
+        href = 'https:' + href
+
+    if href.startswith('/url?') or ('/url?' in href[:40] and 'google.' in href[:40]):
+        params = parse_qs(urlsplit(href).query)
+        href = (params.get('q') or params.get('url') or [''])[0]
+    elif 'duckduckgo.com/l/?' in href[:40]:
+        href = (parse_qs(urlsplit(href).query).get('uddg') or [''])[0]
+    elif 'bing.com/ck/a?' in href[:40]:
+        encoded = (parse_qs(urlsplit(href).query).get('u') or [''])[0]
+        if encoded.startswith('a1'):
+            encoded = encoded[2:]
+            try:
+                href = base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)).decode('utf-8')
+            except (ValueError, UnicodeDecodeError):
+                return None
+
+    if not href.startswith(('http://', 'https://')):
+        return None
+    return href
+
+
+class SerpExtractor:
+    """Base single-pass extractor.
+
+    Subclasses decide which anchors are primary results via on_tag; every
+    other outbound link is kept as a lower-ranked fallback. Both lists are
+    built in the same scan.
+    """
+
+    engine = None
+
+    def __init__(self):
+        self.primary: List[str] = []
+        self.fallback: List[str] = []
+        self.anchor_href: Optional[str] = None  # href of the <a> currently open
+
+    def on_tag(self, closing: bool, tag: str, raw_attrs: str):
+        """Handle one start/end tag. The default treats every link as fallback."""
+        if tag == 'a' and not closing:
+            self.link(raw_attrs, primary=False)
+
+    def link(self, raw_attrs: str, primary: bool) -> Optional[str]:
+        """Record an anchor's target (if any) and remember it as the open anchor."""
+        href = resolve_href(_attrs(raw_attrs).get('href', ''))
+        self.anchor_href = href
+        if href:
+            (self.primary if primary else self.fallback).append(href)
+        return href
+
+    def feed(self, page: str):
+        for match in TAG_RE.finditer(page):
+            tag = match.group(2)
+            if tag is None:
+                continue  # script, style or comment
+            tag = tag.lower()
+            closing = bool(match.group(1))
+            if tag == 'a' and closing:
+                self.anchor_href = None
+            self.on_tag(closing, tag, match.group(3))
+
+
+def _classes(raw_attrs: str) -> frozenset:
+    if 'class' not in raw_attrs:
+        return frozenset()
+    return frozenset(_attrs(raw_attrs).get('class', '').split())
+
+
+class GoogleExtractor(SerpExtractor):
+    """First link inside each div.g / div.yuRUbf result block; /url?q= links on no-JS pages."""
+
+    engine = 'google'
+    RESULT_CLASSES = frozenset({'g', 'yuRUbf'})
+
+    def __init__(self):
+        super().__init__()
+        self.div_depth = 0
+        self.result_depths: List[int] = []  # div depths of open result blocks
+        self.result_linked = False
+
+    def on_tag(self, closing, tag, raw_attrs):
+        if tag == 'div':
+            if closing:
+                if self.result_depths and self.result_depths[-1] == self.div_depth:
+                    self.result_depths.pop()
+                self.div_depth -= 1
+            else:
+                self.div_depth += 1
+                if _classes(raw_attrs) & self.RESULT_CLASSES:
+                    self.result_depths.append(self.div_depth)
+                    self.result_linked = False
+        elif tag == 'a' and not closing:
+            in_result = bool(self.result_depths) and not self.result_linked
+            redirect = 'href="/url?' in raw_attrs or "href='/url?" in raw_attrs
+            if self.link(raw_attrs, primary=in_result or redirect) and in_result:
+                self.result_linked = True
+
+
+class BingExtractor(SerpExtractor):
+    """The h2 title link of each li.b_algo result."""
+
+    engine = 'bing'
+
+    def __init__(self):
+        super().__init__()
+        self.in_result = False
+        self.in_heading = False
+
+    def on_tag(self, closing, tag, raw_attrs):
+        if tag == 'li':
+            self.in_result = not closing and 'b_algo' in _classes(raw_attrs)
+        elif tag == 'h2':
+            self.in_heading = not closing and self.in_result
+        elif tag == 'a' and not closing:
+            self.link(raw_attrs, primary=self.in_heading)
+
+
+class DuckDuckGoExtractor(SerpExtractor):
+    """a.result__a title links on html.duckduckgo.com."""
+
+    engine = 'duckduckgo'
+
+    def on_tag(self, closing, tag, raw_attrs):
+        if tag == 'a' and not closing:
+            self.link(raw_attrs, primary='result__a' in _classes(raw_attrs))
+
+
+class DuckDuckGoLiteExtractor(SerpExtractor):
+    """a.result-link links (or links wrapping span.link-text) on lite.duckduckgo.com."""
+
+    engine = 'duckduckgo_lite'
+
+    def on_tag(self, closing, tag, raw_attrs):
+        if tag == 'a' and not closing:
+            self.link(raw_attrs, primary='result-link' in _classes(raw_attrs))
+        elif tag == 'span' and not closing and self.anchor_href and 'link-text' in _classes(raw_attrs):
+            self.primary.append(self.anchor_href)
+
+
+EXTRACTORS = {
+    extractor.engine: extractor
+    for extractor in (GoogleExtractor, BingExtractor, DuckDuckGoExtractor, DuckDuckGoLiteExtractor)
+}
+
+
+def parse_serp(engine: str, page: str, skip_domains: Iterable[str] = SKIP_DOMAINS,
+               fallback: bool = True) -> List[str]:
+    """Extract company homepages (https://host) from a result page in rank order.
+
+    Engine result links come first, then (with fallback) every other
+    outbound link, deduplicated by host. Hosts matching skip_domains are
+    dropped.
+    """
+    extractor = EXTRACTORS.get(engine, SerpExtractor)()
+    extractor.feed(page or '')
+    skip = compile_skip_domains(tuple(skip_domains))
+
+    urls = []
+    seen = set()
+    for href in (extractor.primary + extractor.fallback) if fallback else extractor.primary:
+        host = normalize_host(href)
+        if not host or host in seen or (skip is not None and skip.search(host)):
+            continue
+        seen.add(host)
+        urls.append(f"https://{host}")
+    return urls
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import os
+    import time
+
+    FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'serp')
+
+    def legacy_parse(engine: str, page: str) -> List[str]:
+        """The BeautifulSoup three-pass parser this module replaced (for comparison)."""
+        from bs4 import BeautifulSoup
+        soup = BeautifulSoup(page, 'html.parser')
+        urls, seen = [], set()
+
+        def add(href):
+            if href.startswith('http'):
+                domain = normalize_host(href)
+                if domain and domain not in seen and not any(s in domain for s in SKIP_DOMAINS):
+                    seen.add(domain)
+                    urls.append(f"https://{domain}")
+
+        if engine == 'google':
+            for div in soup.find_all('div', class_=['g', 'yuRUbf']):
+                a_tag = div.find('a', href=True)
+                if a_tag:
+                    add(a_tag['href'])
+        else:
+            for link in soup.find_all('a', class_='result-link'):
+                add(link.get('href', ''))
+            for span in soup.find_all('span', class_='link-text'):
+                parent_link = span.find_parent('a')
+                if parent_link:
+                    add(parent_link.get('href', ''))
+        for link in soup.find_all('a', href=True):
+            add(link['href'])
+        return urls
+
+    def load_fixtures():
+        for name in sorted(os.listdir(FIXTURE_DIR)):
+            if name.endswith('.html'):
+                base = name[:-len('.html')]
+                with open(os.path.join(FIXTURE_DIR, name), encoding='utf-8') as f:
+                    page = f.read()
+                with open(os.path.join(FIXTURE_DIR, base + '.json'), encoding='utf-8') as f:
+                    expected = json.load(f)
+                yield base, page, expected
+
+    parser = argparse.ArgumentParser(description="Benchmark the SERP parser against the saved fixtures "
+                                                 "(correctness is checked by tests/test_serp_parser.py)")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        import bs4  # noqa: F401
+        has_bs4 = True
+    except ImportError:
+        has_bs4 = False
+    print(f"{'fixture':<20} {'bytes':>8} {'parse_serp':>12} {'legacy bs4':>12}")
+    for name, page, expected in load_fixtures():
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            parse_serp(expected['engine'], page)
+        fast = (time.perf_counter() - started) / args.repeat * 1000
+        legacy = '-'
+        if has_bs4:
+            started = time.perf_counter()
+            for _ in range(max(1, args.repeat // 10)):
+                legacy_parse(expected['engine'], page)
+            legacy = f"{(time.perf_counter() - started) / max(1, args.repeat // 10) * 1000:.2f} ms"
+        print(f"{name:<20} {len(page):>8,} {fast:>9.2f} ms {legacy:>12}")
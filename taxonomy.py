@@ -0,0 +1,236 @@
+"""
+Category Taxonomy for Integrated Sponsor Center
+Weighted keyword categories for parts and companies, matched with one precompiled regex
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+# Category -> industry label, weighted keywords and well-known distributors.
+# Weights: 3 = specific to the category, 2 = usually this category, 1 = generic
+# (also counts toward other categories, e.g. "motor").
+TAXONOMY = {
+    "electronics": {
+        "industry": "Electronics",
+        "keywords": {
+            "arduino": 3, "raspberry pi": 3, "microcontroller": 3, "pcb": 3, "transistor": 3,
+            "resistor": 3, "capacitor": 3, "circuit": 2, "electronic": 2, "sensor": 2, "chip": 2,
+            "breadboard": 3, "connector": 1, "battery": 1, "lipo": 2, "voltage regulator": 3,
+        },
+        "distributors": [
+            "https://www.digikey.com", "https://www.mouser.com", "https://www.newark.com",
+            "https://www.digikey.ca", "https://www.adafruit.com", "https://www.sparkfun.com",
+        ],
+    },
+    "industrial": {
+        "industry": "Industrial Supply",
+        "keywords": {
+            "fastener": 3, "bolt": 2, "screw": 2, "nut": 2, "washer": 2, "bearing": 2,
+            "spring": 1, "gear": 1, "shaft": 1, "tool": 1, "industrial": 2, "hardware": 1,
+            "o-ring": 2, "aluminum extrusion": 3,
+        },
+        "distributors": [
+            "https://www.mcmaster.com", "https://www.grainger.com", "https://www.fastenal.com",
+            "https://www.mscdirect.com", "https://www.zoro.com",
+        ],
+    },
+    "aerospace": {
+        "industry": "Aerospace",
+        "keywords": {
+            "aerospace": 3, "avionics": 3, "aircraft": 3, "aviation": 3, "flight": 1,
+            "airframe": 3, "satellite": 2, "cubesat": 3, "uav": 2, "drone": 1,
+        },
+        "distributors": [
+            "https://www.aviall.com", "https://www.wencor.com", "https://www.flyingcolours.com",
+        ],
+    },
+    "robotics": {
+        "industry": "Robotics",
+        "keywords": {
+            "robot": 3, "robotics": 3, "servo": 3, "stepper": 3, "actuator": 2, "gripper": 3,
+            "motor": 1, "motor driver": 2, "encoder": 2,
+        },
+        "distributors": [
+            "https://www.robotshop.com", "https://www.pololu.com", "https://www.servocity.com",
+            "https://www.trossenrobotics.com",
+        ],
+    },
+    "3d printing": {
+        "industry": "3D Printing",
+        "keywords": {
+            "3d printer": 3, "3d printing": 3, "3d": 1, "filament": 3, "printer": 1, "pla": 2,
+            "abs": 1, "petg": 3, "nozzle": 2, "hotend": 3, "resin printer": 3,
+        },
+        "distributors": [
+            "https://www.matterhackers.com", "https://www.prusa3d.com", "https://www.ultimaker.com",
+            "https://www.filaments.ca",
+        ],
+    },
+    "rocketry": {
+        "industry": "Rocketry",
+        "keywords": {
+            "rocket": 3, "rocketry": 3, "motor": 1, "rocket motor": 3, "propulsion": 2,
+            "recovery": 1, "parachute": 2, "ejection": 2, "nosecone": 3, "nose cone": 3,
+            "altimeter": 2, "launch rail": 3, "igniter": 2,
+        },
+        "distributors": [
+            "https://www.apogeerockets.com", "https://www.estesrockets.com", "https://www.madcowrocketry.com",
+            "https://www.wildmanrocketry.com",
+        ],
+    },
+    "composites": {
+        "industry": "Composites",
+        "keywords": {
+            "carbon fiber": 3, "carbon fibre": 3, "fiberglass": 3, "fibreglass": 3, "composite": 3,
+            "epoxy": 2, "resin": 1, "laminate": 2, "prepreg": 3, "kevlar": 3,
+        },
+        "distributors": [
+            "https://www.cstsales.com", "https://www.fibreglast.com", "https://www.carbonfibergear.com",
+        ],
+    },
+}
+
+# A category needs at least this total weight to count as a match
+DEFAULT_MIN_SCORE = 1
+
+# Distributors seeded per matched category on a vendor search
+DISTRIBUTORS_PER_CATEGORY = 3
+
+
+def _normalize_keyword(keyword: str) -> str:
+    """Canonical form of a keyword or matched phrase: lowercase, single spaces."""
+    return re.sub(r'[\s\-]+', ' ', keyword.lower()).strip()
+
+
+class TaxonomyMatcher:
+    """Matches text against every category's keywords in a single regex scan.
+
+    All keywords are compiled into one alternation (longest first) with
+    word boundaries, so "nut" no longer matches "peanut" and "pla" no
+    longer matches "plate". Plurals ("sensors", "fasteners") and space or
+    hyphen variants of phrases ("carbon-fiber") match too. Each keyword
+    counts once per text, adding its weight to every category it belongs to.
+    """
+
+    def __init__(self, taxonomy: Dict[str, Dict] = TAXONOMY):
+        self.taxonomy = taxonomy
+        # keyword -> [(category, weight)]
+        self.keywords: Dict[str, List[Tuple[str, int]]] = {}
+        for category, entry in taxonomy.items():
+            for keyword, weight in entry['keywords'].items():
+                self.keywords.setdefault(_normalize_keyword(keyword), []).append((category, weight))
+
+        alternatives = [r'[\s\-]+'.join(re.escape(word) for word in keyword.split())
+                        for keyword in sorted(self.keywords, key=len, reverse=True)]
+        self.pattern = re.compile(r'(?<![a-z0-9])(' + '|'.join(alternatives) + r')(?:e?s)?(?![a-z0-9])',
+                                  re.IGNORECASE)
+
+    def match(self, text: str, min_score: int = DEFAULT_MIN_SCORE) -> List[Dict]:
+        """Weighted categories for a text, best first.
+
+        Returns [{'category', 'industry', 'score', 'keywords'}] for every
+        category scoring at least min_score.
+        """
+        found = {_normalize_keyword(m.group(1)) for m in self.pattern.finditer(text or '')}
+        scores: Dict[str, int] = {}
+        matched: Dict[str, List[str]] = {}
+        for keyword in found:
+            for category, weight in self.keywords[keyword]:
+                scores[category] = scores.get(category, 0) + weight
+                matched.setdefault(category, []).append(keyword)
+
+        order = list(self.taxonomy)
+        results = [
+            {'category': category, 'industry': self.taxonomy[category]['industry'],
+             'score': score, 'keywords': sorted(matched[category])}
+            for category, score in scores.items() if score >= min_score
+        ]
+        # Ties keep taxonomy order, so results are deterministic
+        results.sort(key=lambda result: (-result['score'], order.index(result['category'])))
+        return results
+
+    def categories(self, text: str, min_score: int = DEFAULT_MIN_SCORE) -> List[str]:
+        """Names of the matching categories, best first."""
+        return [result['category'] for result in self.match(text, min_score)]
+
+    def industry(self, text: str, min_score: int = DEFAULT_MIN_SCORE) -> Optional[str]:
+        """Industry label of the best matching category, or None."""
+        results = self.match(text, min_score)
+        return results[0]['industry'] if results else None
+
+    def distributors(self, text: str, per_category: int = DISTRIBUTORS_PER_CATEGORY,
+                     min_score: int = DEFAULT_MIN_SCORE) -> List[str]:
+        """Well-known distributor URLs for the matching categories, best category first."""
+        urls = []
+        for category in self.categories(text, min_score):
+            for url in self.taxonomy[category]['distributors'][:per_category]:
+                if url not in urls:
+                    urls.append(url)
+        return urls
+
+
+@lru_cache(maxsize=1)
+def get_matcher() -> TaxonomyMatcher:
+    """The process-wide matcher for TAXONOMY (compiled on first use)."""
+    return TaxonomyMatcher(TAXONOMY)
+
+
+def company_text(company: Dict) -> str:
+    """The text a company is categorized by: name, URL, project/part and notes."""
+    return ' '.join(str(company.get(field) or '') for field in ('name', 'url', 'project_part', 'notes'))
+
+
+def tag_company_industries(db, company_type: str = None, overwrite: bool = False,
+                           min_score: int = 2) -> Dict:
+    """Set companies.industry from the taxonomy for every company in the database.
+
+    Companies are streamed, matched and written back in one executemany.
+    Existing industries are kept unless overwrite is set. min_score
+    defaults higher than for part names, since company text is noisier.
+    Returns {'scanned', 'tagged', 'by_industry'}.
+    """
+    matcher = get_matcher()
+    updates = {}
+    by_industry: Dict[str, int] = {}
+    scanned = 0
+    for company in db.iter_companies(company_type):
+        scanned += 1
+        if company.get('industry') and not overwrite:
+            continue
+        industry = matcher.industry(company_text(company), min_score)
+        if industry and industry != company.get('industry'):
+            updates[company['id']] = industry
+            by_industry[industry] = by_industry.get(industry, 0) + 1
+    db.update_company_industries(updates)
+    return {'scanned': scanned, 'tagged': len(updates), 'by_industry': by_industry}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Categorize parts or tag company industries")
+    parser.add_argument('text', nargs='*', help='Part names or descriptions to categorize')
+    parser.add_argument('--tag-db', metavar='DB', help='Tag the industry of companies in this database')
+    parser.add_argument('--type', choices=['sponsor', 'vendor'], help='Only tag companies of this type')
+    parser.add_argument('--overwrite', action='store_true', help='Replace existing industries')
+    args = parser.parse_args()
+
+    matcher = get_matcher()
+    for text in args.text:
+        results = matcher.match(text)
+        print(f"{text!r}:")
+        for result in results:
+            print(f"  {result['category']:<12} {result['score']:>3}  {', '.join(result['keywords'])}")
+        if not results:
+            print("  (no category)")
+        for url in matcher.distributors(text):
+            print(f"  seed {url}")
+
+    if args.tag_db:
+        from database import SponsorDatabase
+        with SponsorDatabase(args.tag_db) as db:
+            stats = tag_company_industries(db, args.type, args.overwrite)
+        print(f"Tagged {stats['tagged']} of {stats['scanned']} companies")
+        for industry, count in sorted(stats['by_industry'].items(), key=lambda item: -item[1]):
+            print(f"  {industry:<20} {count}")
@@ -0,0 +1,286 @@
+"""
+Email Templates for Integrated Sponsor Center
+Mail-merge templates stored in the templates table, compiled once and rendered in bulk into emails
+"""
+
+import re
+import time
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+from drafting import contact_project
+
+# {NAME} placeholders; any other braces in a template are literal text
+PLACEHOLDER_RE = re.compile(r'\{([A-Z][A-Z0-9_]*)\}')
+
+# Placeholder -> description (shown on the Email Templates page)
+FIELDS = {
+    'COMPANY_NAME': "Company name",
+    'COMPANY_URL': "Company website",
+    'CONTACT_EMAIL': "Recipient email address",
+    'PROJECT_NAME': "Project (sponsors) or part (vendors)",
+    'YOUR_NAME': "Your name/organization",
+    'AMOUNT': "Amount or details",
+    'NOTES': "Additional notes",
+    'DATE': "Today's date",
+}
+
+# Templates added to the templates table on startup (existing names are left alone)
+BUILTIN_TEMPLATES = {
+    "Sponsorship Request": {
+        'category': 'sponsorship',
+        'subject': "Sponsorship Partnership Opportunity - {PROJECT_NAME}",
+        'body': """Dear {COMPANY_NAME} Team,
+
+I hope this email finds you well. My name is {YOUR_NAME}, and I'm reaching out regarding an exciting sponsorship opportunity that aligns perfectly with {COMPANY_NAME}'s commitment to innovation and community.
+
+ABOUT OUR PROJECT:
+{PROJECT_NAME} is an innovative initiative that we believe would provide {COMPANY_NAME} with valuable exposure to our target audience.
+
+SPONSORSHIP DETAILS:
+• Investment Level: {AMOUNT}
+• Expected Reach: Significant market exposure
+• Deliverables: Brand visibility and engagement
+
+MUTUAL BENEFITS:
+• Brand exposure to target market
+• Association with innovation and excellence
+• Community engagement opportunities
+
+{NOTES}
+
+We would love to discuss this opportunity further and provide additional details about how {COMPANY_NAME} can be involved.
+
+Thank you for considering our proposal. I look forward to hearing from you.
+
+Best regards,
+{YOUR_NAME}""",
+    },
+    "Vendor Inquiry": {
+        'category': 'vendor',
+        'subject': "Product Inquiry - {PROJECT_NAME}",
+        'body': """Dear {COMPANY_NAME} Sales Team,
+
+I hope this message finds you well. I'm {YOUR_NAME}, and I'm interested in learning more about your products/services for {PROJECT_NAME}.
+
+PROJECT REQUIREMENTS:
+• Product needed: {PROJECT_NAME}
+• Budget range: {AMOUNT}
+• Timeline: As soon as possible
+
+QUESTIONS:
+• Do you have {PROJECT_NAME} currently in stock?
+• What are your current pricing and lead times?
+• Do you offer bulk/volume discounts?
+• Can you provide technical specifications?
+
+{NOTES}
+
+We're evaluating several suppliers and would appreciate receiving product information and pricing details.
+
+Thank you for your time. I look forward to your response.
+
+Best regards,
+{YOUR_NAME}""",
+    },
+    "Partnership Proposal": {
+        'category': 'sponsorship',
+        'subject': "Partnership Opportunity - {PROJECT_NAME}",
+        'body': """Dear {COMPANY_NAME} Team,
+
+I'm reaching out to explore a potential partnership between {YOUR_NAME} and {COMPANY_NAME}.
+
+PARTNERSHIP OPPORTUNITY:
+{PROJECT_NAME} represents a unique opportunity for collaboration.
+
+{NOTES}
+
+I'd welcome the chance to discuss how we can work together.
+
+Best regards,
+{YOUR_NAME}""",
+    },
+    "Follow-up Email": {
+        'category': 'follow_up',
+        'subject': "Following Up - {PROJECT_NAME}",
+        'body': """Dear {COMPANY_NAME} Team,
+
+I wanted to follow up on my previous email about {PROJECT_NAME}. I understand things get busy, so I'm bringing it back to the top of your inbox.
+
+{NOTES}
+
+If someone else at {COMPANY_NAME} is better placed to discuss this, I'd be grateful for an introduction.
+
+Best regards,
+{YOUR_NAME}""",
+    },
+    "Thank You Email": {
+        'category': 'thank_you',
+        'subject': "Thank You from {YOUR_NAME}",
+        'body': """Dear {COMPANY_NAME} Team,
+
+Thank you for your support of {PROJECT_NAME}. It makes a real difference to our team.
+
+{NOTES}
+
+We'll keep you updated on our progress.
+
+With gratitude,
+{YOUR_NAME}""",
+    },
+}
+
+# Template used for a contact when none is chosen
+DEFAULT_TEMPLATES = {'sponsor': "Sponsorship Request", 'vendor': "Vendor Inquiry"}
+
+
+class MergeFields(dict):
+    """Placeholder values; placeholders without a value render unchanged."""
+
+    def __missing__(self, key: str) -> str:
+        return '{' + key + '}'
+
+
+def compile_text(text: str) -> Tuple[Callable[[Dict], str], FrozenSet[str]]:
+    """Compile template text into a render function and the placeholders it uses.
+
+    The text becomes a str.format string (literal braces escaped, so only
+    {NAME} placeholders are fields), and rendering is a single C-level
+    format_map call per contact.
+    """
+    parts = []
+    names = set()
+    last = 0
+    for match in PLACEHOLDER_RE.finditer(text):
+        parts.append(text[last:match.start()].replace('{', '{{').replace('}', '}}'))
+        parts.append('{' + match.group(1) + '}')
+        names.add(match.group(1))
+        last = match.end()
+    parts.append(text[last:].replace('{', '{{').replace('}', '}}'))
+    return ''.join(parts).format_map, frozenset(names)
+
+
+class CompiledTemplate:
+    """A template's subject and body compiled for repeated rendering."""
+
+    def __init__(self, subject: str, body: str):
+        self._subject, subject_fields = compile_text(subject)
+        self._body, body_fields = compile_text(body)
+        self.placeholders = subject_fields | body_fields
+        self.unknown = frozenset(self.placeholders - set(FIELDS))
+
+    def render(self, values: Dict) -> Tuple[str, str]:
+        """(subject, body) for one set of merge fields."""
+        if not isinstance(values, MergeFields):
+            values = MergeFields(values)
+        return self._subject(values), self._body(values)
+
+
+@lru_cache(maxsize=256)
+def compile_template(subject: str, body: str) -> CompiledTemplate:
+    """The compiled form of a template, cached by its text (edits compile anew)."""
+    return CompiledTemplate(subject, body)
+
+
+def merge_fields(contact: Dict, sender: str = '', amount: str = '', notes: str = '',
+                 project: Optional[str] = None, email: Optional[str] = None) -> MergeFields:
+    """Placeholder values for one contact (an Email Center entry or a companies row)."""
+    emails = contact.get('emails') or []
+    if isinstance(emails, str):
+        emails = emails.split(', ')
+    return MergeFields(
+        COMPANY_NAME=contact.get('name') or '',
+        COMPANY_URL=contact.get('url') or '',
+        CONTACT_EMAIL=email or (emails[0] if emails else ''),
+        PROJECT_NAME=project or contact.get('project_part') or contact_project(contact),
+        YOUR_NAME=sender,
+        AMOUNT=amount,
+        NOTES=notes,
+        DATE=time.strftime('%B %d, %Y'),
+    )
+
+
+def render_template(template: Dict, contact: Dict, sender: str = '', amount: str = '', notes: str = '',
+                    project: Optional[str] = None, email: Optional[str] = None) -> Tuple[str, str]:
+    """Render a templates row for one contact. Returns (subject, body)."""
+    compiled = compile_template(template['subject'], template['body'])
+    return compiled.render(merge_fields(contact, sender, amount, notes, project, email))
+
+
+def seed_builtin_templates(db) -> int:
+    """Add BUILTIN_TEMPLATES missing from the templates table. Returns templates added."""
+    added = 0
+    for name, entry in BUILTIN_TEMPLATES.items():
+        if db.add_template(name, entry['subject'], entry['body'], entry['category']) is not None:
+            added += 1
+    return added
+
+
+def render_bulk(db, template: Dict, contacts: List[Dict], sender: str = '', amount: str = '',
+                notes: str = '', template_used: Optional[str] = None) -> Dict:
+    """Mail-merge one template against many contacts into the emails table.
+
+    The template is compiled once, each company's primary contact is
+    looked up in one query per 900 companies, and every draft plus the
+    template's times_used are written in a single transaction. Contacts
+    whose company has no contact email are skipped. Returns
+    {'rendered', 'skipped', 'seconds', 'unknown_placeholders', 'preview'}.
+    """
+    started = time.perf_counter()
+    compiled = compile_template(template['subject'], template['body'])
+    recipients = db.get_primary_contacts([contact['id'] for contact in contacts])
+    template_used = template_used or template['name']
+
+    rows = []
+    for contact in contacts:
+        recipient = recipients.get(contact['id'])
+        if recipient is None:
+            continue
+        subject, body = compiled.render(merge_fields(contact, sender, amount, notes, email=recipient['email']))
+        rows.append((contact['id'], recipient['id'], subject, body, template_used))
+
+    try:
+        rendered = db.bulk_add_emails(rows, commit=False)
+        if rendered and template.get('id'):
+            db.update_template_usage(template['id'], rendered, commit=False)
+        db.conn.commit()
+    except Exception:
+        db.conn.rollback()
+        raise
+    return {
+        'rendered': rendered,
+        'skipped': len(contacts) - len(rows),
+        'seconds': time.perf_counter() - started,
+        'unknown_placeholders': sorted(compiled.unknown),
+        'preview': {'subject': rows[0][2], 'body': rows[0][3]} if rows else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Mail-merge a saved template into drafted emails")
+    parser.add_argument('template', nargs='?', help='Template name (omit to list templates)')
+    parser.add_argument('--db', default='sponsor_center.db')
+    parser.add_argument('--type', choices=['sponsor', 'vendor'])
+    parser.add_argument('--sender', default='')
+    parser.add_argument('--amount', default='')
+    parser.add_argument('--notes', default='')
+    args = parser.parse_args()
+
+    from database import SponsorDatabase
+    with SponsorDatabase(args.db) as db:
+        seed_builtin_templates(db)
+        if not args.template:
+            for template in db.get_all_templates():
+                print(f"  {template['name']:<30} {template['category'] or '-':<12} used {template['times_used']}x")
+            raise SystemExit(0)
+        template = db.get_template_by_name(args.template)
+        if template is None:
+            raise SystemExit(f"No template named {args.template!r}")
+        companies = list(db.iter_companies(args.type))
+        stats = render_bulk(db, template, companies, args.sender, args.amount, args.notes)
+        print(f"Rendered {stats['rendered']:,} emails in {stats['seconds']:.2f}s "
+              f"({stats['skipped']:,} companies without contacts skipped)")
+        if stats['unknown_placeholders']:
+            print(f"Unknown placeholders left as-is: {', '.join(stats['unknown_placeholders'])}")
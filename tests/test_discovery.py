@@ -0,0 +1,24 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discovery import enrich_stage
+
+
+def test_enrich_stage_waits_for_running_crawls_when_closed_early():
+    running = []
+
+    def enrich(url):
+        running.append(url)
+        time.sleep(0.05 * len(running))
+        running.remove(url)
+        return [f"info@{url.split('//')[1]}"]
+
+    candidates = ({'url': f"https://site{n}.com"} for n in range(6))
+    stage = enrich_stage(candidates, enrich, max_workers=3, max_pending=3)
+    assert next(stage)['emails']
+    stage.close()
+
+    assert running == []
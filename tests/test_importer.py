@@ -0,0 +1,83 @@
+import io
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SponsorDatabase
+from importer import import_companies
+
+
+def test_non_string_fields_are_row_errors_or_converted(tmp_path):
+    rows = '\n'.join([
+        '{"url": "https://a.com", "name": 5}',
+        '{"url": "https://b.com", "type": 7}',
+        '{"url": "https://c.com", "name": ["x"]}',
+        '{"url": "https://d.com", "name": "Delta", "type": "vendor"}',
+    ])
+    with SponsorDatabase(str(tmp_path / 'import.db')) as db:
+        stats = import_companies(db, io.StringIO(rows), fmt='ndjson')
+        names = {company['url']: company['name'] for company in db.iter_companies()}
+
+    assert stats['rows_read'] == 4
+    assert stats['companies_inserted'] == 2
+    assert [error['line'] for error in stats['errors']] == [2, 3]
+    assert names['https://a.com'] == '5'
+    assert names['https://d.com'] == 'Delta'
+
+
+def test_non_list_emails_are_row_errors(tmp_path):
+    rows = '\n'.join([
+        '{"url": "https://a.com", "emails": 5}',
+        '{"url": "https://b.com", "emails": {"x": "a@b.com"}}',
+        '{"url": "https://c.com", "emails": [5]}',
+        '{"url": "https://d.com", "emails": ["d@d.com"]}',
+    ])
+    with SponsorDatabase(str(tmp_path / 'import.db')) as db:
+        stats = import_companies(db, io.StringIO(rows), fmt='ndjson')
+
+    assert stats['companies_inserted'] == 1
+    assert stats['contacts_added'] == 1
+    assert [error['line'] for error in stats['errors']] == [1, 2, 3]
+
+
+def test_duplicate_rows_merge_their_contacts(tmp_path):
+    rows = '\n'.join([
+        '{"url": "https://h.com", "emails": "a@h.com"}',
+        '{"url": "http://www.h.com/about", "emails": "b@h.com"}',
+        '{"url": "https://g.com", "emails": "a@g.com"}',
+        '{"url": "https://h.com", "emails": "a@h.com; c@h.com"}',
+    ])
+    with SponsorDatabase(str(tmp_path / 'import.db')) as db:
+        # A batch of 2 puts the last h.com row in a later batch than the first
+        stats = import_companies(db, io.StringIO(rows), fmt='ndjson', batch_size=2)
+        company_id = db.get_company_id_by_domain('h.com')
+        emails = sorted(contact['email'] for contact in db.get_company_contacts(company_id))
+
+    assert stats['companies_inserted'] == 2
+    assert stats['duplicates'] == 2
+    assert stats['contacts_added'] == 4
+    assert emails == ['a@h.com', 'b@h.com', 'c@h.com']
+
+
+def test_ndjson_keys_are_case_insensitive(tmp_path):
+    rows = '{"URL": "https://a.com", "Name": "Alpha", "Type": "Vendor", "Emails": ["x@a.com"]}'
+    with SponsorDatabase(str(tmp_path / 'import.db')) as db:
+        stats = import_companies(db, io.StringIO(rows), fmt='ndjson')
+        company = db.get_company_by_domain('a.com')
+
+    assert stats['errors'] == []
+    assert (company['name'], company['type']) == ('Alpha', 'vendor')
+
+
+def test_dry_run_counts_only_new_contacts(tmp_path):
+    with SponsorDatabase(str(tmp_path / 'import.db')) as db:
+        import_companies(db, io.StringIO('url,emails\nhttps://a.com,a@a.com\n'))
+        rows = 'url,emails\nhttps://a.com,a@a.com;b@a.com\nhttps://b.com,x@b.com\nhttps://b.com,x@b.com\n'
+        stats = import_companies(db, io.StringIO(rows), dry_run=True, batch_size=2)
+        companies = sum(1 for _ in db.iter_companies())
+
+    assert stats['companies_inserted'] == 1
+    assert stats['duplicates'] == 2
+    assert stats['contacts_added'] == 2
+    assert companies == 1
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fetcher import FetchManager
+from serp import fan_out
+
+
+class SlowFetcher:
+    """Stands in for a FetchManager: each fetch takes longer than the one before."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = 0
+        self.in_flight = 0
+        self.closed = False
+        self.used_after_close = False
+
+    def fetch(self, url):
+        with self.lock:
+            self.started += 1
+            self.in_flight += 1
+            delay = 0.05 * self.started
+        time.sleep(delay)
+        with self.lock:
+            self.in_flight -= 1
+            self.used_after_close |= self.closed
+        return {'html': '<html></html>', 'tier': 'direct', 'credits': 0, 'error': None}
+
+    def close(self):
+        self.closed = True
+
+
+def test_fan_out_waits_for_in_flight_requests_when_closed_early():
+    fetcher = SlowFetcher()
+    results = fan_out([f"query {n}" for n in range(6)], ['google'], fetcher, target=None, max_workers=3)
+    next(results)
+    results.close()
+    fetcher.close()
+
+    assert fetcher.in_flight == 0
+    assert fetcher.started < 6  # queued requests were cancelled
+    time.sleep(0.3)
+    assert not fetcher.used_after_close
+
+
+def test_fetch_manager_logging_after_close_is_skipped(tmp_path):
+    fetcher = FetchManager(str(tmp_path / 'fetch.db'))
+    fetcher._log('https://a.com', 'a.com', 'direct', 200, 'ok', 0, 0.01)
+    fetcher.close()
+    fetcher._log('https://a.com', 'a.com', 'direct', 200, 'ok', 0, 0.01)
+    assert fetcher.credits_used_today() == 0
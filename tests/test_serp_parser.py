@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serp_parser import SKIP_DOMAINS, parse_serp
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'serp')
+
+FIXTURES = sorted(name[:-len('.html')] for name in os.listdir(FIXTURE_DIR) if name.endswith('.html'))
+
+
+@pytest.fixture(params=FIXTURES)
+def fixture(request):
+    with open(os.path.join(FIXTURE_DIR, request.param + '.html'), encoding='utf-8') as f:
+        page = f.read()
+    with open(os.path.join(FIXTURE_DIR, request.param + '.json'), encoding='utf-8') as f:
+        expected = json.load(f)
+    return page, expected
+
+
+def test_primary_extractor_finds_the_expected_results(fixture):
+    page, expected = fixture
+    assert parse_serp(expected['engine'], page, fallback=False) == expected['results']
+
+
+def test_fallback_adds_links_outside_result_blocks(fixture):
+    page, expected = fixture
+    got = parse_serp(expected['engine'], page)
+    assert got[:len(expected['results'])] == expected['results']
+    assert [url for url in expected.get('fallback_includes', []) if url not in got] == []
+
+
+def test_script_and_comment_links_are_ignored(fixture):
+    page, expected = fixture
+    got = parse_serp(expected['engine'], page)
+    assert [url for url in expected.get('excludes', []) if url in got] == []
+
+
+def test_skip_domains_never_leak(fixture):
+    page, expected = fixture
+    got = parse_serp(expected['engine'], page)
+    assert [url for url in got if any(skip in url for skip in SKIP_DOMAINS)] == []
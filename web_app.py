@@ -6,10 +6,7 @@ Streamlit-based web interface for sponsorship and email search
 import streamlit as st
 import queue
 import threading
-import re
 import requests
-from bs4 import BeautifulSoup
-from openai import OpenAI
 from datetime import datetime
 import json
 import csv
@@ -17,139 +14,100 @@ import io
 import os
 import time
 import base64
-import dns.resolver
 import smtplib
-from urllib.parse import urljoin, urlparse
 from database import SponsorDatabase
-
-# Inlined EmailSearcher (previously in main_windows.py) for single-file deployment
-class EmailSearcher:
-    def __init__(self, max_pages=3, delay=0.5, scraper_api_key=None, use_scraper_for_sites=False):
-        self.max_pages = max_pages
-        self.delay = delay
-        self.scraper_api_key = scraper_api_key
-        self.use_scraper_for_sites = use_scraper_for_sites
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-        self.session.verify = False  # allow sites with cert issues
-        self.email_patterns = [
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            r'mailto:([A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,})',
-        ]
-        self.contact_pages = [
-            '/contact','/contact-us','/contact.html','/contact.php',
-            '/about','/about-us','/about.html','/about.php',
-            '/team','/staff','/people','/leadership',
-            '/support','/help','/customer-service',
-            '/legal','/privacy','/terms',
-            '/careers','/jobs','/employment'
-        ]
-
-    def get_page_content(self, url: str, force_scraper=False):
-        try:
-            # Only use ScraperAPI if explicitly forced or enabled for sites
-            if self.scraper_api_key and (force_scraper or self.use_scraper_for_sites):
-                scraper_url = f"http://api.scraperapi.com?api_key={self.scraper_api_key}&url={url}"
-                resp = requests.get(scraper_url, timeout=30, verify=False)
-            else:
-                resp = self.session.get(url, timeout=10)
-            resp.raise_for_status()
-            return resp.text
-        except Exception:
-            return None
-
-    def extract_emails_from_text(self, text: str):
-        emails = set()
-        for pattern in self.email_patterns:
-            for match in re.finditer(pattern, text, re.IGNORECASE):
-                email = match.group(1) if 'mailto:' in pattern else match.group(0)
-                email = email.lower().strip()
-                if self.is_valid_email_format(email):
-                    emails.add(email)
-        return emails
-
-    def is_valid_email_format(self, email: str):
-        false_positives = {
-            'example@example.com','test@test.com','admin@admin.com',
-            'info@info.com','contact@contact.com','support@support.com',
-            'noreply@noreply.com','donotreply@donotreply.com'
-        }
-        if email in false_positives: return False
-        if any(ext in email for ext in ['.jpg','.png','.gif','.svg']): return False
-        return '@' in email and '.' in email.split('@')[-1]
-
-    def get_all_links(self, base_url: str, html: str):
-        soup = BeautifulSoup(html, 'html.parser')
-        links = set()
-        base_domain = urlparse(base_url).netloc
-        for a in soup.find_all('a', href=True):
-            href = a['href'].strip()
-            if not href or href.startswith(('mailto:', 'javascript:', '#')):
-                continue
-            full = urljoin(base_url, href)
-            if urlparse(full).netloc == base_domain:
-                links.add(full.split('#')[0])
-        return links
-
-    def analyze_structure(self, base_url: str):
-        content = self.get_page_content(base_url)
-        if not content:
-            return []
-        all_links = self.get_all_links(base_url, content)
-        categories = {
-            'contact':[], 'about':[], 'team':[], 'support':[], 'other':[]
-        }
-        for link in all_links:
-            L = link.lower()
-            if any(k in L for k in ['contact','reach','touch']): categories['contact'].append(link)
-            elif any(k in L for k in ['about','company','who','story']): categories['about'].append(link)
-            elif any(k in L for k in ['team','staff','people','leadership','management']): categories['team'].append(link)
-            elif any(k in L for k in ['support','help','service','customer']): categories['support'].append(link)
-            else: categories['other'].append(link)
-        ordered = []
-        ordered += categories['contact'][:3]
-        ordered += categories['about'][:2]
-        ordered += categories['team'][:2]
-        ordered += categories['support'][:2]
-        ordered += categories['other'][:3]
-        if base_url not in ordered:
-            ordered.insert(0, base_url)
-        return ordered
-
-    def search_website_for_emails(self, base_url: str):
-        pages = self.analyze_structure(base_url)
-        pages = pages[:self.max_pages]
-        found = set()
-        for i, url in enumerate(pages, 1):
-            content = self.get_page_content(url)
-            if not content:
-                continue
-            page_emails = self.extract_emails_from_text(content)
-            found.update(page_emails)
-            # Early exit if we found 3+ emails to save API calls
-            if len(found) >= 3:
-                break
-            time.sleep(self.delay)
-        return found
-
-    def verify_email_domain(self, email: str):
-        domain = email.split('@')[-1]
-        try:
-            mx = dns.resolver.resolve(domain, 'MX')
-            return len(mx) > 0
-        except Exception:
-            return False
+from exporter import EXPORT_DIR, EXPORT_SOURCES, export_companies, prune_exports
+from backup import BackupScheduler, create_backup, list_backups, restore_backup
+from importer import import_upload
+from domains import normalize_host
+from fetcher import FetchManager
+from crawler import EmailSearcher
+from discovery import DISCOVERY_PROFILES, content_rank, discover_sponsors, discover_vendors, rank
+from directory import DirectoryRefresher, directory_vendors, record_crawls, sync_directory
+from recrawl import RecrawlScheduler, recrawl_stale
+from archive import PageArchive, reprocess
+from drafting import draft_batch, save_draft, stream_draft
+from llm import LLMGateway
+from metrics import REGISTRY, MetricsServer
+from profiler import RerunProfiler, parse_mode, top_functions
+from sender import SendQueue, SMTPPool
+from inbox import InboxWatcher
+from templates import DEFAULT_TEMPLATES, FIELDS, compile_template, render_bulk, render_template, seed_builtin_templates
+from taxonomy import get_matcher, tag_company_industries
 
 # OpenAI API Configuration - Use environment variable for security
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = "gpt-3.5-turbo"
 
+# Batch AI drafting - concurrent requests and request starts per minute (match your OpenAI tier)
+OPENAI_MAX_WORKERS = int(os.getenv("OPENAI_MAX_WORKERS", "4") or 4)
+OPENAI_REQUESTS_PER_MINUTE = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "60") or 0)
+
+# AI responses are cached by prompt and reused for identical inputs for this long (0 disables the cache)
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168") or 0)
+
+# Outbound email - set SMTP_HOST to send queued emails (paced, with a daily cap; 0 = unlimited)
+SMTP_HOST = os.getenv("SMTP_HOST", "")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587") or 587)
+SMTP_USER = os.getenv("SMTP_USER", "")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
+SMTP_FROM = os.getenv("SMTP_FROM", "") or SMTP_USER
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") != "0"
+SMTP_SSL = os.getenv("SMTP_SSL", "0") == "1"
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2") or 2)
+SEND_RATE_PER_MINUTE = float(os.getenv("SEND_RATE_PER_MINUTE", "20") or 0)
+SEND_DAILY_CAP = int(os.getenv("SEND_DAILY_CAP", "200") or 0)
+
+# Reply tracking - set INBOX_PATHS (comma-separated Maildir directories / mbox files synced by the mail fetcher)
+INBOX_PATHS = [path.strip() for path in os.getenv("INBOX_PATHS", "").split(",") if path.strip()]
+INBOX_INTERVAL_MINUTES = float(os.getenv("INBOX_INTERVAL_MINUTES", "10") or 0)
+
+# Prometheus scrape endpoint - set METRICS_PORT to serve /metrics (METRICS_HOST=0.0.0.0 to expose beyond localhost)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0") or 0)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Rerun profiling - PROFILE_RERUNS=1 (or ?profile=1) times each section of the script on every rerun,
+# PROFILE_RERUNS=cprofile (or ?profile=cprofile) also saves cProfile stats to PROFILE_DIR; ?profile=0 turns it off
+PROFILE_RERUNS = os.getenv("PROFILE_RERUNS", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
 # ScraperAPI Configuration - Use environment variable for security  
 # Get your free API key at https://scraperapi.com (1000 requests/month free)
 SCRAPER_API_KEY = os.getenv("SCRAPER_API_KEY", "")
 
+# ScraperAPI credit budgets (0 = unlimited) - direct fetches are free and always tried first
+SCRAPER_DAILY_CREDITS = int(os.getenv("SCRAPER_DAILY_CREDITS", "200") or 0)
+SCRAPER_SEARCH_CREDITS = int(os.getenv("SCRAPER_SEARCH_CREDITS", "25") or 0)
+
+# Search-engine result pages are reused for this long before being fetched again
+SERP_CACHE_TTL_HOURS = float(os.getenv("SERP_CACHE_TTL_HOURS", "24") or 0)
+
+# Rows per page on the Company Database page
+COMPANY_PAGE_SIZE = 25
+
+# Contacts rendered per page in the Email Center
+CONTACT_PAGE_SIZE = 50
+
+# Exports larger than this (compressed or not) are refused for download; use exporter.py for them (0 = unlimited)
+EXPORT_DOWNLOAD_MAX_MB = float(os.getenv("EXPORT_DOWNLOAD_MAX_MB", "50") or 0)
+
+# Database snapshots - set BACKUP_INTERVAL_HOURS to enable scheduled backups
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_INTERVAL_HOURS = float(os.getenv("BACKUP_INTERVAL_HOURS", "0") or 0)
+BACKUP_KEEP = int(os.getenv("BACKUP_KEEP", "7") or 7)
+
+# Distributor directory - contacts are re-crawled in the background after this many hours (0 disables)
+DIRECTORY_REFRESH_HOURS = float(os.getenv("DIRECTORY_REFRESH_HOURS", "168") or 0)
+
+# Incremental contact re-crawl - set RECRAWL_INTERVAL_HOURS to re-crawl a batch of stale companies periodically
+RECRAWL_INTERVAL_HOURS = float(os.getenv("RECRAWL_INTERVAL_HOURS", "0") or 0)
+RECRAWL_MAX_AGE_DAYS = float(os.getenv("RECRAWL_MAX_AGE_DAYS", "30") or 30)
+RECRAWL_BATCH_SIZE = int(os.getenv("RECRAWL_BATCH_SIZE", "50") or 50)
+
+# Raw page archive - set PAGE_ARCHIVE_PATH to keep compressed HTML of every crawled page for reprocessing
+PAGE_ARCHIVE_PATH = os.getenv("PAGE_ARCHIVE_PATH", "")
+PAGE_ARCHIVE_MAX_MB = float(os.getenv("PAGE_ARCHIVE_MAX_MB", "500") or 0)
+
 # Debug: Show what keys are loaded (only for local testing - remove in production)
 if SCRAPER_API_KEY:
     print(f"✅ ScraperAPI Key loaded: {SCRAPER_API_KEY[:10]}...{SCRAPER_API_KEY[-4:]}")
@@ -169,6 +127,17 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Rerun profiling (off unless enabled) - each section of the script below ends with a checkpoint
+@st.cache_resource
+def init_rerun_profiler():
+    """Rolling rerun timings shared by every session."""
+    return RerunProfiler(PROFILE_DIR)
+
+rerun_profiler = init_rerun_profiler()
+rerun_mode = parse_mode(st.experimental_get_query_params().get('profile', [PROFILE_RERUNS])[0])
+rerun = rerun_profiler.begin(rerun_mode, st.session_state.get('rerun_profile'))
+st.session_state.rerun_profile = rerun
+
 # Load logo (optional)
 def get_base64_image(image_path: str):
     try:
@@ -178,6 +147,7 @@ def get_base64_image(image_path: str):
         return None
 
 logo_base64 = get_base64_image("ubco_aerospace_logo.jpg")
+rerun.checkpoint("logo")
 
 # Modern CSS with UBCO branding - v2.0
 st.markdown("""
@@ -396,6 +366,7 @@ st.markdown("""
     }
 </style>
 """, unsafe_allow_html=True)
+rerun.checkpoint("css")
 
 
 
@@ -407,15 +378,117 @@ def init_database():
 
 db = init_database()
 
+@st.cache_resource
+def init_backup_scheduler(db_path: str):
+    """Start the periodic snapshot thread once per server process."""
+    if BACKUP_INTERVAL_HOURS <= 0:
+        return None
+    scheduler = BackupScheduler(db_path, BACKUP_DIR, interval_seconds=BACKUP_INTERVAL_HOURS * 3600,
+                                keep=BACKUP_KEEP)
+    scheduler.start()
+    return scheduler
+
+backup_scheduler = init_backup_scheduler(db.db_path)
+
+@st.cache_resource
+def init_page_archive():
+    """Open the page archive once per server process (None when disabled)."""
+    if not PAGE_ARCHIVE_PATH:
+        return None
+    return PageArchive(PAGE_ARCHIVE_PATH, max_bytes=int(PAGE_ARCHIVE_MAX_MB * 1024 * 1024))
+
+page_archive = init_page_archive()
+
+@st.cache_resource
+def init_directory_refresher(db_path: str):
+    """Add the taxonomy distributors and start the contact refresh thread once per server process."""
+    sync_directory(db)
+    if DIRECTORY_REFRESH_HOURS <= 0:
+        return None
+    refresher = DirectoryRefresher(db_path, max_age_seconds=DIRECTORY_REFRESH_HOURS * 3600, archive=page_archive)
+    refresher.start()
+    return refresher
+
+directory_refresher = init_directory_refresher(db.db_path)
+
+@st.cache_resource
+def init_recrawl_scheduler(db_path: str):
+    """Start the incremental contact re-crawl thread once per server process."""
+    if RECRAWL_INTERVAL_HOURS <= 0:
+        return None
+    scheduler = RecrawlScheduler(db_path, interval_seconds=RECRAWL_INTERVAL_HOURS * 3600,
+                                 max_age_seconds=RECRAWL_MAX_AGE_DAYS * 86400, batch_size=RECRAWL_BATCH_SIZE,
+                                 archive=page_archive)
+    scheduler.start()
+    return scheduler
+
+recrawl_scheduler = init_recrawl_scheduler(db.db_path)
+
+@st.cache_resource
+def init_llm_gateway(db_path: str):
+    """Create the OpenAI gateway (one client and connection pool) once per server process (None without a key)."""
+    if not OPENAI_API_KEY.strip():
+        return None
+    try:
+        return LLMGateway(OPENAI_API_KEY, db_path, cache_ttl_seconds=LLM_CACHE_TTL_HOURS * 3600)
+    except Exception:
+        return None
+
+llm_gateway = init_llm_gateway(db.db_path)
+
+@st.cache_resource
+def init_send_queue(db_path: str):
+    """Start the paced SMTP sender thread once per server process (None without SMTP_HOST)."""
+    if not SMTP_HOST:
+        return None
+    relay = SMTPPool(SMTP_HOST, SMTP_PORT, SMTP_USER or None, SMTP_PASSWORD, starttls=SMTP_STARTTLS,
+                     use_ssl=SMTP_SSL, size=SMTP_POOL_SIZE)
+    send_queue = SendQueue(db_path, [relay], SMTP_FROM, rate_per_minute=SEND_RATE_PER_MINUTE,
+                           daily_cap=SEND_DAILY_CAP)
+    send_queue.start()
+    return send_queue
+
+send_queue = init_send_queue(db.db_path)
+
+@st.cache_resource
+def init_inbox_watcher(db_path: str):
+    """Start the reply and bounce ingestion thread once per server process (None without INBOX_PATHS)."""
+    if not INBOX_PATHS:
+        return None
+    watcher = InboxWatcher(db_path, INBOX_PATHS, interval_seconds=INBOX_INTERVAL_MINUTES * 60)
+    if INBOX_INTERVAL_MINUTES > 0:
+        watcher.start()
+    return watcher
+
+inbox_watcher = init_inbox_watcher(db.db_path)
+
+@st.cache_resource
+def init_metrics_server(port: int):
+    """Serve the process-wide metrics for Prometheus once per server process (None without METRICS_PORT)."""
+    if not port:
+        return None
+    server = MetricsServer(port, METRICS_HOST)
+    try:
+        server.start()
+    except OSError:
+        return None  # port taken, e.g. by another server process
+    return server
+
+metrics_server = init_metrics_server(METRICS_PORT)
+
+@st.cache_resource
+def init_templates(db_path: str):
+    """Add the built-in email templates to the templates table once per server process."""
+    return seed_builtin_templates(db)
+
+init_templates(db.db_path)
+rerun.checkpoint("startup resources")
+
 # Initialize session state
 if 'found_companies' not in st.session_state:
     st.session_state.found_companies = []
 if 'recommended_vendors' not in st.session_state:
     st.session_state.recommended_vendors = []
-if 'contact_list' not in st.session_state:
-    st.session_state.contact_list = []  # Store companies with emails for email center
-if 'saved_email_templates' not in st.session_state:
-    st.session_state.saved_email_templates = []  # Store custom templates
 if 'drafted_emails' not in st.session_state:
     st.session_state.drafted_emails = []  # Store emails created in session
 if 'page_switch' not in st.session_state:
@@ -426,17 +499,70 @@ if 'vendor_search_part' not in st.session_state:
     st.session_state.vendor_search_part = ""  # Remember last search term
 if 'email_search_results' not in st.session_state:
     st.session_state.email_search_results = {}  # Persist email search results by URL
-if 'openai_client' not in st.session_state:
-    try:
-        if OPENAI_API_KEY and OPENAI_API_KEY.strip():
-            st.session_state.openai_client = OpenAI(api_key=OPENAI_API_KEY)
-            st.session_state.openai_enabled = True
-        else:
-            st.session_state.openai_client = None
-            st.session_state.openai_enabled = False
-    except Exception:
-        st.session_state.openai_client = None
-        st.session_state.openai_enabled = False
+
+def new_fetcher(search_label: str) -> FetchManager:
+    """Metered, budgeted fetcher for one search."""
+    return FetchManager(db.db_path, SCRAPER_API_KEY, daily_budget=SCRAPER_DAILY_CREDITS,
+                        search_budget=SCRAPER_SEARCH_CREDITS, search_label=search_label)
+
+
+def show_fetch_usage(fetcher: FetchManager):
+    """Caption summarizing what a search cost."""
+    usage = fetcher.usage()
+    st.caption(f"ScraperAPI credits: {usage['search_credits']} this search · "
+               f"{usage['daily_credits']}/{usage['daily_budget'] or '∞'} today · "
+               f"{usage['direct']} direct, {usage['escalated']} escalated, "
+               f"{usage['budget_refused']} refused by budget")
+
+
+# Contact list - persisted as a campaign in the database and paged from it;
+# only the page on screen is cached per session, as {company_id: contact_entry}
+def contact_entry(company: dict, emails: list) -> dict:
+    """Build the Email Center contact entry for a company row."""
+    entry = {
+        'id': company['id'],
+        'name': company['name'],
+        'url': company['url'],
+        'emails': emails,
+        'type': company['type'],
+    }
+    entry['project' if company['type'] == 'sponsor' else 'part'] = company.get('project_part') or 'N/A'
+    return entry
+
+def member_entry(row: dict) -> dict:
+    """Build the contact entry for a campaign member row (emails come comma-joined)."""
+    return contact_entry(row, row['emails'].split(', ') if row['emails'] else [])
+
+def add_to_contact_list(company: dict, company_type: str, project_part: str, industry: str = None) -> bool:
+    """Save a search result to the database and add it to the contact list.
+
+    Returns False if the company was already in the list.
+    """
+    company_id = db.add_company(
+        name=company['name'],
+        url=company['url'],
+        company_type=company_type,
+        industry=industry,
+        project_part=project_part,
+        relevance_score=company.get('relevance_score', 0)
+    )
+    for email in company['emails']:
+        db.add_contact(company_id, email)
+
+    # add_company may return an existing row (same domain); membership is keyed on its id
+    if not db.add_campaign_member(st.session_state.contact_campaign_id, company_id):
+        return False
+    st.session_state.pop('contact_page', None)
+    return True
+
+def remove_from_contact_list(contact: dict):
+    """Remove a company from the contact list (the company stays in the database)."""
+    db.remove_campaign_member(st.session_state.contact_campaign_id, contact['id'])
+    st.session_state.pop('contact_page', None)
+
+if 'contact_campaign_id' not in st.session_state:
+    st.session_state.contact_campaign_id = db.get_or_create_campaign()
+rerun.checkpoint("session state")
 
 # Sidebar with UBCO branding
 if logo_base64:
@@ -471,13 +597,16 @@ if SCRAPER_API_KEY:
 else:
     st.sidebar.warning("ScraperAPI: Fucking Dead")
 
-if st.session_state.openai_enabled:
+if llm_gateway is not None:
     st.sidebar.success("AI Assistant: Connected")
 else:
     st.sidebar.info("AI Assistant: Fucking Dead")
 
+rerun.checkpoint("sidebar")
+
 # Get database statistics
 db_stats = db.get_statistics()
+rerun.checkpoint("get_statistics")
 
 st.sidebar.markdown("---")
 st.sidebar.markdown("### Statistics")
@@ -487,6 +616,26 @@ st.sidebar.metric("Vendors", db_stats['total_vendors'])
 st.sidebar.metric("Contacts", db_stats['total_contacts'])
 st.sidebar.metric("Drafted Emails", db_stats['drafted_emails'])
 
+# ScraperAPI credit usage (UTC day)
+fetch_usage = db.get_fetch_usage()
+st.sidebar.markdown("---")
+st.sidebar.markdown("### ScraperAPI Usage")
+if SCRAPER_DAILY_CREDITS:
+    st.sidebar.progress(min(fetch_usage['credits'] / SCRAPER_DAILY_CREDITS, 1.0),
+                        text=f"{fetch_usage['credits']} / {SCRAPER_DAILY_CREDITS} credits today")
+else:
+    st.sidebar.metric("Credits Today", fetch_usage['credits'])
+st.sidebar.caption(f"{fetch_usage['direct_ok']} direct · {fetch_usage['direct_blocked']} blocked · "
+                   f"{fetch_usage['scraper_ok']} via ScraperAPI · per-search budget {SCRAPER_SEARCH_CREDITS or '∞'}")
+with st.sidebar.expander("Recent searches"):
+    recent_usage = db.get_recent_search_usage()
+    if recent_usage:
+        for search in recent_usage:
+            st.caption(f"{search['search_label'] or search['search_id']}: "
+                       f"{search['credits']} credits / {search['requests']} requests")
+    else:
+        st.caption("No searches yet")
+
 # Add ScraperAPI test button
 if SCRAPER_API_KEY:
     st.sidebar.markdown("---")
@@ -533,6 +682,58 @@ if SCRAPER_API_KEY:
                 st.write(f"❌ Error: {str(e)}")
                 status.update(label="❌ Test Failed", state="error", expanded=True)
 
+rerun.checkpoint("sidebar usage")
+
+# In-process metrics (fetches, parsing, SQL, SERP and AI calls) since the server started
+with st.sidebar.expander("Diagnostics"):
+    metric_rows = REGISTRY.snapshot()
+    metric_totals = {}
+    for row in metric_rows:
+        total = metric_totals.setdefault(row['metric'], {'count': 0, 'sum': 0.0})
+        total['count'] += row.get('count', row.get('value', 0))
+        total['sum'] += row.get('sum', 0.0)
+
+    def metric_count(name: str, **labels) -> float:
+        wanted = [f"{key}={value}" for key, value in labels.items()]
+        return sum(row.get('value', row.get('count', 0)) for row in metric_rows
+                   if row['metric'] == name and all(label in row['labels'].split(', ') for label in wanted))
+
+    fetch_total = metric_totals.get('fetch_seconds', {'count': 0, 'sum': 0.0})
+    st.caption(f"Fetches: {fetch_total['count']:,.0f} ({fetch_total['sum']:.1f}s), "
+               f"{metric_count('fetch_bytes_total') / 1e6:.1f} MB, "
+               f"{metric_count('scraper_credits_total'):,.0f} ScraperAPI credits")
+    serp_hits = metric_count('serp_cache_total', result='hit')
+    serp_lookups = serp_hits + metric_count('serp_cache_total', result='miss')
+    serp_caption = f"SERP pages: {metric_totals.get('serp_seconds', {'count': 0})['count']:,.0f} fetched"
+    if serp_lookups:
+        serp_caption += f", cache hit rate {serp_hits / serp_lookups:.0%}"
+    st.caption(serp_caption)
+    parse_total = metric_totals.get('parse_seconds', {'count': 0, 'sum': 0.0})
+    db_total = metric_totals.get('db_query_seconds', {'count': 0, 'sum': 0.0})
+    st.caption(f"Parsing: {parse_total['sum']:.2f}s · SQL: {db_total['count']:,.0f} calls, {db_total['sum']:.2f}s")
+    llm_requests = metric_count('llm_requests_total')
+    llm_cached = metric_count('llm_requests_total', outcome='cached')
+    st.caption(f"AI calls: {llm_requests:,.0f} ({llm_cached:,.0f} cached"
+               + (f", {llm_cached / llm_requests:.0%} hit rate)" if llm_requests else ")")
+               + f" · ${metric_count('llm_cost_usd_total'):.4f}")
+    if metrics_server is not None:
+        st.caption(f"Prometheus: http://{METRICS_HOST}:{metrics_server.port}/metrics")
+    if st.checkbox("Show all series", key="diagnostics_series"):
+        st.dataframe([{'Metric': row['metric'], 'Labels': row['labels'],
+                       'Count': row.get('count', row.get('value')),
+                       'Avg (ms)': round(row['avg'] * 1000, 1) if 'avg' in row else None,
+                       'p95 (ms)': round(row['p95'] * 1000, 1) if 'p95' in row else None,
+                       'Total (s)': round(row['sum'], 3) if 'sum' in row else None}
+                      for row in sorted(metric_rows, key=lambda row: -row.get('sum', 0.0))],
+                     use_container_width=True, hide_index=True)
+        st.download_button("Download (Prometheus text)", REGISTRY.render(),
+                           file_name="sponsor_center_metrics.prom", mime="text/plain")
+    if st.button("Reset Metrics", key="diagnostics_reset"):
+        REGISTRY.reset()
+        st.rerun()
+
+rerun.checkpoint("diagnostics")
+
 # Main Content
 if page == "Dashboard":
     st.markdown('<h1 style="text-align: center; font-size: 1.8rem; margin-bottom: 1.5rem; font-weight: 700; color: #e8eaed;">SPONSOR DASHBOARD</h1>', unsafe_allow_html=True)
@@ -584,6 +785,45 @@ if page == "Dashboard":
             st.session_state.page_switch = "Email Center"
             st.rerun()
 
+    # AI usage - every OpenAI request goes through the gateway and is metered in llm_usage
+    st.markdown("---")
+    st.markdown("### AI Usage")
+    usage_days = st.selectbox("Period", [1, 7, 30], format_func=lambda d: "Today" if d == 1 else f"Last {d} days",
+                              key="llm_usage_days")
+    llm_usage = db.get_llm_usage(usage_days)
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Requests", llm_usage['requests'],
+                help=f"{llm_usage['errors']} failed" if llm_usage['errors'] else None)
+    col2.metric("Cache Hits", f"{llm_usage['cached'] / llm_usage['requests'] * 100:.0f}%" if llm_usage['requests'] else "0%")
+    col3.metric("Tokens", f"{llm_usage['prompt_tokens'] + llm_usage['completion_tokens']:,}",
+                help=f"{llm_usage['prompt_tokens']:,} prompt / {llm_usage['completion_tokens']:,} completion")
+    col4.metric("Est. Cost", f"${llm_usage['cost']:.4f}")
+    if llm_usage['avg_latency_ms'] is not None:
+        st.caption(f"Average latency {llm_usage['avg_latency_ms'] / 1000:.1f}s per uncached request")
+    if llm_usage['models']:
+        st.dataframe([{'Model': row['model'], 'Requests': row['requests'], 'Cached': row['cached'],
+                       'Errors': row['errors'], 'Prompt Tokens': row['prompt_tokens'],
+                       'Completion Tokens': row['completion_tokens'], 'Cost ($)': round(row['cost'], 4),
+                       'Avg Latency (ms)': round(row['avg_latency_ms'] or 0)}
+                      for row in llm_usage['models']], use_container_width=True, hide_index=True)
+    with st.expander("Recent AI requests"):
+        recent_calls = db.get_recent_llm_calls()
+        if recent_calls:
+            st.dataframe([{'Time': call['created_at'], 'Purpose': call['purpose'], 'Model': call['model'],
+                           'Result': 'cached' if call['cached'] else call['outcome'],
+                           'Tokens': call['prompt_tokens'] + call['completion_tokens'],
+                           'Latency (ms)': call['latency_ms'], 'First Token (ms)': call['first_token_ms'],
+                           'Cost ($)': round(call['cost'], 5), 'Error': call['error'] or ''}
+                          for call in recent_calls], use_container_width=True, hide_index=True)
+        else:
+            st.caption("No AI requests yet")
+        llm_cache_stats = db.get_llm_cache_stats()
+        st.caption(f"{llm_cache_stats['entries']:,} cached responses served {llm_cache_stats['hits']:,} hits, "
+                   f"reused for {LLM_CACHE_TTL_HOURS:g} hours. Oldest: {llm_cache_stats['oldest'] or 'n/a'}")
+        if st.button("Clear AI Response Cache", key="clear_llm_cache"):
+            removed = db.purge_llm_cache()
+            st.success(f"Removed {removed} cached response(s)")
+
 elif page == "Email Search":
     st.markdown('<p class="main-header">Company Email Search</p>', unsafe_allow_html=True)
     
@@ -633,6 +873,7 @@ elif page == "Email Search":
             
             st.warning("Search in progress - DO NOT switch pages or the search will be cancelled!")
             with st.spinner(f"Searching {url} for email addresses..."):
+                fetcher = new_fetcher(f"email: {url}")
                 try:
                     # Only use ScraperAPI if explicitly requested
                     api_key = SCRAPER_API_KEY if use_scraper else None
@@ -640,15 +881,18 @@ elif page == "Email Search":
                         max_pages=max_pages, 
                         delay=delay, 
                         scraper_api_key=api_key,
-                        use_scraper_for_sites=use_scraper
+                        use_scraper_for_sites=use_scraper,
+                        fetcher=fetcher,
+                        archive=page_archive
                     )
                     
                     if use_scraper and SCRAPER_API_KEY:
-                        st.info("🔧 Using ScraperAPI (costs 1-5 credits per page)")
+                        st.info("🔧 ScraperAPI used only for pages that block direct access (costs credits)")
                     elif use_scraper and not SCRAPER_API_KEY:
                         st.warning("⚠️ ScraperAPI enabled but no API key found")
                     
                     emails = searcher.search_website_for_emails(url)
+                    show_fetch_usage(fetcher)
                     
                     if emails:
                         st.success(f"Found {len(emails)} email addresses!")
@@ -695,6 +939,8 @@ elif page == "Email Search":
                         
                 except Exception as e:
                     st.error(f"Search failed: {str(e)}")
+                finally:
+                    fetcher.close()
     
     # Display previous results if they exist
     if st.session_state.email_search_results:
@@ -712,7 +958,7 @@ elif page == "Email Search":
                 st.download_button(
                     label="Download",
                     data=csv_data,
-                    file_name=f"emails_{url.replace('https://', '').replace('http://', '').split('/')[0]}.csv",
+                    file_name=f"emails_{normalize_host(url) or 'site'}.csv",
                     mime="text/csv",
                     key=f"download_{url}"
                 )
@@ -731,6 +977,8 @@ elif page == "Real Sponsors":
     with col2:
         canadian_only = st.checkbox("Canadian companies only", value=True)
         include_contact = st.checkbox("Extract contact emails", value=True)
+        refresh_search = st.checkbox("Bypass search cache", value=False, key="sponsor_refresh_search",
+                                     help="Fetch fresh search-engine results instead of reusing cached ones")
     
     if st.button("Find Real Sponsors", type="primary", use_container_width=True):
         if not project:
@@ -738,18 +986,12 @@ elif page == "Real Sponsors":
         else:
             st.warning("⚠️ Search in progress - DO NOT switch pages or the search will be cancelled!")
             with st.spinner("Searching for real sponsors with actual contact info..."):
+                fetcher = new_fetcher(f"sponsor: {project}")
                 try:
                     # Build search query
                     location = "Canada" if canadian_only else "North America"
                     industry_part = f"{industry} " if industry else ""
                     
-                    # Build multiple search URLs for better results
-                    base_queries = [
-                        f"{project} {industry_part}companies {location}",
-                        f"{project} {industry_part}manufacturers {location}",
-                        f"{project} {industry_part}suppliers {location}"
-                    ]
-                    
                     st.info(f"Searching for: {project} {industry_part}in {location}")
                     
                     # Show ScraperAPI status
@@ -759,138 +1001,54 @@ elif page == "Real Sponsors":
                         st.warning("⚠️ No ScraperAPI - may get blocked by search engines")
                     
                     # Initialize searcher with faster settings
-                    searcher = EmailSearcher(max_pages=2, delay=0.5, scraper_api_key=SCRAPER_API_KEY)
-                    
-                    all_company_urls = set()
+                    searcher = EmailSearcher(max_pages=2, delay=0.5, scraper_api_key=SCRAPER_API_KEY, fetcher=fetcher,
+                                             archive=page_archive)
                     
                     # Create progress indicators
                     progress_text = st.empty()
                     search_status = st.empty()
+                    progress_bar = st.progress(0)
                     
-                    # Try multiple search engines with ScraperAPI
-                    search_engines = [
-                        ("Google", f"https://www.google.com/search?q={{}}&num=20"),
-                        ("Bing", f"https://www.bing.com/search?q={{}}"),
-                        ("DuckDuckGo", f"https://html.duckduckgo.com/html/?q={{}}")
-                    ]
-                    
-                    for engine_name, engine_url_template in search_engines:
-                        progress_text.info(f"Searching {engine_name}...")
-                        
-                        for query in base_queries[:2]:  # Use first 2 queries
-                            search_url = engine_url_template.format(query.replace(' ', '+'))
-                            
-                            search_status.text(f"Query: {query}")
-                            
-                            # ALWAYS use ScraperAPI for Google and Bing (they block direct requests)
-                            if SCRAPER_API_KEY:
-                                import urllib.parse
-                                import requests
-                                
-                                # Encode URL properly for ScraperAPI
-                                encoded_url = urllib.parse.quote(search_url, safe='')
-                                
-                                # Add render=false for faster results (HTML only, no JS rendering)
-                                scraper_url = f"http://api.scraperapi.com?api_key={SCRAPER_API_KEY}&url={encoded_url}"
-                                
-                                try:
-                                    search_status.text(f"Requesting {engine_name} via ScraperAPI...")
-                                    st.caption(f"Target: {search_url[:80]}...")
-                                    
-                                    response = requests.get(scraper_url, timeout=30)
-                                    
-                                    if response.status_code == 200:
-                                        search_content = response.text
-                                        search_status.success(f"SUCCESS: Got {len(search_content):,} bytes from {engine_name}")
-                                    else:
-                                        error_msg = f"Status {response.status_code}"
-                                        if response.text:
-                                            error_msg += f": {response.text[:100]}"
-                                        search_status.error(f"ERROR: {engine_name} - {error_msg}")
-                                        st.warning(f"ScraperAPI returned error. Check your API key and credits.")
-                                        search_content = None
-                                        
-                                except requests.exceptions.Timeout:
-                                    search_status.error(f"TIMEOUT: {engine_name} (>30s)")
-                                    search_content = None
-                                except Exception as e:
-                                    search_status.error(f"ERROR: {engine_name} - {str(e)[:80]}")
-                                    st.error(f"Request failed: {type(e).__name__}: {str(e)}")
-                                    search_content = None
+                    def report_serp(result):
+                        """Show each search-engine result page as it arrives."""
+                        engine_name = result['label']
+                        if result['error']:
+                            search_status.error(f"ERROR: {engine_name} - {result['error'][:80]}")
+                        elif result['cached']:
+                            search_status.success(f"CACHED: {len(result['urls'])} companies from {engine_name} "
+                                                  f"(fetched {result['fetched_at']}, Total: {result['total_domains']})")
+                        else:
+                            # Debug: Show snippet of received HTML
+                            with st.expander(f"Debug: {engine_name} HTML preview"):
+                                st.code(result['preview'], language="html")
+                            if result['urls']:
+                                search_status.success(f"FOUND: {len(result['urls'])} companies from {engine_name} "
+                                                      f"in {result['seconds']:.1f}s (Total: {result['total_domains']})")
                             else:
-                                # No ScraperAPI - Google and Bing will be blocked
-                                search_status.warning(f"SKIPPED: {engine_name} (requires ScraperAPI)")
-                                search_content = None
-                        
-                            if search_content:
-                                from bs4 import BeautifulSoup
-                                soup = BeautifulSoup(search_content, 'html.parser')
-                                
-                                search_status.text(f"🔍 Parsing {engine_name} results...")
-                                
-                                # Debug: Show snippet of received HTML
-                                with st.expander(f"Debug: {engine_name} HTML preview"):
-                                    st.code(search_content[:1000], language="html")
-                                
-                                # Extract URLs based on search engine
-                                skip_domains = ['duckduckgo', 'google', 'bing', 'yahoo', 'facebook', 'twitter', 
-                                               'linkedin', 'youtube', 'wikipedia', 'reddit', 'amazon', 'instagram']
-                                
-                                found_in_iteration = 0
-                                
-                                # DuckDuckGo Lite results - much simpler structure
-                                # Look for all links in result-link class
-                                for link in soup.find_all('a', class_='result-link'):
-                                    url = link.get('href', '')
-                                    if url.startswith('http'):
-                                        domain = url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].split('?')[0]
-                                        if not any(skip in domain.lower() for skip in skip_domains) and '.' in domain:
-                                            all_company_urls.add(f"https://{domain}")
-                                            found_in_iteration += 1
-                                
-                                # Alternative: look for span.link-text parent links
-                                if found_in_iteration == 0:
-                                    for span in soup.find_all('span', class_='link-text'):
-                                        parent_link = span.find_parent('a')
-                                        if parent_link:
-                                            url = parent_link.get('href', '')
-                                            if url.startswith('http'):
-                                                domain = url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].split('?')[0]
-                                                if not any(skip in domain.lower() for skip in skip_domains) and '.' in domain:
-                                                    all_company_urls.add(f"https://{domain}")
-                                                    found_in_iteration += 1
-                                
-                                # Aggressive fallback
-                                for link in soup.find_all('a', href=True):
-                                    href = link['href']
-                                    if href.startswith('http'):
-                                        domain = href.replace('https://', '').replace('http://', '').replace('www.', '').split('?')[0].split('/')[0]
-                                        if not any(skip in domain.lower() for skip in skip_domains) and '.' in domain:
-                                            all_company_urls.add(f"https://{domain}")
-                                            found_in_iteration += 1
-                                
-                                if found_in_iteration > 0:
-                                    search_status.success(f"FOUND: {found_in_iteration} companies from {engine_name} (Total: {len(all_company_urls)})")
-                                else:
-                                    st.warning(f"No results parsed from {engine_name} - check if page structure changed")
-                                    search_status.warning(f"NO RESULTS from {engine_name}")
-                                
-                                # Break if we found enough results
-                                if len(all_company_urls) >= 10:
-                                    progress_text.success(f"✅ Found {len(all_company_urls)} companies! Stopping search.")
-                                    break
-                            else:
-                                search_status.warning(f"⚠️ No response from {engine_name}")
-                        
-                        # Break outer loop if we have enough
-                        if len(all_company_urls) >= 10:
-                            break
+                                st.warning(f"No results parsed from {engine_name} - check if page structure changed")
+                                search_status.warning(f"NO RESULTS from {engine_name}")
+                    
+                    # Search engines, dedupe and email extraction run as one streaming pipeline
+                    progress_text.info("Searching engines in parallel...")
+                    sponsor_limit = DISCOVERY_PROFILES['sponsor']['limit']
+                    company_results = []
+                    for company in discover_sponsors(
+                            project, industry or None, location, fetcher=fetcher,
+                            enrich=searcher.crawl_site if include_contact else None,
+                            cache=db, cache_ttl=SERP_CACHE_TTL_HOURS * 3600, refresh=refresh_search,
+                            on_serp=report_serp):
+                        company_results.append(company)
+                        progress_bar.progress(min(len(company_results) / sponsor_limit, 1.0))
+                        progress_text.text(f"Processed {len(company_results)}/{sponsor_limit}: {company['url']}")
                     
                     progress_text.empty()
                     search_status.empty()
+                    progress_bar.empty()
                     
-                    # If still no results, show clear message
-                    if not all_company_urls:
+                    # Rank by page content against the project (TF-IDF), highest first
+                    company_results = content_rank(company_results, f"{project} {industry or ''}", db)
+                    
+                    if not company_results:
                         st.error("Unable to find companies through search engines.")
                         st.info("""
 **Try these options:**
@@ -899,76 +1057,8 @@ elif page == "Real Sponsors":
 3. Use the Email Search tab to search specific company websites directly
 4. Contact companies you already know about
                         """)
-                    
-                    # Remove duplicates, clean URLs, and limit
-                    # Deduplicate by domain to avoid showing same site multiple times
-                    seen_domains = set()
-                    unique_company_urls = []
-                    
-                    for url in all_company_urls:
-                        # Extract domain for deduplication
-                        domain = url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-                        
-                        if domain not in seen_domains:
-                            seen_domains.add(domain)
-                            unique_company_urls.append(url)
-                    
-                    company_urls = unique_company_urls[:8]
-                    
-                    if not company_urls:
-                        st.error("No company websites found. Try:")
-                        st.markdown("""
-                        - Be more specific with your project description
-                        - Try different industry keywords
-                        - Use the Email Search tab to search specific company websites manually
-                        """)
                     else:
-                        st.success(f"Found {len(company_urls)} potential sponsor websites")
-                        
-                        # Store results in structured format
-                        company_results = []
-                        
-                        # Process each company URL with progress
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
-                        
-                        for i, url in enumerate(company_urls, 1):
-                            progress_bar.progress(i / len(company_urls))
-                            status_text.text(f"Processing {i}/{len(company_urls)}: {url}")
-                            
-                            company_data = {
-                                'url': url,
-                                'name': url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0],
-                                'emails': [],
-                                'relevance_score': 0
-                            }
-                            
-                            # Calculate relevance score based on URL content
-                            url_lower = url.lower()
-                            if industry:
-                                industry_words = industry.lower().split()
-                                company_data['relevance_score'] += sum(1 for word in industry_words if word in url_lower) * 2
-                            
-                            project_words = project.lower().split()[:3]
-                            company_data['relevance_score'] += sum(1 for word in project_words if word in url_lower)
-                            
-                            if include_contact:
-                                try:
-                                    emails = searcher.search_website_for_emails(url)
-                                    if emails:
-                                        company_data['emails'] = list(emails)
-                                        # Boost score for companies with contact info
-                                        company_data['relevance_score'] += 5
-                                except:
-                                    pass
-                            
-                            company_results.append(company_data)
-                        
-                        progress_bar.empty()
-                        status_text.empty()
-                        
-                        # Sort by relevance score (highest first)
-                        company_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+                        st.success(f"Found {len(company_results)} potential sponsor websites")
                         
                         # Store results in session state so buttons work
                         st.session_state.last_sponsor_search = company_results
@@ -976,7 +1066,8 @@ elif page == "Real Sponsors":
                         # Display results in compact format
                         st.markdown("---")
                         st.markdown("### Search Results Summary")
-                        st.markdown(f"**Project:** {project} | **Location:** {location} | **Found:** {len(company_urls)} companies")
+                        st.markdown(f"**Project:** {project} | **Location:** {location} | **Found:** {len(company_results)} companies")
+                        show_fetch_usage(fetcher)
                         
                         # Display results in a table
                         st.markdown("### Company Results")
@@ -1015,32 +1106,9 @@ elif page == "Real Sponsors":
                             
                             with col4:
                                 if st.button("+", key=f"add_sponsor_{i}", help="Add to database"):
-                                    # Save to database
-                                    company_id = db.add_company(
-                                        name=company['name'],
-                                        url=company['url'],
-                                        company_type='sponsor',
-                                        industry=industry if industry else None,
-                                        project_part=project,
-                                        relevance_score=company.get('relevance_score', 0)
-                                    )
-                                    
-                                    # Add contacts
-                                    if company['emails']:
-                                        for email in company['emails']:
-                                            db.add_contact(company_id, email)
-                                    
-                                    # Also add to session state for compatibility
-                                    contact_entry = {
-                                        'name': company['name'],
-                                        'url': company['url'],
-                                        'emails': company['emails'],
-                                        'type': 'sponsor',
-                                        'project': project
-                                    }
-                                    
-                                    if not any(c['url'] == company['url'] for c in st.session_state.contact_list):
-                                        st.session_state.contact_list.append(contact_entry)
+                                    # Save to database and the persisted contact list
+                                    add_to_contact_list(company, 'sponsor', project,
+                                                        industry=industry if industry else None)
                                     
                                     st.success(f"Added {company['name']} to database!")
                                     time.sleep(0.5)
@@ -1088,6 +1156,8 @@ elif page == "Real Sponsors":
                 except Exception as e:
                     st.error(f"Search failed: {str(e)}")
                     st.info("Try using the Email Search tab to search specific company websites directly.")
+                finally:
+                    fetcher.close()
     
     # Display previous sponsor search results if available
     if 'last_sponsor_search' in st.session_state and st.session_state.last_sponsor_search:
@@ -1128,16 +1198,7 @@ elif page == "Real Sponsors":
             
             with col4:
                 if st.button("+", key=f"add_prev_sponsor_{i}", help="Add to contact list"):
-                    contact_entry = {
-                        'name': company['name'],
-                        'url': company['url'],
-                        'emails': company['emails'],
-                        'type': 'sponsor',
-                        'project': company.get('project', 'N/A')
-                    }
-                    
-                    if not any(c['url'] == company['url'] for c in st.session_state.contact_list):
-                        st.session_state.contact_list.append(contact_entry)
+                    if add_to_contact_list(company, 'sponsor', company.get('project')):
                         st.success(f"Added {company['name']} to Email Center!")
                         time.sleep(1)  # Show message briefly
 
@@ -1159,6 +1220,8 @@ elif page == "Vendor Search":
         price_range = st.selectbox("Price Range", ["Any", "Under $100", "$100-$500", "$500-$1000", "Over $1000"])
     
     find_contact = st.checkbox("Extract supplier contact emails", value=True)
+    refresh_search = st.checkbox("Bypass search cache", value=False, key="vendor_refresh_search",
+                                 help="Fetch fresh search-engine results instead of reusing cached ones")
     
     if st.button("Search Vendors", type="primary", use_container_width=True):
         if not part_name:
@@ -1166,13 +1229,9 @@ elif page == "Vendor Search":
         else:
             st.warning("⚠️ Search in progress - DO NOT switch pages or the search will be cancelled!")
             with st.spinner(f"Searching for real '{part_name}' vendors..."):
+                fetcher = new_fetcher(f"vendor: {part_name}")
                 try:
-                    # Build search queries - use only the 2 most effective
                     location = country
-                    base_queries = [
-                        f"{part_name} supplier {location}",
-                        f"{part_name} distributor {location}"
-                    ]
                     
                     st.info(f"Searching for: {part_name} vendors in {location}")
                     
@@ -1182,304 +1241,82 @@ elif page == "Vendor Search":
                     else:
                         st.info("🆓 Using DuckDuckGo only (free) - add ScraperAPI key for Google results too")
                     
-                    # Initialize searcher - don't use ScraperAPI for individual sites
-                    searcher = EmailSearcher(max_pages=2, delay=0.3, scraper_api_key=None, use_scraper_for_sites=False)
-                    
-                    # Track URLs with their source (DuckDuckGo or ScraperAPI)
-                    all_vendor_urls = {}  # {url: source_engine}
+                    # Well-known distributors for the part's categories come straight from the
+                    # directory; only ones never crawled yet are crawled during the search
+                    part_matches = get_matcher().match(part_name)
+                    part_industry = part_matches[0]['industry'] if part_matches else None
+                    directory_results = directory_vendors(db, part_matches)
+                    directory_ready = [vendor for vendor in directory_results if vendor['crawled']]
+                    distributor_seeds = [vendor['url'] for vendor in directory_results if not vendor['crawled']]
+                    if part_matches:
+                        st.caption("Categories: " + ", ".join(
+                            f"{match['category']} ({match['score']})" for match in part_matches)
+                            + f" | {len(directory_ready)} distributors from the directory")
                     
-                    # Use DuckDuckGo + ScraperAPI Google concurrently for best results
-                    search_engines = [
-                        ("DuckDuckGo", f"https://lite.duckduckgo.com/lite/?q={{}}", False),  # Direct, free
-                        ("Google", f"https://www.google.com/search?q={{}}&num=20", True)     # Via ScraperAPI
-                    ]
+                    # Initialize searcher - don't use ScraperAPI for individual sites
+                    searcher = EmailSearcher(max_pages=2, delay=0.3, scraper_api_key=None, use_scraper_for_sites=False,
+                                             fetcher=fetcher, archive=page_archive)
                     
                     progress_text = st.empty()
                     search_status = st.empty()
+                    progress_bar = st.progress(0)
+                    debug_panels = []
                     
-                    # Prepare all search requests
-                    all_results = []
-                    
-                    for engine_name, engine_url_template, use_scraper in search_engines:
-                        progress_text.info(f"🔍 Searching {engine_name}...")
-                        
-                        for query in base_queries:  # Use both queries
-                            search_url = engine_url_template.format(query.replace(' ', '+'))
-                            
-                            search_status.text(f"Query: {query}")
-                            
-                            # Execute based on engine type
-                            if use_scraper and SCRAPER_API_KEY:
-                                # Use ScraperAPI for Google
-                                import urllib.parse
-                                import requests
-                                
-                                encoded_url = urllib.parse.quote(search_url, safe='')
-                                scraper_url = f"http://api.scraperapi.com?api_key={SCRAPER_API_KEY}&url={encoded_url}"
-                                
-                                try:
-                                    search_status.text(f"🔧 {engine_name} via ScraperAPI...")
-                                    response = requests.get(scraper_url, timeout=30)
-                                    
-                                    if response.status_code == 200:
-                                        search_content = response.text
-                                        search_status.success(f"✅ {engine_name}: {len(search_content):,} bytes")
-                                    else:
-                                        search_status.warning(f"⚠️ {engine_name} failed: {response.status_code}")
-                                        search_content = None
-                                except Exception as e:
-                                    search_status.warning(f"⚠️ {engine_name} error: {str(e)[:50]}")
-                                    search_content = None
-                            elif not use_scraper:
-                                # Direct access (DuckDuckGo)
-                                try:
-                                    search_status.text(f"🆓 {engine_name} direct...")
-                                    response = requests.get(search_url, timeout=15)
-                                    if response.status_code == 200:
-                                        search_content = response.text
-                                        search_status.success(f"✅ {engine_name}: {len(search_content):,} bytes (FREE)")
-                                    else:
-                                        search_content = None
-                                except Exception:
-                                    search_content = None
+                    def report_serp(result):
+                        """Show each search-engine result page as it arrives."""
+                        engine_name = result['label']
+                        if result['error']:
+                            search_status.warning(f"⚠️ {engine_name} error: {result['error'][:50]}")
+                        elif result['cached']:
+                            search_status.success(f"⚡ {len(result['urls'])} cached companies from {engine_name}")
+                        else:
+                            # Store debug info for later display
+                            debug_panels.append({
+                                'engine': engine_name,
+                                'content': result['preview']
+                            })
+                            if result['urls']:
+                                search_status.success(f"✅ Found {len(result['urls'])} companies from {engine_name} "
+                                                      f"in {result['seconds']:.1f}s")
                             else:
-                                search_status.info(f"⏭️ Skipping {engine_name} (no API key)")
-                                search_content = None
-                            
-                            if search_content:
-                                from bs4 import BeautifulSoup
-                                soup = BeautifulSoup(search_content, 'html.parser')
-                                
-                                search_status.text(f"🔍 Parsing {engine_name} results...")
-                                
-                                # Store debug info for later display
-                                if 'debug_panels' not in locals():
-                                    debug_panels = []
-                                debug_panels.append({
-                                    'engine': engine_name,
-                                    'content': search_content[:1000]
-                                })
-                                
-                                skip_domains = ['duckduckgo', 'google', 'bing', 'yahoo', 'facebook', 'twitter', 
-                                               'linkedin', 'youtube', 'wikipedia', 'reddit', 'amazon', 'ebay', 'instagram']
-                                
-                                found_in_iteration = 0
-                                
-                                # Parse based on search engine type
-                                if engine_name == "DuckDuckGo":
-                                    # DuckDuckGo Lite results
-                                    for link in soup.find_all('a', class_='result-link'):
-                                        url = link.get('href', '')
-                                        if url.startswith('http'):
-                                            domain = url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].split('?')[0]
-                                            if not any(skip in domain.lower() for skip in skip_domains) and '.' in domain:
-                                                vendor_url = f"https://{domain}"
-                                                all_vendor_urls[vendor_url] = 'DuckDuckGo'
-                                                found_in_iteration += 1
-                                    
-                                    # Alternative: span.link-text parent links
-                                    if found_in_iteration == 0:
-                                        for span in soup.find_all('span', class_='link-text'):
-                                            parent_link = span.find_parent('a')
-                                            if parent_link:
-                                                url = parent_link.get('href', '')
-                                                if url.startswith('http'):
-                                                    domain = url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].split('?')[0]
-                                                    if not any(skip in domain.lower() for skip in skip_domains) and '.' in domain:
-                                                        vendor_url = f"https://{domain}"
-                                                        all_vendor_urls[vendor_url] = 'DuckDuckGo'
-                                                        found_in_iteration += 1
-                                
-                                elif engine_name == "Google":
-                                    # Google search results
-                                    for div in soup.find_all('div', class_=['g', 'yuRUbf']):
-                                        a_tag = div.find('a', href=True)
-                                        if a_tag:
-                                            url = a_tag['href']
-                                            if url.startswith('http'):
-                                                domain = url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0].split('?')[0]
-                                                if not any(skip in domain.lower() for skip in skip_domains) and '.' in domain:
-                                                    vendor_url = f"https://{domain}"
-                                                    all_vendor_urls[vendor_url] = 'ScraperAPI'
-                                                    found_in_iteration += 1
-                                
-                                # Aggressive fallback
-                                for link in soup.find_all('a', href=True):
-                                    href = link['href']
-                                    if href.startswith('http'):
-                                        domain = href.replace('https://', '').replace('http://', '').replace('www.', '').split('?')[0].split('/')[0]
-                                        if not any(skip in domain.lower() for skip in skip_domains) and '.' in domain:
-                                            vendor_url = f"https://{domain}"
-                                            if vendor_url not in all_vendor_urls:  # Don't overwrite existing source
-                                                all_vendor_urls[vendor_url] = engine_name
-                                            found_in_iteration += 1
-                                
-                                if found_in_iteration > 0:
-                                    search_status.success(f"✅ Found {found_in_iteration} companies from {engine_name}")
-                                else:
-                                    st.warning(f"⚠️ No results parsed from {engine_name} - check if page structure changed")
-                                
-                                if len(all_vendor_urls) >= 15:
-                                    progress_text.success(f"🎉 Collected {len(all_vendor_urls)} vendors!")
-                                    break
-                        
-                        if len(all_vendor_urls) >= 15:
-                            break
+                                st.warning(f"⚠️ No results parsed from {engine_name} - check if page structure changed")
+                    
+                    # DuckDuckGo (direct, free) + Google run in parallel; dedupe and email
+                    # extraction stream behind them
+                    progress_text.info("🔍 Searching engines in parallel...")
+                    vendor_limit = DISCOVERY_PROFILES['vendor']['limit']
+                    vendor_results = []
+                    for vendor in discover_vendors(
+                            part_name, location, seeds=distributor_seeds,
+                            exclude_domains=[vendor['domain'] for vendor in directory_ready], fetcher=fetcher,
+                            enrich=searcher.crawl_site if find_contact else None,
+                            cache=db, cache_ttl=SERP_CACHE_TTL_HOURS * 3600, refresh=refresh_search,
+                            on_serp=report_serp):
+                        vendor_results.append(vendor)
+                        progress_bar.progress(min(len(vendor_results) / vendor_limit, 1.0))
+                        progress_text.text(f"Processed {len(vendor_results)}/{vendor_limit}: {vendor['url']}")
                     
                     progress_text.empty()
                     search_status.empty()
+                    progress_bar.empty()
+                    if find_contact:
+                        record_crawls(db, vendor_results, directory_results)
                     
-                    # If still no results after trying all engines
-                    if not all_vendor_urls:
+                    if not vendor_results and not directory_ready:
                         st.error("Unable to find vendors through search engines.")
                         st.info("""
 **Try these options:**
 1. Add your ScraperAPI key (get free at scraperapi.com)
 2. Be more specific with part name and model number
 3. Use Email Search tab to search specific vendor websites
-4. Check the industry-specific distributors below
-                        """)
-                    
-                    # Add well-known distributors based on category
-                    common_distributors = {
-                        "electronics": [
-                            "https://www.digikey.com", "https://www.mouser.com", "https://www.newark.com",
-                            "https://www.digikey.ca", "https://www.adafruit.com", "https://www.sparkfun.com"
-                        ],
-                        "industrial": [
-                            "https://www.mcmaster.com", "https://www.grainger.com", "https://www.fastenal.com",
-                            "https://www.mscdirect.com", "https://www.zoro.com"
-                        ],
-                        "aerospace": [
-                            "https://www.aviall.com", "https://www.wencor.com", "https://www.flyingcolours.com"
-                        ],
-                        "robotics": [
-                            "https://www.robotshop.com", "https://www.pololu.com", "https://www.servocity.com",
-                            "https://www.trossenrobotics.com"
-                        ],
-                        "3d printing": [
-                            "https://www.matterhackers.com", "https://www.prusa3d.com", "https://www.ultimaker.com",
-                            "https://www.filaments.ca"
-                        ],
-                        "rocketry": [
-                            "https://www.apogeerockets.com", "https://www.estesrockets.com", "https://www.madcowrocketry.com",
-                            "https://www.wildmanrocketry.com"
-                        ],
-                        "composites": [
-                            "https://www.cstsales.com", "https://www.fibreglast.com", "https://www.carbonfibergear.com"
-                        ]
-                    }
-                    
-                    # Smart category matching
-                    part_lower = part_name.lower()
-                    matched_categories = []
-                    
-                    # Electronics keywords
-                    if any(word in part_lower for word in ["arduino", "sensor", "raspberry", "chip", "electronic", "circuit", 
-                                                            "pcb", "microcontroller", "transistor", "resistor", "capacitor"]):
-                        matched_categories.append("electronics")
-                    
-                    # Industrial/hardware keywords
-                    if any(word in part_lower for word in ["bolt", "screw", "nut", "tool", "industrial", "fastener",
-                                                            "bearing", "spring", "gear", "shaft"]):
-                        matched_categories.append("industrial")
-                    
-                    # Aerospace keywords
-                    if any(word in part_lower for word in ["aviation", "aerospace", "flight", "aircraft", "avionics"]):
-                        matched_categories.append("aerospace")
-                    
-                    # Robotics keywords
-                    if any(word in part_lower for word in ["robot", "servo", "motor", "stepper", "actuator", "gripper"]):
-                        matched_categories.append("robotics")
-                    
-                    # 3D printing keywords
-                    if any(word in part_lower for word in ["3d", "filament", "printer", "pla", "abs", "petg", "nozzle", "hotend"]):
-                        matched_categories.append("3d printing")
-                    
-                    # Rocketry keywords
-                    if any(word in part_lower for word in ["rocket", "motor", "propulsion", "recovery", "parachute", "ejection"]):
-                        matched_categories.append("rocketry")
-                    
-                    # Composites keywords
-                    if any(word in part_lower for word in ["carbon fiber", "fiberglass", "composite", "epoxy", "resin", "laminate"]):
-                        matched_categories.append("composites")
-                    
-                    # Add distributors from matched categories
-                    for category in matched_categories:
-                        if category in common_distributors:
-                            for dist_url in common_distributors[category][:3]:  # Top 3 per category
-                                if dist_url not in all_vendor_urls:
-                                    all_vendor_urls[dist_url] = 'Common'
-                    
-                    # Remove duplicates by domain and limit
-                    seen_domains = set()
-                    unique_vendor_data = []  # [(url, source), ...]
-                    
-                    for url, source in all_vendor_urls.items():
-                        # Extract domain for deduplication
-                        domain = url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0]
-                        
-                        if domain not in seen_domains:
-                            seen_domains.add(domain)
-                            unique_vendor_data.append((url, source))
-                    
-                    vendor_data_list = unique_vendor_data[:10]
-                    
-                    if not vendor_data_list:
-                        st.error("No vendor websites found. Try:")
-                        st.markdown("""
-                        - Be more specific with part name/model number
-                        - Include manufacturer name if known
-                        - Use Email Search tab to search specific vendor websites
+4. Include manufacturer name if known
                         """)
                     else:
-                        st.success(f"Found {len(vendor_data_list)} potential vendor websites")
-                        
-                        # Store results in structured format
-                        vendor_results = []
-                        
-                        # Process vendors with progress
-                        progress_bar = st.progress(0)
-                        status_text = st.empty()
+                        st.success(f"Found {len(vendor_results) + len(directory_ready)} potential vendor websites")
                         
-                        for i, (url, source) in enumerate(vendor_data_list, 1):
-                            progress_bar.progress(i / len(vendor_data_list))
-                            status_text.text(f"Processing {i}/{len(vendor_data_list)}: {url}")
-                            
-                            vendor_data = {
-                                'url': url,
-                                'name': url.replace('https://', '').replace('http://', '').replace('www.', '').split('/')[0],
-                                'emails': [],
-                                'relevance_score': 0,
-                                'source': source  # Track where this vendor was found
-                            }
-                            
-                            # Calculate relevance score
-                            url_lower = url.lower()
-                            part_words = part_name.lower().split()[:3]
-                            vendor_data['relevance_score'] += sum(1 for word in part_words if word in url_lower)
-                            
-                            # Boost common distributors
-                            if any(dist in url_lower for dist in ['supply', 'distributor', 'direct', 'shop']):
-                                vendor_data['relevance_score'] += 2
-                            
-                            if find_contact:
-                                try:
-                                    emails = searcher.search_website_for_emails(url)
-                                    if emails:
-                                        vendor_data['emails'] = list(emails)
-                                        # Boost score for vendors with contact info
-                                        vendor_data['relevance_score'] += 5
-                                except:
-                                    pass
-                            
-                            vendor_results.append(vendor_data)
-                        
-                        progress_bar.empty()
-                        status_text.empty()
-                        
-                        # Sort by relevance score (highest first)
-                        vendor_results.sort(key=lambda x: x['relevance_score'], reverse=True)
+                        # Rank new candidates by page content against the part name (TF-IDF),
+                        # then merge in the directory distributors, highest first
+                        vendor_results = rank(directory_ready + content_rank(vendor_results, part_name, db))
                         
                         # Store results in session state so they persist across page switches
                         st.session_state.vendor_search_results = vendor_results
@@ -1490,13 +1327,14 @@ elif page == "Vendor Search":
                         st.markdown("---")
                         st.markdown("### Vendor Search Summary")
                         st.markdown(f"**Part:** {part_name} | **Region:** {location} | **Found:** {len(vendor_results)} vendors")
+                        show_fetch_usage(fetcher)
                         
                         # Create side-by-side layout for debug and results
                         col_debug, col_results = st.columns([1, 2])
                         
                         with col_debug:
                             st.markdown("#### Debug Info")
-                            if 'debug_panels' in locals():
+                            if debug_panels:
                                 for panel in debug_panels:
                                     with st.expander(f"{panel['engine']} HTML"):
                                         st.code(panel['content'], language="html")
@@ -1548,36 +1386,15 @@ elif page == "Vendor Search":
                                         st.markdown("🦆 `DuckDuckGo`")
                                     elif source == 'Common':
                                         st.markdown("📋 `Common`")
+                                    elif source == 'Directory':
+                                        st.markdown("📚 `Directory`")
                                     else:
                                         st.text(source)
                                 
                                 with col5:
                                     if st.button("+", key=f"add_vendor_{i}", help="Add to database"):
-                                        # Save to database
-                                        company_id = db.add_company(
-                                            name=vendor['name'],
-                                            url=vendor['url'],
-                                            company_type='vendor',
-                                            project_part=part_name,
-                                            relevance_score=vendor.get('relevance_score', 0)
-                                        )
-                                        
-                                        # Add contacts
-                                        if vendor['emails']:
-                                            for email in vendor['emails']:
-                                                db.add_contact(company_id, email)
-                                        
-                                        # Also add to session state for compatibility
-                                        contact_entry = {
-                                            'name': vendor['name'],
-                                            'url': vendor['url'],
-                                            'emails': vendor['emails'],
-                                            'type': 'vendor',
-                                            'part': part_name
-                                        }
-                                        
-                                        if not any(c['url'] == vendor['url'] for c in st.session_state.contact_list):
-                                            st.session_state.contact_list.append(contact_entry)
+                                        # Save to database and the persisted contact list
+                                        add_to_contact_list(vendor, 'vendor', part_name, part_industry)
                                         
                                         st.success(f"Added {vendor['name']} to database!")
                                         time.sleep(0.5)
@@ -1629,6 +1446,8 @@ elif page == "Vendor Search":
                 except Exception as e:
                     st.error(f"Search failed: {str(e)}")
                     st.info("Try using Email Search tab to search specific vendor websites directly.")
+                finally:
+                    fetcher.close()
     
     # Display previous vendor search results if available
     if 'last_vendor_search' in st.session_state and st.session_state.last_vendor_search:
@@ -1669,26 +1488,23 @@ elif page == "Vendor Search":
             
             with col4:
                 if st.button("+", key=f"add_prev_vendor_{i}", help="Add to contact list"):
-                    contact_entry = {
-                        'name': vendor['name'],
-                        'url': vendor['url'],
-                        'emails': vendor['emails'],
-                        'type': 'vendor',
-                        'part': vendor.get('part', 'N/A')
-                    }
-                    
-                    if not any(c['url'] == vendor['url'] for c in st.session_state.contact_list):
-                        st.session_state.contact_list.append(contact_entry)
+                    if add_to_contact_list(vendor, 'vendor', vendor.get('part'),
+                                           get_matcher().industry(vendor.get('part') or '')):
                         st.success(f"Added {vendor['name']} to Email Center!")
                         time.sleep(1)  # Show message briefly
 
 elif page == "Email Center":
     st.markdown('<p class="main-header">Email Center</p>', unsafe_allow_html=True)
     
-    if not st.session_state.contact_list:
+    campaign_id = st.session_state.contact_campaign_id
+    contact_counts = db.count_campaign_members(campaign_id)
+    total_contacts = sum(contact_counts.values())
+
+    if not total_contacts:
         st.info("No contacts in your list yet. Add companies from Real Sponsors or Vendor Search.")
     else:
-        st.success(f"You have {len(st.session_state.contact_list)} contacts in your list")
+        st.success(f"You have {total_contacts} contacts in your list "
+                   f"({contact_counts.get('sponsor', 0)} sponsors, {contact_counts.get('vendor', 0)} vendors)")
         
         # Display contact list
         st.markdown("### Your Contact List")
@@ -1699,20 +1515,218 @@ elif page == "Email Center":
             filter_type = st.selectbox("Filter by type", ["All", "Sponsors", "Vendors"])
         with col2:
             if st.button("Clear Contact List", use_container_width=True):
-                st.session_state.contact_list.clear()
+                db.clear_campaign(campaign_id)
+                st.session_state.pop('contact_page', None)
                 st.rerun()
         
-        # Filter contacts
-        filtered_contacts = st.session_state.contact_list
-        if filter_type == "Sponsors":
-            filtered_contacts = [c for c in st.session_state.contact_list if c['type'] == 'sponsor']
-        elif filter_type == "Vendors":
-            filtered_contacts = [c for c in st.session_state.contact_list if c['type'] == 'vendor']
+        # Keyset paging over the campaign; only the page on screen is cached, and it is
+        # refetched when the filter, page or membership changes (including from another session)
+        type_filter = {"Sponsors": 'sponsor', "Vendors": 'vendor'}.get(filter_type)
+        if 'contact_page_cursors' not in st.session_state or st.session_state.contact_page_filter != type_filter:
+            st.session_state.contact_page_filter = type_filter
+            st.session_state.contact_page_cursors = [None]
+        contact_cursors = st.session_state.contact_page_cursors
+        filtered_total = contact_counts.get(type_filter, 0) if type_filter else total_contacts
+        contact_page_key = (type_filter, contact_cursors[-1], db.get_campaign_version(campaign_id))
+        contact_page = st.session_state.get('contact_page')
+        if contact_page is None or contact_page['key'] != contact_page_key:
+            members_page = db.get_campaign_members_page(campaign_id, type_filter, CONTACT_PAGE_SIZE,
+                                                        after=contact_cursors[-1])
+            contact_page = st.session_state.contact_page = {
+                'key': contact_page_key,
+                'contacts': {row['id']: member_entry(row) for row in members_page['rows']},
+                'next_cursor': members_page['next_cursor'],
+                'has_more': members_page['has_more'],
+            }
+        if not contact_page['contacts'] and len(contact_cursors) > 1:
+            # The last contacts on this page were removed
+            contact_cursors.pop()
+            st.rerun()
+        page_contacts = list(contact_page['contacts'].values())
+
+        # Batch AI drafting - one draft per selected contact, saved to the emails table as each completes
+        with st.expander("Batch AI Drafting"):
+            if llm_gateway is None:
+                st.info("Add an OpenAI API key to draft emails for many contacts at once.")
+            else:
+                batch_candidates = [c for c in page_contacts if c['emails']]
+                batch_labels = {f"{c['name']} ({c['type'].title()})": c for c in batch_candidates}
+                batch_selection = st.multiselect("Contacts to draft for", list(batch_labels),
+                                                 default=list(batch_labels),
+                                                 help="Contacts on this page; contacts without emails are not listed")
+                col1, col2 = st.columns(2)
+                with col1:
+                    batch_sender = st.text_input("Your Name", placeholder="Your name/organization", key="batch_sender")
+                    batch_tone = st.selectbox("Email Tone", ["Professional", "Friendly", "Formal", "Casual", "Persuasive"],
+                                              key="batch_tone")
+                with col2:
+                    batch_amount = st.text_input("Amount/Details", placeholder="$5,000 or specific requirements",
+                                                 key="batch_amount")
+                    batch_length = st.selectbox("Email Length", ["Short", "Medium", "Long"], index=1, key="batch_length")
+                batch_notes = st.text_area("Additional Instructions for AI", key="batch_notes")
+                batch_cache = st.checkbox("Reuse cached drafts for unchanged inputs", value=True, key="batch_cache",
+                                          help="Uncheck to request fresh drafts from OpenAI")
+
+                if st.button(f"Draft {len(batch_selection)} Emails with AI", type="primary",
+                             disabled=not batch_selection, use_container_width=True):
+                    batch_progress = st.progress(0)
+                    batch_status = st.empty()
+                    batch_started = time.perf_counter()
+                    drafted_count = 0
+                    batch_errors = []
+                    batch_contacts = [batch_labels[label] for label in batch_selection]
+                    for done, result in enumerate(draft_batch(
+                            llm_gateway, batch_contacts,
+                            {'sender': batch_sender, 'amount': batch_amount, 'tone': batch_tone,
+                             'length': batch_length, 'notes': batch_notes},
+                            OPENAI_MODEL, max_workers=OPENAI_MAX_WORKERS,
+                            requests_per_minute=OPENAI_REQUESTS_PER_MINUTE, cache=batch_cache), 1):
+                        batch_contact = result['contact']
+                        if result['error']:
+                            batch_errors.append(f"{batch_contact['name']}: {result['error']}")
+                        else:
+                            save_draft(db, batch_contact, result, template_used='ai:batch')
+                            st.session_state.drafted_emails.append({
+                                'to': batch_contact['emails'][0],
+                                'subject': result['subject'],
+                                'body': result['body'],
+                                'company': batch_contact['name'],
+                                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                            })
+                            drafted_count += 1
+                        batch_progress.progress(done / len(batch_contacts))
+                        batch_status.text(f"Drafted {drafted_count}/{len(batch_contacts)} "
+                                          f"({time.perf_counter() - batch_started:.0f}s): {batch_contact['name']}")
+                    batch_status.empty()
+                    st.success(f"Drafted {drafted_count} emails in {time.perf_counter() - batch_started:.1f}s "
+                               f"and saved them to the database")
+                    for error in batch_errors:
+                        st.error(error)
+                        if "quota" in error.lower() or "billing" in error.lower():
+                            st.warning("Tip: Add credits to your OpenAI account at https://platform.openai.com/account/billing")
+                            break
+
+        # Mail merge - one saved template rendered for every listed contact, saved in one transaction
+        with st.expander("Mail Merge"):
+            merge_templates = {t['name']: t for t in db.get_all_templates()}
+            if not merge_templates:
+                st.info("Save a template on the Email Templates page first.")
+            else:
+                merge_counts = db.count_campaign_members(campaign_id, with_emails=True)
+                merge_total = merge_counts.get(type_filter, 0) if type_filter else sum(merge_counts.values())
+                col1, col2 = st.columns(2)
+                with col1:
+                    merge_template_name = st.selectbox("Template", list(merge_templates), key="merge_template")
+                    merge_sender = st.text_input("Your Name", placeholder="Your name/organization", key="merge_sender")
+                with col2:
+                    merge_amount = st.text_input("Amount/Details", placeholder="$5,000 or specific requirements",
+                                                 key="merge_amount")
+                    merge_notes = st.text_input("Additional Notes (optional)", key="merge_notes")
+                st.caption(f"Drafts one email per listed contact with an email address ({merge_total:,}), "
+                           f"addressed to each company's primary contact.")
+                if st.button(f"Render {merge_total:,} Emails", type="primary",
+                             disabled=not merge_total, use_container_width=True):
+                    # Every filtered member is read only when rendering, not on each rerun
+                    merge_candidates = [member_entry(row) for row in db.iter_campaign_members(campaign_id, type_filter)
+                                        if row['emails']]
+                    merge_stats = render_bulk(db, merge_templates[merge_template_name], merge_candidates,
+                                              merge_sender, merge_amount, merge_notes)
+                    st.success(f"Saved {merge_stats['rendered']:,} drafted emails in {merge_stats['seconds']:.2f}s"
+                               + (f" ({merge_stats['skipped']} without a stored contact skipped)"
+                                  if merge_stats['skipped'] else ""))
+                    if merge_stats['unknown_placeholders']:
+                        st.warning(f"Unknown placeholders left as-is: {', '.join(merge_stats['unknown_placeholders'])}")
+                    if merge_stats['preview']:
+                        st.markdown(f"**Preview:** {merge_stats['preview']['subject']}")
+                        st.text_area("Body:", value=merge_stats['preview']['body'], height=250, disabled=True,
+                                     key="merge_preview")
+
+        # Send queue - drafted emails are queued here and sent by the background SMTP sender
+        with st.expander("Send Queue"):
+            send_stats = db.get_send_stats()
+            st.caption(f"{send_stats['drafted']:,} drafted · {send_stats['queued']:,} queued "
+                       f"({send_stats['retrying']} retrying) · {send_stats['sent']:,} sent · "
+                       f"{send_stats['failed']} failed · {send_stats['bounced']} bounced")
+            if send_queue is None:
+                st.info("Set SMTP_HOST (and SMTP_USER / SMTP_PASSWORD / SMTP_FROM) to send emails.")
+            else:
+                st.caption(f"Sending via {SMTP_HOST} as {SMTP_FROM}: {SEND_RATE_PER_MINUTE:g}/min, "
+                           f"{send_stats['sent_today']} / {SEND_DAILY_CAP or '∞'} today"
+                           + (f" (last error: {send_queue.last_error})" if send_queue.last_error else ""))
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    if st.button(f"Queue {send_stats['drafted']:,} Drafts", use_container_width=True,
+                                 disabled=not send_stats['drafted']):
+                        db.queue_emails()
+                        st.rerun()
+                with col2:
+                    if st.button("Send Due Now", use_container_width=True, disabled=not send_stats['queued']):
+                        with st.spinner("Sending queued emails..."):
+                            run_stats = send_queue.run_once()
+                        st.success(f"Sent {run_stats['sent']} in {run_stats['seconds']:.1f}s"
+                                   + (f", {run_stats['retry']} to retry" if run_stats['retry'] else "")
+                                   + (f", {run_stats['failed'] + run_stats['bounced']} failed"
+                                      if run_stats['failed'] + run_stats['bounced'] else "")
+                                   + (" (daily cap reached)" if run_stats['capped'] else ""))
+                with col3:
+                    if st.button("Return Queued to Drafts", use_container_width=True, disabled=not send_stats['queued']):
+                        db.unqueue_emails()
+                        st.rerun()
+            if send_stats['failed'] or send_stats['bounced']:
+                for failed in db.get_failed_emails():
+                    st.caption(f"{failed['status'].title()}: {failed['company_name']} <{failed['recipient'] or '?'}> "
+                               f"after {failed['attempts']} attempt(s) - {failed['last_error']}")
+                if send_queue is not None and st.button("Retry Failed", disabled=not send_stats['failed']):
+                    db.queue_emails(statuses=('failed',))
+                    st.rerun()
+
+        # Reply tracking - replies and bounces are matched from the synced mailbox
+        with st.expander("Replies & Bounces"):
+            if inbox_watcher is None:
+                st.info("Set INBOX_PATHS to the Maildir directories or mbox files your mail fetcher syncs "
+                        "to track replies and bounces.")
+            else:
+                schedule = (f"every {INBOX_INTERVAL_MINUTES:g} min" if inbox_watcher.running
+                            else "on demand")
+                st.caption(f"Scanning {', '.join(INBOX_PATHS)} {schedule}"
+                           + (f" (last error: {inbox_watcher.last_error})" if inbox_watcher.last_error else ""))
+                for source in db.get_inbox_stats():
+                    st.caption(f"{source['source']} ({source['kind']}): {source['messages']:,} messages read, "
+                               f"last scan {source['scanned_at']} UTC")
+                if st.button("Check Inbox Now"):
+                    with st.spinner("Reading new messages..."):
+                        try:
+                            inbox_stats = inbox_watcher.run_once()
+                        except (OSError, ValueError) as e:
+                            inbox_stats = None
+                            st.error(f"Inbox scan failed: {e}")
+                    if inbox_stats:
+                        st.success(f"Read {inbox_stats['messages']:,} new messages in {inbox_stats['seconds']:.1f}s: "
+                                   f"{inbox_stats['replied']} emails replied, {inbox_stats['bounced']} bounced "
+                                   f"({inbox_stats['auto_replies']} auto-replies and {inbox_stats['delayed']} "
+                                   f"delay notices ignored)")
+
+        # Only render one page of expanders per rerun
+        if len(contact_cursors) > 1 or contact_page['has_more']:
+            page_count = max(1, -(-filtered_total // CONTACT_PAGE_SIZE))
+            col_prev, col_page, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("Previous Page", disabled=len(contact_cursors) == 1, use_container_width=True,
+                             key="contact_prev_page"):
+                    contact_cursors.pop()
+                    st.rerun()
+            with col_page:
+                st.caption(f"Page {len(contact_cursors)} of {page_count}")
+            with col_next:
+                if st.button("Next Page", disabled=not contact_page['has_more'], use_container_width=True,
+                             key="contact_next_page"):
+                    contact_cursors.append(contact_page['next_cursor'])
+                    st.rerun()
         
         st.markdown("---")
         
         # Display contacts and create emails
-        for i, contact in enumerate(filtered_contacts):
+        for contact in page_contacts:
             with st.expander(f"{contact['name']} ({contact['type'].title()}) - {len(contact['emails'])} email(s)"):
                 col1, col2 = st.columns([2, 1])
                 
@@ -1729,13 +1743,13 @@ elif page == "Email Center":
                         st.markdown(f"**Part:** {contact.get('part', 'N/A')}")
                 
                 with col2:
-                    if st.button("Create Email", key=f"create_email_{i}"):
+                    if st.button("Create Email", key=f"create_email_{contact['id']}"):
                         st.session_state.selected_contact = contact
                         st.session_state.show_email_composer = True
                         st.rerun()
                     
-                    if st.button("Remove", key=f"remove_contact_{i}"):
-                        st.session_state.contact_list.remove(contact)
+                    if st.button("Remove", key=f"remove_contact_{contact['id']}"):
+                        remove_from_contact_list(contact)
                         st.rerun()
         
         # Email composer
@@ -1771,7 +1785,7 @@ elif page == "Email Center":
             if generation_mode == "AI Generate (ChatGPT)":
                 st.markdown("#### AI Email Generation")
                 
-                if not st.session_state.openai_enabled:
+                if llm_gateway is None:
                     st.error("OpenAI API key not configured. Please add it to use AI generation.")
                     generation_mode = "Use Template"  # Fall back to template
                 else:
@@ -1783,97 +1797,61 @@ elif page == "Email Center":
                     with col2:
                         use_template_as_reference = st.checkbox("Reference saved template in AI prompt", value=False)
                         reference_template = None
-                        if use_template_as_reference and st.session_state.saved_email_templates:
-                            template_names = [t['name'] for t in st.session_state.saved_email_templates]
-                            selected_template_name = st.selectbox("Select Template to Reference", template_names)
-                            reference_template = next((t for t in st.session_state.saved_email_templates if t['name'] == selected_template_name), None)
+                        if use_template_as_reference:
+                            saved_templates = {t['name']: t for t in db.get_all_templates()}
+                            selected_template_name = st.selectbox("Select Template to Reference", list(saved_templates))
+                            reference_template = saved_templates.get(selected_template_name)
                     
                     additional_notes = st.text_area("Additional Instructions for AI", 
                                                    placeholder="e.g., Emphasize our team's experience, mention previous successful projects, etc.")
+                    reuse_cached = st.checkbox("Reuse cached draft for unchanged inputs", value=True,
+                                               help="Uncheck to request a fresh draft from OpenAI")
                     
                     if st.button("Generate Email with AI", type="primary"):
-                        with st.spinner("AI is crafting your email..."):
-                            try:
-                                # Build AI prompt
-                                contact_type = "sponsor" if contact['type'] == 'sponsor' else "vendor"
-                                
-                                prompt = f"""Write a {tone.lower()} {length.lower()} business email to {contact['name']}.
-
-CONTEXT:
-- Purpose: {"Request sponsorship for" if contact['type'] == 'sponsor' else "Inquire about purchasing"} {project_name}
-- Recipient: {contact['name']} ({contact_type})
-- Sender: {your_name}
-- Amount/Budget: {amount}
-- Additional context: {additional_notes}
-
-REQUIREMENTS:
-- Tone: {tone}
-- Length: {length}
-- Include a clear call-to-action
-- Professional formatting with proper greeting and signature
-"""
-                                
-                                if reference_template:
-                                    prompt += f"""\n\nIMPORTANT - Use this template as your base structure and style guide:
-
-TEMPLATE TO FOLLOW:
-Subject: {reference_template['subject']}
-
-{reference_template['body']}
-
-Adapt this template's structure, style, and tone to fit the current context. Replace placeholders with actual details about {contact['name']} and {project_name}."""
-                                
-                                if contact['type'] == 'sponsor':
-                                    prompt += "\n\nKey points to emphasize:\n- Mutual benefits and ROI\n- Exposure opportunities\n- Brand alignment and values\n- Specific deliverables"
-                                else:
-                                    prompt += "\n\nKey points to emphasize:\n- Specific product requirements\n- Timeline and delivery needs\n- Budget constraints\n- Request for quotes and technical specs"
-                                
-                                prompt += "\n\nReturn ONLY the email body, no subject line, no metadata."
-                                
-                                response = st.session_state.openai_client.chat.completions.create(
-                                    model=OPENAI_MODEL,
-                                    messages=[
-                                        {"role": "system", "content": "You are a professional business email writer. Write clear, compelling emails that get responses."},
-                                        {"role": "user", "content": prompt}
-                                    ],
-                                    max_tokens=800,
-                                    temperature=0.7
-                                )
-                                
-                                ai_email_body = response.choices[0].message.content
-                                
-                                # Generate subject if not provided
-                                if not subject_custom:
-                                    subject_prompt = f"Write a compelling email subject line for: {contact_type} email to {contact['name']} about {project_name}. Return ONLY the subject line, no quotes or extra text."
-                                    subject_response = st.session_state.openai_client.chat.completions.create(
-                                        model=OPENAI_MODEL,
-                                        messages=[
-                                            {"role": "system", "content": "You write compelling email subject lines."},
-                                            {"role": "user", "content": subject_prompt}
-                                        ],
-                                        max_tokens=50,
-                                        temperature=0.7
-                                    )
-                                    ai_subject = subject_response.choices[0].message.content.strip().strip('"').strip("'")
-                                else:
-                                    ai_subject = subject_custom
-                                
-                                # Store AI-generated content
-                                st.session_state.ai_generated_subject = ai_subject
-                                st.session_state.ai_generated_body = ai_email_body
-                                st.success("AI email generated!")
-                                
-                            except Exception as e:
-                                st.error(f"AI generation failed: {str(e)}")
-                                if "quota" in str(e).lower() or "billing" in str(e).lower():
-                                    st.warning("Tip: Add credits to your OpenAI account at https://platform.openai.com/account/billing")
+                        # Subject and body stream in from one request; the editable fields below take over when done
+                        stream_status = st.empty()
+                        subject_slot = st.empty()
+                        body_slot = st.empty()
+                        stream_status.caption("AI is crafting your email...")
+                        try:
+                            started = time.perf_counter()
+                            first_token = None
+                            for draft in stream_draft(llm_gateway, contact, {
+                                    'project': project_name, 'sender': your_name, 'amount': amount,
+                                    'tone': tone, 'length': length, 'notes': additional_notes,
+                                    'reference_template': reference_template, 'subject': subject_custom,
+                                }, OPENAI_MODEL, cache=reuse_cached):
+                                if first_token is None:
+                                    first_token = time.perf_counter() - started
+                                    stream_status.caption(f"Writing... (first words after {first_token:.1f}s)")
+                                if draft['done']:
+                                    break
+                                # Plain elements, not widgets: no keys to register on every token
+                                subject_slot.markdown(f"**Subject:** {draft['subject']}")
+                                body_slot.code(draft['body'], language=None)
+                            
+                            # Store AI-generated content (and reset the editable fields to it)
+                            st.session_state.ai_generated_subject = st.session_state.ai_subject = draft['subject']
+                            st.session_state.ai_generated_body = st.session_state.ai_body = draft['body']
+                            stream_status.empty()
+                            subject_slot.empty()
+                            body_slot.empty()
+                            st.success(f"AI email generated in {time.perf_counter() - started:.1f}s!")
+                            
+                        except Exception as e:
+                            stream_status.empty()
+                            st.error(f"AI generation failed: {str(e)}")
+                            if "quota" in str(e).lower() or "billing" in str(e).lower():
+                                st.warning("Tip: Add credits to your OpenAI account at https://platform.openai.com/account/billing")
                     
                     # Display AI-generated email if available
                     if 'ai_generated_subject' in st.session_state and 'ai_generated_body' in st.session_state:
                         st.markdown("### AI Generated Email")
                         st.text_input("To:", value=recipient, disabled=True)
-                        final_subject = st.text_input("Subject:", value=st.session_state.ai_generated_subject, key="ai_subject")
-                        final_body = st.text_area("Body:", value=st.session_state.ai_generated_body, height=400, key="ai_body")
+                        st.session_state.setdefault('ai_subject', st.session_state.ai_generated_subject)
+                        st.session_state.setdefault('ai_body', st.session_state.ai_generated_body)
+                        final_subject = st.text_input("Subject:", key="ai_subject")
+                        final_body = st.text_area("Body:", height=400, key="ai_body")
                         
                         show_action_buttons = True
                     else:
@@ -1881,87 +1859,43 @@ Adapt this template's structure, style, and tone to fit the current context. Rep
             
             # Template Mode
             else:  # "Use Template"
-                # Email template selection
-                template_type = st.selectbox(
-                    "Select Template",
-                    ["Sponsorship Request", "Vendor Inquiry", "Partnership Proposal", 
-                     "Follow-up Email", "Thank You Email"] + 
-                    [f"Custom: {t['name']}" for t in st.session_state.saved_email_templates]
-                )
-                
-                additional_notes = st.text_area("Additional Notes (optional)", 
-                                              placeholder="Any custom details to include")
+                # Email template selection - saved templates, compiled once and rendered for this contact
+                saved_templates = {t['name']: t for t in db.get_all_templates()}
+                template_names = list(saved_templates)
+                if not template_names:
+                    st.info("No saved templates. Create one on the Email Templates page or save an AI draft as a template.")
+                    show_action_buttons = False
+                else:
+                    default_name = DEFAULT_TEMPLATES.get(contact['type'])
+                    template_type = st.selectbox(
+                        "Select Template", template_names,
+                        index=template_names.index(default_name) if default_name in template_names else 0
+                    )
                 
-                # Generate email based on template
-                if contact['type'] == 'sponsor':
-                    default_subject = f"Sponsorship Partnership Opportunity - {project_name}"
-                    default_body = f"""Dear {contact['name']} Team,
-
-I hope this email finds you well. My name is {your_name}, and I'm reaching out regarding an exciting sponsorship opportunity that aligns perfectly with {contact['name']}'s commitment to innovation and community.
-
-ABOUT OUR PROJECT:
-{project_name} is an innovative initiative that we believe would provide {contact['name']} with valuable exposure to our target audience.
-
-SPONSORSHIP DETAILS:
-• Investment Level: {amount}
-• Expected Reach: Significant market exposure
-• Deliverables: Brand visibility and engagement
-
-MUTUAL BENEFITS:
-• Brand exposure to target market
-• Association with innovation and excellence
-• Community engagement opportunities
-
-{additional_notes}
-
-We would love to discuss this opportunity further and provide additional details about how {contact['name']} can be involved.
-
-Thank you for considering our proposal. I look forward to hearing from you.
-
-Best regards,
-{your_name}"""
-                else:  # vendor
-                    default_subject = f"Product Inquiry - {project_name}"
-                    default_body = f"""Dear {contact['name']} Sales Team,
-
-I hope this message finds you well. I'm {your_name}, and I'm interested in learning more about your products/services for {project_name}.
-
-PROJECT REQUIREMENTS:
-• Product needed: {project_name}
-• Budget range: {amount}
-• Timeline: As soon as possible
-
-QUESTIONS:
-• Do you have {project_name} currently in stock?
-• What are your current pricing and lead times?
-• Do you offer bulk/volume discounts?
-• Can you provide technical specifications?
-
-{additional_notes}
-
-We're evaluating several suppliers and would appreciate receiving product information and pricing details.
-
-Thank you for your time. I look forward to your response.
-
-Best regards,
-{your_name}"""
+                    additional_notes = st.text_area("Additional Notes (optional)", 
+                                                  placeholder="Any custom details to include")
                 
-                subject_line = subject_custom if subject_custom else default_subject
-                email_body = default_body
+                    default_subject, email_body = render_template(saved_templates[template_type], contact, your_name,
+                                                                  amount, additional_notes, project_name, recipient)
+                    subject_line = subject_custom if subject_custom else default_subject
                 
-                # Display email preview
-                st.markdown("### Email Preview")
-                st.text_input("To:", value=recipient, disabled=True)
-                final_subject = st.text_input("Subject:", value=subject_line, key="template_subject")
-                final_body = st.text_area("Body:", value=email_body, height=400, key="template_body")
+                    # Display email preview
+                    st.markdown("### Email Preview")
+                    st.text_input("To:", value=recipient, disabled=True)
+                    final_subject = st.text_input("Subject:", value=subject_line, key="template_subject")
+                    final_body = st.text_area("Body:", value=email_body, height=400, key="template_body")
                 
-                show_action_buttons = True
+                    show_action_buttons = True
             
             # Action buttons (only show if email is ready)
             if show_action_buttons:
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     if st.button("Add to Drafted Emails", type="primary", use_container_width=True):
+                        # Saved to the emails table too, so it can be queued for sending
+                        save_draft(db, contact, {'subject': final_subject, 'body': final_body},
+                                   recipient if contact['emails'] else None,
+                                   template_used='ai' if generation_mode == "AI Generate (ChatGPT)" else template_type)
                         drafted_email = {
                             'to': recipient,
                             'subject': final_subject,
@@ -1998,15 +1932,15 @@ Best regards,
             if 'show_save_template' in st.session_state and st.session_state.show_save_template:
                 template_name = st.text_input("Template Name", placeholder="e.g., My Custom Sponsorship Email")
                 if st.button("Save Template"):
-                    new_template = {
-                        'name': template_name,
-                        'subject': final_subject,
-                        'body': final_body
-                    }
-                    st.session_state.saved_email_templates.append(new_template)
-                    st.session_state.show_save_template = False
-                    st.success("Template saved!")
-                    st.rerun()
+                    category = 'sponsorship' if contact['type'] == 'sponsor' else 'vendor'
+                    if not template_name:
+                        st.error("Please enter a template name")
+                    elif db.add_template(template_name, final_subject, final_body, category) is None:
+                        st.error(f"A template named '{template_name}' already exists")
+                    else:
+                        st.session_state.show_save_template = False
+                        st.success("Template saved!")
+                        st.rerun()
     
     # Show drafted emails section
     if st.session_state.drafted_emails:
@@ -2050,18 +1984,25 @@ Best regards,
 elif page == "Email Templates":
     st.markdown('<p class="main-header">Email Template Manager</p>', unsafe_allow_html=True)
     
-    # Show saved custom templates
+    # Saved templates live in the templates table (the built-in ones are added on startup)
     st.markdown("### Your Saved Templates")
+    saved_templates = db.get_all_templates()
     
-    if not st.session_state.saved_email_templates:
-        st.info("No custom templates saved yet. Create emails in Email Center and save them as templates!")
+    if not saved_templates:
+        st.info("No templates saved yet. Create emails in Email Center and save them as templates!")
     else:
-        st.success(f"You have {len(st.session_state.saved_email_templates)} saved template(s)")
+        st.success(f"You have {len(saved_templates)} saved template(s)")
         
-        for i, template in enumerate(st.session_state.saved_email_templates):
+        for template in saved_templates:
             with st.expander(f"{template['name']}"):
                 st.markdown(f"**Subject:** {template['subject']}")
-                st.text_area("Body:", value=template['body'], height=300, key=f"template_view_{i}", disabled=True)
+                st.text_area("Body:", value=template['body'], height=300, key=f"template_view_{template['id']}", disabled=True)
+                compiled = compile_template(template['subject'], template['body'])
+                st.caption(f"Used {template['times_used']} time(s)"
+                           + (f", last {template['last_used'][:16]}" if template['last_used'] else "")
+                           + (f" · placeholders: {', '.join(sorted(compiled.placeholders))}" if compiled.placeholders else ""))
+                if compiled.unknown:
+                    st.warning(f"Unknown placeholders (left as-is when rendered): {', '.join(sorted(compiled.unknown))}")
                 
                 col1, col2 = st.columns(2)
                 with col1:
@@ -2072,11 +2013,11 @@ elif page == "Email Templates":
                         data=template_text,
                         file_name=f"{template['name']}.txt",
                         mime="text/plain",
-                        key=f"download_template_{i}"
+                        key=f"download_template_{template['id']}"
                     )
                 with col2:
-                    if st.button("Delete Template", key=f"delete_template_{i}"):
-                        st.session_state.saved_email_templates.pop(i)
+                    if st.button("Delete Template", key=f"delete_template_{template['id']}"):
+                        db.delete_template(template['id'])
                         st.rerun()
     
     st.markdown("---")
@@ -2084,75 +2025,21 @@ elif page == "Email Templates":
     
     # Template creation form
     new_template_name = st.text_input("Template Name", placeholder="e.g., My Custom Sponsorship Request")
+    new_template_category = st.selectbox("Category", ["sponsorship", "vendor", "follow_up", "thank_you"])
     new_template_subject = st.text_input("Email Subject", placeholder="Subject line template")
     new_template_body = st.text_area("Email Body", height=300, 
                                     placeholder="You can use placeholders like {COMPANY_NAME}, {YOUR_NAME}, {PROJECT_NAME}, {AMOUNT}")
+    st.caption("Placeholders: " + " · ".join(f"{{{name}}} {description.lower()}" for name, description in FIELDS.items()))
     
     if st.button("Save New Template", type="primary"):
         if new_template_name and new_template_subject and new_template_body:
-            new_template = {
-                'name': new_template_name,
-                'subject': new_template_subject,
-                'body': new_template_body
-            }
-            st.session_state.saved_email_templates.append(new_template)
-            st.success(f"Template '{new_template_name}' saved!")
-            st.rerun()
+            if db.add_template(new_template_name, new_template_subject, new_template_body, new_template_category) is None:
+                st.error(f"A template named '{new_template_name}' already exists")
+            else:
+                st.success(f"Template '{new_template_name}' saved!")
+                st.rerun()
         else:
             st.error("Please fill in all fields")
-    
-    st.markdown("---")
-    st.markdown("### Default Templates")
-    st.info("These are built-in templates you can use as starting points")
-    
-    default_templates = {
-        "Sponsorship Request": """Dear {COMPANY_NAME} Team,
-
-I hope this email finds you well. My name is {YOUR_NAME}, and I'm reaching out regarding an exciting sponsorship opportunity.
-
-ABOUT OUR PROJECT:
-{PROJECT_NAME} is an innovative initiative that we believe would provide {COMPANY_NAME} with valuable exposure.
-
-SPONSORSHIP DETAILS:
-• Investment Level: {AMOUNT}
-• Expected Reach: Significant market exposure
-• Deliverables: Brand visibility and engagement
-
-We would love to discuss this opportunity further.
-
-Best regards,
-{YOUR_NAME}""",
-        
-        "Vendor Inquiry": """Dear {COMPANY_NAME} Sales Team,
-
-I'm {YOUR_NAME}, and I'm interested in your products/services for {PROJECT_NAME}.
-
-PROJECT REQUIREMENTS:
-• Product needed: {PROJECT_NAME}
-• Budget range: {AMOUNT}
-• Timeline: As soon as possible
-
-Please provide pricing and availability information.
-
-Thank you,
-{YOUR_NAME}""",
-        
-        "Partnership Proposal": """Dear {COMPANY_NAME} Team,
-
-I'm reaching out to explore a potential partnership between {YOUR_NAME} and {COMPANY_NAME}.
-
-PARTNERSHIP OPPORTUNITY:
-{PROJECT_NAME} represents a unique opportunity for collaboration.
-
-I'd welcome the chance to discuss how we can work together.
-
-Best regards,
-{YOUR_NAME}"""
-    }
-    
-    for name, body in default_templates.items():
-        with st.expander(f"{name}"):
-            st.text_area("Template:", value=body, height=250, key=f"default_{name}", disabled=True)
 
 elif page == "Company Database":
     st.markdown('<p class="main-header">Company Database</p>', unsafe_allow_html=True)
@@ -2167,25 +2054,166 @@ elif page == "Company Database":
         st.markdown("<br>", unsafe_allow_html=True)
         if st.button("Refresh", use_container_width=True):
             st.rerun()
-    
+
+    with st.expander("Import Companies (CSV / NDJSON)"):
+        st.caption("Columns: url (required), name, type, industry, project_part, relevance_score, notes, "
+                   "emails (comma or semicolon separated)")
+        import_upload_file = st.file_uploader("Company list", type=["csv", "ndjson", "jsonl"])
+        col1, col2 = st.columns(2)
+        with col1:
+            import_default_type = st.selectbox("Default type", ["sponsor", "vendor"])
+        with col2:
+            import_dry_run = st.checkbox("Dry run (validate only)", value=True)
+
+        if st.button("Import", disabled=import_upload_file is None, use_container_width=True):
+            with st.spinner("Importing..."):
+                try:
+                    import_stats = import_upload(db, import_upload_file, default_type=import_default_type,
+                                                 dry_run=import_dry_run)
+                except Exception as e:
+                    st.error(f"Import failed: {str(e)}")
+                    import_stats = None
+
+            if import_stats:
+                prefix = "Dry run: would import" if import_stats['dry_run'] else "Imported"
+                st.success(f"{prefix} {import_stats['companies_inserted']:,} companies and "
+                           f"{import_stats['contacts_added']:,} contacts from {import_stats['rows_read']:,} rows "
+                           f"({import_stats['rows_per_sec']:,.0f} rows/sec)")
+                st.caption(f"Duplicates skipped: {import_stats['duplicates']:,} · Errors: {import_stats['error_count']:,}")
+                if import_stats['errors']:
+                    st.dataframe(import_stats['errors'], use_container_width=True)
+
+    with st.expander("Merge Duplicate Companies"):
+        st.caption("Companies whose URLs share a registrable domain (e.g. https://www.x.com and https://x.com) "
+                   "are merged into the oldest entry, keeping all contacts and emails.")
+        if st.button("Merge Duplicates", use_container_width=True):
+            merge_stats = db.merge_duplicate_companies()
+            if merge_stats['removed']:
+                st.success(f"Merged {merge_stats['removed']} duplicate(s) across {merge_stats['groups']} domain(s)")
+            else:
+                st.info("No duplicate companies found")
+
+    with st.expander("Tag Industries"):
+        st.caption("Sets each company's industry from keywords in its name, URL, project/part and notes "
+                   "(Electronics, Industrial Supply, Aerospace, Robotics, 3D Printing, Rocketry, Composites).")
+        overwrite_industries = st.checkbox("Replace existing industries", value=False)
+        if st.button("Tag Industries", use_container_width=True):
+            tag_stats = tag_company_industries(db, overwrite=overwrite_industries)
+            if tag_stats['tagged']:
+                st.success(f"Tagged {tag_stats['tagged']} of {tag_stats['scanned']} companies: " + ", ".join(
+                    f"{industry} ({count})" for industry, count in tag_stats['by_industry'].items()))
+            else:
+                st.info(f"No untagged companies matched a category ({tag_stats['scanned']} scanned)")
+
+    with st.expander("Distributor Directory"):
+        directory_stats = db.get_directory_stats()
+        st.caption(f"{directory_stats['companies']} well-known distributors, {directory_stats['crawled']} crawled, "
+                   f"{directory_stats['contacts']} contacts. Oldest crawl: {directory_stats['oldest_crawl'] or 'n/a'}")
+        if directory_refresher is not None:
+            st.caption(f"Contacts refresh in the background every {DIRECTORY_REFRESH_HOURS:g}h"
+                       + (f" (last error: {directory_refresher.last_error})" if directory_refresher.last_error else ""))
+        if st.button("Refresh Stale Contacts", use_container_width=True):
+            with st.spinner("Crawling distributor sites..."):
+                refresh_stats = DirectoryRefresher(db.db_path, max_age_seconds=(DIRECTORY_REFRESH_HOURS or 168) * 3600).run_once()
+            st.success(f"Crawled {refresh_stats['crawled']} of {refresh_stats['stale']} stale distributors, "
+                       f"{refresh_stats['contacts']} new contacts")
+
+    with st.expander("Re-crawl Contacts"):
+        crawl_stats = db.get_crawl_stats(RECRAWL_MAX_AGE_DAYS * 86400)
+        st.caption(f"{crawl_stats['stale']:,} of {crawl_stats['companies']:,} companies not crawled in the last "
+                   f"{RECRAWL_MAX_AGE_DAYS:g} days ({crawl_stats['pages']:,} pages tracked). Only pages whose "
+                   f"content changed since the last crawl are re-extracted; stale, relevant companies go first.")
+        if recrawl_scheduler is not None:
+            st.caption(f"{RECRAWL_BATCH_SIZE} companies are re-crawled in the background every "
+                       f"{RECRAWL_INTERVAL_HOURS:g}h"
+                       + (f" (last error: {recrawl_scheduler.last_error})" if recrawl_scheduler.last_error else ""))
+        recrawl_limit = st.number_input("Companies to re-crawl", min_value=1, max_value=1000,
+                                        value=min(RECRAWL_BATCH_SIZE, 1000), step=10)
+        if st.button("Re-crawl Stale Companies", use_container_width=True, disabled=not crawl_stats['stale']):
+            recrawl_progress = st.empty()
+            with st.spinner("Re-crawling company sites..."):
+                with new_fetcher("contact re-crawl") as fetcher:
+                    searcher = EmailSearcher(max_pages=3, delay=0.3, fetcher=fetcher, archive=page_archive)
+                    recrawl_stats = recrawl_stale(
+                        db, searcher, RECRAWL_MAX_AGE_DAYS * 86400, int(recrawl_limit),
+                        on_result=lambda company, crawl: recrawl_progress.text(
+                            f"{company['url']}: {crawl['changed']} changed, "
+                            f"{crawl['unchanged'] + crawl['not_modified']} unchanged"))
+            recrawl_progress.empty()
+            st.success(f"Re-crawled {recrawl_stats['crawled']} of {recrawl_stats['companies']} companies: "
+                       f"{recrawl_stats['contacts']} new contacts, {recrawl_stats['changed']} pages changed, "
+                       f"{recrawl_stats['unchanged'] + recrawl_stats['not_modified']} unchanged"
+                       + (f", {recrawl_stats['errors']} unreachable" if recrawl_stats['errors'] else ""))
+
+    with st.expander("Page Archive"):
+        if page_archive is None:
+            st.caption("Set PAGE_ARCHIVE_PATH to keep the compressed HTML of every crawled page, so new "
+                       "extraction and scoring rules can be applied to past results without refetching.")
+        else:
+            archive_stats = page_archive.stats()
+            st.caption(f"{archive_stats['pages']:,} pages from {archive_stats['sites']:,} sites: "
+                       f"{archive_stats['raw_bytes'] / 1e6:,.1f} MB of HTML stored in "
+                       f"{archive_stats['stored_bytes'] / 1e6:,.1f} MB ({archive_stats['codec']}, "
+                       f"{archive_stats['ratio']:.1f}x), capped at {PAGE_ARCHIVE_MAX_MB:g} MB")
+            reprocess_rescore = st.checkbox("Recompute relevance scores", value=True)
+            if st.button("Reprocess Archive", use_container_width=True, disabled=not archive_stats['pages']):
+                with st.spinner("Re-extracting emails from archived pages..."):
+                    reprocess_stats = reprocess(page_archive, db, rescore=reprocess_rescore)
+                st.success(f"Reprocessed {reprocess_stats['pages']:,} pages from {reprocess_stats['sites']:,} "
+                           f"sites in {reprocess_stats['seconds']:.1f}s: {reprocess_stats['contacts']} new contacts, "
+                           f"{reprocess_stats['rescored']} companies rescored")
+
+    with st.expander("Search Result Cache"):
+        cache_stats = db.get_serp_cache_stats()
+        st.caption(f"{cache_stats['entries']:,} cached result pages ({cache_stats['urls']:,} URLs), "
+                   f"reused for {SERP_CACHE_TTL_HOURS:g} hours. Oldest: {cache_stats['oldest'] or 'n/a'}")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Purge Expired", use_container_width=True):
+                removed = db.purge_serp_cache(SERP_CACHE_TTL_HOURS * 3600)
+                st.success(f"Removed {removed} expired result page(s)")
+        with col2:
+            if st.button("Clear Cache", use_container_width=True):
+                removed = db.purge_serp_cache()
+                st.success(f"Removed {removed} cached result page(s)")
+
     st.markdown("---")
     
+    # Keyset pagination - keep a stack of page cursors, reset when the filter changes
+    company_type_filter = None
+    if filter_type == "Sponsors":
+        company_type_filter = "sponsor"
+    elif filter_type == "Vendors":
+        company_type_filter = "vendor"
+
+    page_key = (search_term, company_type_filter)
+    if st.session_state.get('company_page_key') != page_key:
+        st.session_state.company_page_key = page_key
+        st.session_state.company_page_cursors = [None]
+    page_cursors = st.session_state.company_page_cursors
+
     # Get companies from database
     if search_term:
-        companies = db.search_companies(search_term)
+        company_page = db.search_companies_page(search_term, page_size=COMPANY_PAGE_SIZE, after=page_cursors[-1])
     else:
-        company_type_filter = None
-        if filter_type == "Sponsors":
-            company_type_filter = "sponsor"
-        elif filter_type == "Vendors":
-            company_type_filter = "vendor"
-        companies = db.get_all_companies(company_type=company_type_filter)
-    
+        company_page = db.get_companies_page(company_type=company_type_filter, page_size=COMPANY_PAGE_SIZE, after=page_cursors[-1])
+    companies = company_page['rows']
+
     if not companies:
         st.info("No companies in database yet. Add companies from Real Sponsors or Vendor Search pages.")
     else:
-        st.success(f"Found {len(companies)} companies in database")
-        
+        st.success(f"Showing {len(companies)} of ~{company_page['total_estimate']} companies (page {len(page_cursors)})")
+
+        col_prev, col_next = st.columns(2)
+        with col_prev:
+            if st.button("Previous Page", disabled=len(page_cursors) == 1, use_container_width=True):
+                page_cursors.pop()
+                st.rerun()
+        with col_next:
+            if st.button("Next Page", disabled=not company_page['has_more'], use_container_width=True):
+                page_cursors.append(company_page['next_cursor'])
+                st.rerun()
+
         # Display companies in a nice table format
         for company in companies:
             with st.expander(f"🏢 {company['name']} ({company['type'].title()})"):
@@ -2239,54 +2267,75 @@ elif page == "Company Database":
         
         st.markdown("---")
         
-        # Export database
+        # Export database - streamed to a temp file by exporter.export_companies
         col1, col2, col3 = st.columns(3)
         with col1:
-            if st.button("Export All to CSV", use_container_width=True):
-                # Create CSV
-                csv_buffer = io.StringIO()
-                csv_writer = csv.writer(csv_buffer)
-                csv_writer.writerow(["Name", "URL", "Type", "Industry", "Project/Part", "Relevance", "Added", "Notes"])
-                
-                for company in companies:
-                    csv_writer.writerow([
-                        company['name'],
-                        company['url'],
-                        company['type'],
-                        company.get('industry', ''),
-                        company.get('project_part', ''),
-                        company['relevance_score'],
-                        company['date_added'],
-                        company.get('notes', '')
-                    ])
-                
-                st.download_button(
-                    label="Download CSV",
-                    data=csv_buffer.getvalue(),
-                    file_name=f"companies_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-        
+            export_source_label = st.selectbox("Export data", ["Companies", "Companies with Contacts"])
+            export_source = 'companies' if export_source_label == "Companies" else 'companies_with_contacts'
+            export_format = st.selectbox("Format", ["CSV", "NDJSON", "JSON"])
+            export_gzip = st.checkbox("Gzip compress", value=True)
+            if EXPORT_DOWNLOAD_MAX_MB:
+                st.caption(f"Downloads are limited to {EXPORT_DOWNLOAD_MAX_MB:,.0f} MB; "
+                           f"use gzip or `python exporter.py` for larger exports")
+
         with col2:
-            if st.button("Export with Contacts", use_container_width=True):
-                companies_with_contacts = db.get_companies_with_contacts()
-                json_data = json.dumps(companies_with_contacts, indent=2)
-                
-                st.download_button(
-                    label="Download JSON",
-                    data=json_data,
-                    file_name=f"companies_contacts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
+            export_columns = st.multiselect("Columns", EXPORT_SOURCES[export_source],
+                                            default=EXPORT_SOURCES[export_source])
+            if st.button("Export", type="primary", use_container_width=True):
+                # Drop this session's previous export and any abandoned by other sessions
+                previous_export = st.session_state.pop('last_export', None)
+                if previous_export and os.path.exists(previous_export['path']):
+                    os.remove(previous_export['path'])
+                prune_exports()
+                os.makedirs(EXPORT_DIR, exist_ok=True)
+
+                with st.spinner("Exporting..."):
+                    export = export_companies(
+                        db,
+                        fmt=export_format.lower(),
+                        source=export_source,
+                        columns=export_columns or None,
+                        company_type=company_type_filter,
+                        search_term=search_term if export_source == 'companies' else None,
+                        compress=export_gzip,
+                        output_dir=EXPORT_DIR
+                    )
+                if EXPORT_DOWNLOAD_MAX_MB and export['bytes'] > EXPORT_DOWNLOAD_MAX_MB * 1024 * 1024:
+                    os.remove(export['path'])
+                    st.error(f"Export is {export['bytes'] / 1024 / 1024:,.1f} MB, over the "
+                             f"{EXPORT_DOWNLOAD_MAX_MB:,.0f} MB download limit. "
+                             + ("Narrow the export or run" if export['compressed'] else "Enable gzip or run")
+                             + " `python exporter.py`.")
+                else:
+                    st.session_state.last_export = export
+
+            # Only the path is kept between reruns; the file is read when the button is drawn
+            # and deleted once downloaded (or after EXPORT_FILE_TTL_SECONDS if never downloaded)
+            last_export = st.session_state.get('last_export')
+            if last_export and os.path.exists(last_export['path']):
+                st.caption(f"{last_export['rows']:,} rows · {last_export['bytes'] / 1024:,.1f} KB · "
+                           f"{last_export['rows_per_sec']:,.0f} rows/sec")
+                with open(last_export['path'], 'rb') as export_file:
+                    downloaded = st.download_button(
+                        label=f"Download {last_export['format'].upper()}" + (" (gzip)" if last_export['compressed'] else ""),
+                        data=export_file,
+                        file_name=last_export['file_name'],
+                        mime=last_export['mime'],
+                        use_container_width=True
+                    )
+                if downloaded:
+                    os.remove(last_export['path'])
+                    del st.session_state.last_export
+                    st.caption("Downloaded - export again for a fresh copy")
         
         with col3:
             if st.button("Clear All Data", type="secondary", use_container_width=True):
                 st.warning("This will delete ALL companies and related data!")
                 if st.button("Confirm Delete All", type="primary"):
-                    for company in companies:
-                        db.delete_company(company['id'])
+                    # The listing only holds one page, so collect every id first
+                    all_ids = [row[0] for row in db.iter_companies(row_type='tuple')]
+                    for company_id in all_ids:
+                        db.delete_company(company_id)
                     st.success("All data cleared!")
                     st.rerun()
 
@@ -2338,7 +2387,7 @@ elif page == "Export Tools":
             st.info("No vendor data to export")
     
     st.markdown("---")
-    st.markdown("### Complete Database Export")
+    st.markdown("### Session Data Export")
     
     if st.session_state.found_companies or st.session_state.recommended_vendors:
         complete_data = {
@@ -2353,14 +2402,69 @@ elif page == "Export Tools":
         
         json_data = json.dumps(complete_data, indent=2)
         st.download_button(
-            label="Export Complete Database",
+            label="Export Session Data",
             data=json_data,
-            file_name=f"complete_database_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            file_name=f"session_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
             mime="application/json",
             use_container_width=True
         )
     else:
-        st.info("No data to export")
+        st.info("No session data to export")
+
+    st.markdown("---")
+    st.markdown("### Complete Database Export")
+    st.caption("Consistent snapshot of sponsor_center.db taken with the SQLite online backup API")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        snapshot_compress = st.checkbox("Gzip compress snapshot", value=True)
+        if st.button("Create Snapshot", type="primary", use_container_width=True):
+            with st.spinner("Backing up database..."):
+                try:
+                    snapshot = create_backup(db.db_path, BACKUP_DIR, compress=snapshot_compress)
+                    st.success(f"Snapshot {snapshot['file_name']} created "
+                               f"({snapshot['bytes'] / 1024:,.1f} KB in {snapshot['seconds']:.2f}s)")
+                except Exception as e:
+                    st.error(f"Backup failed: {str(e)}")
+
+        if backup_scheduler:
+            last = backup_scheduler.last_backup
+            st.caption(f"Scheduled backups every {BACKUP_INTERVAL_HOURS:g}h, keeping {BACKUP_KEEP}"
+                       + (f" · last: {last['file_name']}" if last else ""))
+            if backup_scheduler.last_error:
+                st.warning(f"Last scheduled backup failed: {backup_scheduler.last_error}")
+
+    with col2:
+        snapshots = list_backups(BACKUP_DIR, db.db_path)
+        if not snapshots:
+            st.info("No snapshots yet")
+        else:
+            snapshot_names = [s['file_name'] for s in snapshots]
+            selected_snapshot = st.selectbox("Snapshots", snapshot_names)
+            snapshot = snapshots[snapshot_names.index(selected_snapshot)]
+            st.caption(f"{snapshot['bytes'] / 1024:,.1f} KB · "
+                       f"{datetime.fromtimestamp(snapshot['modified']).strftime('%Y-%m-%d %H:%M:%S')}")
+
+            with open(snapshot['path'], 'rb') as snapshot_file:
+                st.download_button(
+                    label="Download Snapshot",
+                    data=snapshot_file,
+                    file_name=snapshot['file_name'],
+                    mime="application/gzip" if snapshot['file_name'].endswith('.gz') else "application/x-sqlite3",
+                    use_container_width=True
+                )
+
+            confirm_restore = st.checkbox("I understand restoring replaces all current data")
+            if st.button("Restore Snapshot", disabled=not confirm_restore, use_container_width=True):
+                with st.spinner("Restoring database..."):
+                    try:
+                        restore_backup(snapshot['path'], db.db_path)
+                        st.success(f"Restored {snapshot['file_name']}")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Restore failed: {str(e)}")
+
+rerun.checkpoint(f"page: {page}")
 
 # Footer
 st.markdown("---")
@@ -2369,3 +2473,24 @@ st.markdown("""
     <p>Integrated Sponsor Center - Web Version | Built with Streamlit</p>
 </div>
 """, unsafe_allow_html=True)
+rerun.checkpoint("footer")
+
+# Rerun profile - where this and recent reruns spent their time (profiling mode only)
+if rerun.enabled:
+    rerun_profiler.finish(rerun, page)
+    with st.sidebar.expander("Rerun Profile", expanded=True):
+        st.caption(f"This rerun: {rerun.total * 1000:.0f} ms on {page} · "
+                   f"{len(rerun_profiler.history)} reruns recorded"
+                   + (" · cProfile on" if rerun_mode == 'cprofile' else ""))
+        st.dataframe([{'Section': row['section'], 'Avg (ms)': round(row['avg_ms'], 1),
+                       'Last (ms)': round(row['last_ms'], 1), 'Max (ms)': round(row['max_ms'], 1),
+                       'Share': f"{row['share']:.0%}"}
+                      for row in rerun_profiler.breakdown()], use_container_width=True, hide_index=True)
+        st.download_button("Download timings (CSV)", rerun_profiler.export_csv(),
+                           file_name="rerun_timings.csv", mime="text/csv")
+        if rerun.profile_path:
+            with open(rerun.profile_path, "rb") as profile_file:
+                st.download_button("Download cProfile stats (.prof)", profile_file.read(),
+                                   file_name=os.path.basename(rerun.profile_path))
+            if st.checkbox("Show top functions", key="rerun_profile_top"):
+                st.code(top_functions(rerun.profile_path, limit=20), language=None)
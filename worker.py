@@ -0,0 +1,59 @@
+"""
+Background Worker for Integrated Sponsor Center
+Base class for the threads that call run_once() on a fixed interval
+"""
+
+import threading
+from typing import Optional
+
+
+class PeriodicWorker:
+    """Background thread calling run_once() every interval_seconds.
+
+    Subclasses implement run_once(). With run_immediately the first run
+    starts with the thread; otherwise it waits one interval. A failed run
+    is kept in last_error (cleared by the next good one) and does not
+    stop the thread.
+    """
+
+    def __init__(self, interval_seconds: float, run_immediately: bool = False, name: str = "periodic-worker"):
+        self.interval_seconds = interval_seconds
+        self.run_immediately = run_immediately
+        self.name = name
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        raise NotImplementedError
+
+    def _run_safely(self):
+        try:
+            self.run_once()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+
+    def _run(self):
+        if self.run_immediately:
+            self._run_safely()
+        while not self._stop.wait(self.interval_seconds):
+            self._run_safely()
+
+    def start(self):
+        """Start the thread (no-op if already running)."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())